@@ -0,0 +1,96 @@
+"""
+Throughput of the parse with and without the sasName and dataObj fast paths.
+
+Generates programs and times force_partial_parse with fullprogram as it is,
+where plain word names are matched by a single regex, and with sasName and 
+dataObj running the full grammar, fullSasName and fullDataObj, for every name.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_fast_paths
+    python -m benchmarks.bench_fast_paths --sizes 1 10
+"""
+import time
+import logging
+import argparse
+import contextlib
+
+from sasdocs import parsers
+from sasdocs.objects import force_partial_parse
+from sasdocs.parsers import fullprogram
+
+from . import corpus
+
+MB = 1024 * 1024
+
+
+@contextlib.contextmanager
+def full_grammar():
+    """
+    full_grammar()
+
+    Context manager that makes sasName and dataObj run fullSasName and 
+    fullDataObj, so every parser built from them skips the fast paths.
+    """
+    fastPaths = parsers.sasName.wrapped_fn, parsers.dataObj.wrapped_fn
+    parsers.sasName.wrapped_fn = parsers.fullSasName.wrapped_fn
+    parsers.dataObj.wrapped_fn = parsers.fullDataObj.wrapped_fn
+    try:
+        yield
+    finally:
+        parsers.sasName.wrapped_fn, parsers.dataObj.wrapped_fn = fastPaths
+
+
+def run(sizes=(1, 5), mix=None):
+    """
+    run(sizes=(1, 5), mix=None)
+
+    Time parsing generated programs of each size with and without the fast paths.
+
+    Parameters
+    ----------
+    sizes : iterable
+        Program sizes in MB
+    mix : dict, optional
+        Statement mix of the programs, defaults to corpus.defaultMix
+
+    Returns
+    -------
+    list
+        One dict per size with the parse throughput of each, the speed up of 
+        the fast paths and whether both found the same objects.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for size in sizes:
+        program = corpus.generate_program(int(size * MB), mix=mix)
+
+        start = time.perf_counter()
+        parsed, rate = force_partial_parse(fullprogram, program, stats=True)
+        fastSeconds = time.perf_counter() - start
+
+        with full_grammar():
+            start = time.perf_counter()
+            fullParsed, fullRate = force_partial_parse(fullprogram, program, stats=True)
+            fullSeconds = time.perf_counter() - start
+
+        results.append({
+            'sizeMB': size,
+            'fastMBps': size / fastSeconds,
+            'fullMBps': size / fullSeconds,
+            'speedup': fullSeconds / fastSeconds,
+            'objects': len(parsed),
+            'matches': parsed == fullParsed and rate == fullRate
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=float, default=[1, 5])
+    args = argParser.parse_args()
+
+    print('{:>6} {:>9} {:>9} {:>8} {:>9} {:>8}'.format('MB', 'fast MB/s', 'full MB/s', 'speedup', 'objects', 'matches'))
+    for result in run(args.sizes):
+        print('{sizeMB:>6} {fastMBps:>9.2f} {fullMBps:>9.2f} {speedup:>8.2f} {objects:>9} {matches!s:>8}'.format(**result))
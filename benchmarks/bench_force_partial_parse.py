@@ -0,0 +1,80 @@
+"""
+Scaling benchmark for objects.force_partial_parse.
+
+Generates SAS programs of increasing size made up of datasteps with
+DATALINES blocks and PROC FORMAT value lists (which the grammar cannot
+parse) and reports the time taken to parse each one. Linear scaling shows
+up as a constant seconds per MB across sizes.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_force_partial_parse
+    python -m benchmarks.bench_force_partial_parse --sizes 1 10 50
+"""
+import time
+import argparse
+
+from sasdocs.objects import force_partial_parse
+from sasdocs.parsers import fullprogram
+
+from . import corpus
+
+MB = 1024 * 1024
+
+# unparsableMix: Datasteps with DATALINES blocks and PROC FORMAT value lists,
+# which the grammar cannot parse, between sorts
+unparsableMix = {'datalines': 1, 'format': 1, 'proc': 1}
+
+
+def generate_program(size):
+    """
+    generate_program(size)
+
+    Build a SAS program of at least size characters containing large 
+    unparsable regions, see unparsableMix.
+    """
+    return corpus.generate_program(size, mix=unparsableMix)
+
+
+def run(sizes=(1, 10, 50), mark=True):
+    """
+    run(sizes=(1, 10, 50), mark=True)
+
+    Time force_partial_parse over generated programs of each size.
+
+    Parameters
+    ----------
+    sizes : iterable
+        Program sizes in MB.
+    mark : bool
+        Passed through to force_partial_parse.
+
+    Returns
+    -------
+    list
+        One dict per size with the size, timing, parse rate and object count.
+    """
+    results = []
+    for size in sizes:
+        program = generate_program(int(size * MB))
+        start = time.perf_counter()
+        parsed, rate = force_partial_parse(fullprogram, program, stats=True, mark=mark)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'sizeMB': size,
+            'seconds': elapsed,
+            'secondsPerMB': elapsed / size,
+            'parsedRate': rate,
+            'objects': len(parsed)
+        })
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=float, default=[1, 10, 50])
+    args = argParser.parse_args()
+
+    print('{:>8} {:>10} {:>10} {:>8} {:>10}'.format('MB', 'seconds', 's/MB', 'parsed', 'objects'))
+    for result in run(args.sizes):
+        print('{sizeMB:>8} {seconds:>10.2f} {secondsPerMB:>10.2f} {parsedRate:>8.2%} {objects:>10}'.format(**result))
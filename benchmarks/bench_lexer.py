@@ -0,0 +1,86 @@
+"""
+Throughput of the lexer and its effect on force_partial_parse.
+
+Generates programs with comments, quoted strings and inline data, times
+lexer.lex alone and times force_partial_parse with and without the lexer
+stage in front of the grammar.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_lexer
+    python -m benchmarks.bench_lexer --sizes 1 10
+"""
+import time
+import logging
+import argparse
+
+from sasdocs.lexer import lex
+from sasdocs.objects import force_partial_parse
+from sasdocs.parsers import fullprogram
+
+from . import corpus
+
+MB = 1024 * 1024
+
+# lexerMix: defaultMix with quoted strings, statement comments and inline data added
+lexerMix = dict(corpus.defaultMix, string=3, inlineComment=2, datalines=1)
+
+
+def run(sizes=(1, 5), mix=None):
+    """
+    run(sizes=(1, 5), mix=None)
+
+    Time lexing and parsing generated programs of each size.
+
+    Parameters
+    ----------
+    sizes : iterable
+        Program sizes in MB
+    mix : dict, optional
+        Statement mix of the programs, defaults to lexerMix
+
+    Returns
+    -------
+    list
+        One dict per size with lexer throughput, parse times with and without 
+        the lexer and the parse rate and object count of each.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for size in sizes:
+        program = corpus.generate_program(int(size * MB), mix=lexerMix if mix is None else mix)
+
+        start = time.perf_counter()
+        lex(program)
+        lexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed, rate = force_partial_parse(fullprogram, program, stats=True)
+        withLexer = time.perf_counter() - start
+
+        start = time.perf_counter()
+        unlexedParsed, unlexedRate = force_partial_parse(fullprogram, program, stats=True, lex=False)
+        withoutLexer = time.perf_counter() - start
+
+        results.append({
+            'sizeMB': size,
+            'lexMBps': size / lexed,
+            'lexed': withLexer,
+            'unlexed': withoutLexer,
+            'lexedRate': rate,
+            'unlexedRate': unlexedRate,
+            'lexedObjects': len(parsed),
+            'unlexedObjects': len(unlexedParsed)
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=float, default=[1, 5])
+    args = argParser.parse_args()
+
+    print('{:>6} {:>8} {:>10} {:>10} {:>8} {:>8} {:>9} {:>9}'.format('MB', 'lex MB/s', 'lexed s', 'unlexed s', 'rate', 'rate', 'objects', 'objects'))
+    for result in run(args.sizes):
+        print('{sizeMB:>6} {lexMBps:>8.1f} {lexed:>10.2f} {unlexed:>10.2f} {lexedRate:>8.2%} {unlexedRate:>8.2%} {lexedObjects:>9} {unlexedObjects:>9}'.format(**result))
@@ -0,0 +1,100 @@
+"""
+Scaling benchmark for sasdocs.lineage.dataLineage.
+
+Builds the lineage of synthetic projects in which each data step reads the
+dataset written by the step before it and a shared lookup table, spread
+over programs of 100 steps. Reports the time to build the lineage, to find
+the full upstream closure of the last dataset and the consumers of the
+shared table, and to replace one program as refresh does.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_lineage
+    python -m benchmarks.bench_lineage --sizes 1000 10000 100000
+"""
+import time
+import pathlib
+import argparse
+
+from sasdocs.lineage import dataLineage
+from sasdocs.objects import dataObject, dataStep
+
+STEPS = 100
+
+
+def build_programs(size):
+    """
+    build_programs(size)
+
+    Build size data steps grouped into programs of STEPS steps.
+
+    Returns
+    -------
+    dict
+        Lists of dataStep objects keyed by program path.
+    """
+    programs = {}
+    for i in range(size):
+        step = dataStep(
+            outputs=[dataObject(library=['lib1'], dataset=['ds{}'.format(i + 1)])],
+            inputs=[dataObject(library=['lib1'], dataset=['ds{}'.format(i)]), dataObject(library=['lib1'], dataset=['lookup'])]
+        )
+        programs.setdefault(pathlib.Path('program_{}.sas'.format(i // STEPS)), []).append(step)
+    return programs
+
+
+def run(sizes=(1000, 10000, 100000)):
+    """
+    run(sizes=(1000, 10000, 100000))
+
+    Build and query a lineage of each number of data steps.
+
+    Returns
+    -------
+    list
+        One dict per size with the number of datasets and the time taken by
+        each operation.
+    """
+    results = []
+    for size in sizes:
+        programs = build_programs(size)
+        lineage = dataLineage()
+
+        start = time.perf_counter()
+        for path, steps in programs.items():
+            lineage.add_steps(path, steps)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        upstream = lineage.upstream('lib1.ds{}'.format(size))
+        closure = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lineage.consumers('lib1.lookup')
+        consumers = time.perf_counter() - start
+
+        path = pathlib.Path('program_{}.sas'.format(len(programs) // 2))
+        start = time.perf_counter()
+        lineage.add_steps(path, programs[path])
+        replace = time.perf_counter() - start
+
+        results.append({
+            'steps': size,
+            'datasets': len(lineage),
+            'upstream': len(upstream),
+            'build': build,
+            'closure': closure,
+            'consumers': consumers,
+            'replace': replace
+        })
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    args = argParser.parse_args()
+
+    print('{:>8} {:>9} {:>9} {:>10} {:>10} {:>11} {:>10}'.format('steps', 'datasets', 'upstream', 'build s', 'closure s', 'consumers s', 'replace s'))
+    for result in run(args.sizes):
+        print('{steps:>8} {datasets:>9} {upstream:>9} {build:>10.4f} {closure:>10.4f} {consumers:>11.6f} {replace:>10.5f}'.format(**result))
@@ -0,0 +1,111 @@
+"""
+Benchmark of sasProgram.get_objects on macro heavy programs.
+
+Compares looking objects up in the type index built at parse time with
+the recursive walk of the program's contents it replaced. Every lookup
+made while documenting a program (templates, get_data_objects,
+build_network, summarise_objects) is repeated for each program size.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_object_index
+"""
+import time
+import logging
+import pathlib
+import argparse
+import tempfile
+
+from sasdocs.program import sasProgram
+
+LOOKUPS = ('dataStep', 'procedure', 'libname', 'include', 'macro', None)
+
+MACRO = """%macro outer_{i}(a=1, b=2);
+    /* Macro {i} */
+    data out_{i}; set in_{i}; run;
+    %macro inner_{i};
+        proc sort data=out_{i} out=sorted_{i}; by a; run;
+        %macro innermost_{i};
+            libname lib_{i} "path/to/lib_{i}";
+            data lib_{i}.final; set sorted_{i}; run;
+        %mend;
+    %mend;
+%mend;
+"""
+
+
+def recursive_get_objects(contents, objectType=None):
+    """
+    recursive_get_objects(contents, objectType=None)
+
+    The recursive walk previously used by sasProgram.get_objects.
+    """
+    for obj in contents:
+        if type(obj).__name__ == 'macro':
+            if objectType == 'macro':
+                yield obj
+            yield from recursive_get_objects(obj.contents, objectType=objectType)
+        elif objectType is not None:
+            if type(obj).__name__ == objectType:
+                yield obj
+        else:
+            yield obj
+
+
+def time_lookups(lookup, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for objectType in LOOKUPS:
+            for _ in lookup(objectType):
+                pass
+    return (time.perf_counter() - start) / repeat
+
+
+def run(sizes=(100, 1000, 5000), repeat=10):
+    """
+    run(sizes=(100, 1000, 5000), repeat=10)
+
+    Parse programs of each number of macros and time a full set of lookups
+    through the index and through the recursive walk.
+
+    Returns
+    -------
+    list
+        One dict per size with the index build time and the time for one set
+        of lookups each way.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder).joinpath('macros.sas')
+            path.write_text('%let size = {};\n'.format(size) + ''.join(MACRO.format(i=i) for i in range(size)))
+            program = sasProgram(path)
+
+        start = time.perf_counter()
+        program.build_object_index()
+        build = time.perf_counter() - start
+
+        indexed = time_lookups(lambda objectType: program.get_objects(objectType=objectType), repeat)
+        walked = time_lookups(lambda objectType: recursive_get_objects(program.contents, objectType), repeat)
+        results.append({
+            'macros': size,
+            'objects': sum(len(objects) for objects in program.objectIndex.values()),
+            'build': build,
+            'indexed': indexed,
+            'recursive': walked,
+            'speedup': walked / indexed
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 5000])
+    argParser.add_argument('--repeat', type=int, default=10)
+    args = argParser.parse_args()
+
+    print('{:>8} {:>8} {:>10} {:>10} {:>10} {:>8}'.format('macros', 'objects', 'build s', 'index s', 'walk s', 'speedup'))
+    for result in run(args.sizes, args.repeat):
+        print('{macros:>8} {objects:>8} {build:>10.4f} {indexed:>10.4f} {recursive:>10.4f} {speedup:>8.1f}'.format(**result))
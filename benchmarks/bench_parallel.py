@@ -0,0 +1,83 @@
+"""
+Parsing one large program serially and split across a process pool.
+
+Generates a macro heavy program and times force_partial_parse against
+parallel_parse with pools of each number of workers. Speed up is bounded by
+the number of CPUs available.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_parallel
+    python -m benchmarks.bench_parallel --size 8 --workers 2 4 8
+"""
+import time
+import logging
+import argparse
+import concurrent.futures
+
+from sasdocs.objects import force_partial_parse
+from sasdocs.parsers import fullprogram
+from sasdocs.program import parallel_parse, segmentSize
+
+from . import corpus
+
+MB = 1024 * 1024
+
+# macroMix: defaultMix with most of the program in macro definitions
+macroMix = dict(corpus.defaultMix, macro=12)
+
+
+def run(size=4, workers=(2, 4), mix=None):
+    """
+    run(size=4, workers=(2, 4), mix=None)
+
+    Time parsing a generated program serially and in pools of each size.
+
+    Parameters
+    ----------
+    size : float
+        Program size in MB
+    workers : iterable
+        Number of processes in each pool
+    mix : dict, optional
+        Statement mix of the program, defaults to macroMix
+
+    Returns
+    -------
+    list
+        One dict for the serial parse and one per pool size with the time taken,
+        the speed up over the serial parse and whether the objects matched.
+    """
+    logging.disable(logging.WARNING)
+    program = corpus.generate_program(int(size * MB), mix=macroMix if mix is None else mix)
+
+    start = time.perf_counter()
+    serial, rate = force_partial_parse(fullprogram, program, stats=True, mark=True)
+    serialSeconds = time.perf_counter() - start
+    results = [{'workers': 1, 'seconds': serialSeconds, 'speedUp': 1.0, 'objects': len(serial), 'matches': True}]
+
+    for count in workers:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=count) as executor:
+            start = time.perf_counter()
+            parsed, parsedRate = parallel_parse(program, executor, len(program) // segmentSize)
+            seconds = time.perf_counter() - start
+        results.append({
+            'workers': count,
+            'seconds': seconds,
+            'speedUp': serialSeconds / seconds,
+            'objects': len(parsed),
+            'matches': parsed == serial and parsedRate == rate
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--size', type=float, default=4)
+    argParser.add_argument('--workers', nargs='+', type=int, default=[2, 4])
+    args = argParser.parse_args()
+
+    print('{:>8} {:>9} {:>9} {:>9} {:>8}'.format('workers', 'seconds', 'speed up', 'objects', 'matches'))
+    for result in run(args.size, args.workers):
+        print('{workers:>8} {seconds:>9.2f} {speedUp:>9.2f} {objects:>9} {matches!s:>8}'.format(**result))
@@ -0,0 +1,88 @@
+"""
+Per statement type throughput of the top level program parser.
+
+Each statement type is repeated into a program and parsed with
+force_partial_parse, once through the keyword dispatcher used by
+parsers.fullprogram and once through the plain alternation it replaced.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_parsers
+"""
+import time
+import logging
+import argparse
+
+from sasdocs.objects import force_partial_parse
+from sasdocs.parsers import (fullprogram, nl, mcvDef, cmnt, datastep, proc, sql,
+                             lbnm, icld, mcroStart, mcroEnd, mcroCall)
+
+STATEMENTS = {
+    'datastep': 'data lib.out_a(keep=a b); set lib.in_a(where=(a=1)); b = a * 2; run;\n',
+    'proc': 'proc sort data=lib.in_a out=lib.out_b; by a; run;\n',
+    'sql': 'proc sql; create table out_c as select * from in_c left join in_d on in_c.a=in_d.a; quit;\n',
+    'libname': 'libname lib "path/to/library";\n',
+    'let': '%let variable = some value;\n',
+    'include': '%include "path/to/program.sas";\n',
+    'macro': '%macro mcr(a=1, b=2); %mend;\n',
+    'macroCall': '%mcr(a=1, b=2);\n',
+    'multiComment': '/* Multi line comment text */\n',
+    'inlineComment': '* Inline comment text;\n',
+    'unparsed': 'x = y + z; if a then b; else c;\n',
+}
+
+alternation = (nl|mcvDef|cmnt|datastep|proc|sql|lbnm|icld|mcroStart|mcroEnd|mcroCall).optional()
+
+
+def throughput(parser, statement, repeat):
+    """
+    throughput(parser, statement, repeat)
+
+    Parse statement repeated repeat times and return statements per second.
+    """
+    program = statement * repeat
+    start = time.perf_counter()
+    force_partial_parse(parser, program)
+    return repeat / (time.perf_counter() - start)
+
+
+def run(repeat=2000):
+    """
+    run(repeat=2000)
+
+    Measure throughput for each statement type with and without dispatch.
+
+    Parameters
+    ----------
+    repeat : int
+        Number of times each statement is repeated in its program.
+
+    Returns
+    -------
+    list
+        One dict per statement type with both throughputs in statements per
+        second and the speed up of dispatch over alternation.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for name, statement in STATEMENTS.items():
+        dispatched = throughput(fullprogram, statement, repeat)
+        alternated = throughput(alternation, statement, repeat)
+        results.append({
+            'statement': name,
+            'dispatch': dispatched,
+            'alternation': alternated,
+            'speedup': dispatched / alternated
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--repeat', type=int, default=2000)
+    args = argParser.parse_args()
+
+    print('{:>14} {:>12} {:>12} {:>8}'.format('statement', 'dispatch/s', 'alternate/s', 'speedup'))
+    for result in run(args.repeat):
+        print('{statement:>14} {dispatch:>12.0f} {alternation:>12.0f} {speedup:>8.2f}'.format(**result))
@@ -0,0 +1,76 @@
+"""
+End to end benchmark for sasProgram.
+
+Writes generated programs of increasing size, see corpus.defaultMix, and
+times loading each one with sasProgram, which reads, parses and indexes
+the file, then building its derived data and rendering its documentation.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_program
+    python -m benchmarks.bench_program --sizes 10 100 1000
+"""
+import time
+import logging
+import pathlib
+import argparse
+import tempfile
+
+from sasdocs.program import sasProgram
+
+from . import corpus
+
+KB = 1024
+
+
+def run(sizes=(10, 100, 1000)):
+    """
+    run(sizes=(10, 100, 1000))
+
+    Time sasProgram over generated programs of each size.
+
+    Parameters
+    ----------
+    sizes : iterable
+        Program sizes in KB.
+
+    Returns
+    -------
+    list
+        One dict per size with the load and documentation times and the
+        number of objects parsed.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder).joinpath('program.sas')
+            path.write_text(corpus.generate_program(int(size * KB)))
+
+            start = time.perf_counter()
+            program = sasProgram(path)
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            program.generate_documentation()
+            documentation = time.perf_counter() - start
+
+        results.append({
+            'sizeKB': size,
+            'load': load,
+            'documentation': documentation,
+            'secondsPerMB': (load + documentation) / (size / KB),
+            'objects': sum(program.summary.values())
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=float, default=[10, 100, 1000])
+    args = argParser.parse_args()
+
+    print('{:>8} {:>10} {:>10} {:>10} {:>8}'.format('KB', 'load s', 'docs s', 's/MB', 'objects'))
+    for result in run(args.sizes):
+        print('{sizeKB:>8} {load:>10.3f} {documentation:>10.3f} {secondsPerMB:>10.2f} {objects:>8}'.format(**result))
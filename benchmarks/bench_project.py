@@ -0,0 +1,78 @@
+"""
+Scaling benchmark for sasProject.
+
+Writes projects of generated programs, see corpus.defaultMix, and times
+building each project and rendering its documentation against the number
+of files. With --workers the programs are parsed in that many processes.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_project
+    python -m benchmarks.bench_project --files 10 100 500 --workers 4
+"""
+import time
+import logging
+import argparse
+import tempfile
+
+from sasdocs.project import sasProject
+
+from . import corpus
+
+
+def run(files=(10, 100, 500), size=4096, workers=None):
+    """
+    run(files=(10, 100, 500), size=4096, workers=None)
+
+    Time sasProject over projects of each number of files.
+
+    Parameters
+    ----------
+    files : iterable
+        Number of programs in each project.
+    size : int
+        Size of each program in characters.
+    workers : int, optional
+        Passed through to sasProject.
+
+    Returns
+    -------
+    list
+        One dict per project with the build and documentation times.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    for count in files:
+        with tempfile.TemporaryDirectory() as folder:
+            corpus.generate_project(folder, count, size)
+
+            start = time.perf_counter()
+            project = sasProject(folder, workers=workers)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in project.iter_documentation():
+                pass
+            documentation = time.perf_counter() - start
+
+        results.append({
+            'files': count,
+            'build': build,
+            'documentation': documentation,
+            'secondsPerFile': (build + documentation) / count,
+            'programs': len(project.programs)
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--files', nargs='+', type=int, default=[10, 100, 500])
+    argParser.add_argument('--size', type=int, default=4096)
+    argParser.add_argument('--workers', type=int, default=None)
+    args = argParser.parse_args()
+
+    print('{:>8} {:>10} {:>10} {:>10} {:>9}'.format('files', 'build s', 'docs s', 's/file', 'programs'))
+    for result in run(args.files, args.size, args.workers):
+        print('{files:>8} {build:>10.3f} {documentation:>10.3f} {secondsPerFile:>10.4f} {programs:>9}'.format(**result))
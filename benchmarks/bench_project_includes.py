@@ -0,0 +1,94 @@
+"""
+Scaling benchmark for include resolution in sasProject.
+
+Builds a project whose single program includes the head of a chain of
+programs outside the project folder. Each program in the chain includes
+the next and the last includes the first, so the project has to follow a
+deep include chain that ends in a cycle. Every program should be parsed
+exactly once, so time should grow linearly with the chain depth.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_project_includes
+    python -m benchmarks.bench_project_includes --depths 10 100 1000
+"""
+import time
+import logging
+import pathlib
+import argparse
+import tempfile
+
+from sasdocs import project
+from sasdocs.project import sasProject
+
+
+def build_chain(folder, depth):
+    """
+    build_chain(folder, depth)
+
+    Write a project folder and an include chain of depth programs to folder.
+
+    Returns
+    -------
+    pathlib.Path
+        Root folder of the project.
+    """
+    root = folder.joinpath('project')
+    external = folder.joinpath('external')
+    root.mkdir()
+    external.mkdir()
+    chain = [external.joinpath('chain_{}.sas'.format(i)) for i in range(depth)]
+    for i, path in enumerate(chain):
+        path.write_text('%include "{}";\ndata out_{}; set in_{}; run;\n'.format(chain[(i+1) % depth], i, i))
+    root.joinpath('main.sas').write_text('%include "{}";\n'.format(chain[0]))
+    return root
+
+
+def run(depths=(10, 100, 500)):
+    """
+    run(depths=(10, 100, 500))
+
+    Time sasProject over include chains of each depth.
+
+    Returns
+    -------
+    list
+        One dict per depth with the time taken, programs parsed and programs
+        in the project.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    loadProgram = project.load_program
+    for depth in depths:
+        parsed = []
+        def counting_load_program(path, cache=None, profile=False, budget=None, encoding=None, executor=None):
+            parsed.append(path)
+            return loadProgram(path, cache=cache, profile=profile, budget=budget, encoding=encoding, executor=executor)
+        project.load_program = counting_load_program
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                root = build_chain(pathlib.Path(folder), depth)
+                start = time.perf_counter()
+                prj = sasProject(root)
+                elapsed = time.perf_counter() - start
+        finally:
+            project.load_program = loadProgram
+        results.append({
+            'depth': depth,
+            'seconds': elapsed,
+            'secondsPerProgram': elapsed / (depth + 1),
+            'parsed': len(parsed),
+            'programs': len(prj.programs)
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--depths', nargs='+', type=int, default=[10, 100, 500])
+    args = argParser.parse_args()
+
+    print('{:>8} {:>10} {:>12} {:>8} {:>9}'.format('depth', 'seconds', 's/program', 'parsed', 'programs'))
+    for result in run(args.depths):
+        print('{depth:>8} {seconds:>10.3f} {secondsPerProgram:>12.5f} {parsed:>8} {programs:>9}'.format(**result))
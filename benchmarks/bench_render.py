@@ -0,0 +1,76 @@
+"""
+Throughput benchmark for rendering project documentation.
+
+Builds a project of many small programs and times rendering the markdown
+for every program through the shared template environment, which compiles
+each template once, against compiling the template from source for every
+program as sasProgram.generate_documentation previously did.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_render
+    python -m benchmarks.bench_render --programs 1000
+"""
+import time
+import logging
+import argparse
+import tempfile
+import importlib.resources as pkg_resources
+
+import jinja2
+
+from sasdocs import templates
+from sasdocs.project import sasProject
+
+from . import corpus
+
+def compile_every_time(program):
+    return jinja2.Template(pkg_resources.read_text(templates, 'program.md')).render(program=program)
+
+
+def run(programs=1000):
+    """
+    run(programs=1000)
+
+    Render documentation for a project of programs programs with the shared
+    environment and with a template compiled for each program.
+
+    Returns
+    -------
+    list
+        One dict per rendering method with the total time and programs rendered
+        per second.
+    """
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as folder:
+        corpus.generate_project(folder, programs, 400)
+        project = sasProject(folder)
+
+    # Build the lazily derived data up front so only rendering is timed
+    for program in project.programs:
+        program.networkJSON, program.dataObjects
+
+    results = []
+    for method, render in (('environment', lambda program: program.generate_documentation()), ('compiled per program', compile_every_time)):
+        start = time.perf_counter()
+        for program in project.programs:
+            render(program)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'method': method,
+            'programs': len(project.programs),
+            'seconds': elapsed,
+            'programsPerSecond': len(project.programs) / elapsed
+        })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--programs', type=int, default=1000)
+    args = argParser.parse_args()
+
+    print('{:>22} {:>9} {:>10} {:>12}'.format('method', 'programs', 'seconds', 'programs/s'))
+    for result in run(args.programs):
+        print('{method:>22} {programs:>9} {seconds:>10.3f} {programsPerSecond:>12.1f}'.format(**result))
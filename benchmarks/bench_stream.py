@@ -0,0 +1,103 @@
+"""
+Peak memory and time of streaming a program against loading it whole.
+
+Writes generated programs to a temporary folder, then counts the objects in
+each, including macro contents, once with sasProgram and once with
+stream_program, tracing the peak memory of each under tracemalloc.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_stream
+    python -m benchmarks.bench_stream --sizes 1 4 --chunk 65536
+"""
+import time
+import logging
+import pathlib
+import argparse
+import tempfile
+import tracemalloc
+
+from collections import Counter
+
+from sasdocs.program import sasProgram, stream_program, iter_objects
+
+from . import corpus
+
+MB = 1024 * 1024
+
+
+def traced(function):
+    """
+    traced(function)
+
+    Call function under tracemalloc.
+
+    Returns
+    -------
+    tuple
+        Result of function, seconds taken and peak traced memory in MB
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / MB
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(sizes=(1, 2, 4), chunkSize=256 * 1024, mix=None):
+    """
+    run(sizes=(1, 2, 4), chunkSize=256 * 1024, mix=None)
+
+    Count the objects of generated programs of each size whole and streamed.
+
+    Parameters
+    ----------
+    sizes : iterable
+        Program sizes in MB
+    chunkSize : int
+        Characters read at a time when streaming
+    mix : dict, optional
+        Statement mix of the programs, defaults to corpus.defaultMix
+
+    Returns
+    -------
+    list
+        One dict per size with the time and peak memory of each and whether
+        both counted the same objects.
+    """
+    logging.disable(logging.WARNING)
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            path = pathlib.Path(folder).joinpath('program_{}.sas'.format(size))
+            path.write_text(corpus.generate_program(int(size * MB), mix=mix))
+
+            whole, wholeSeconds, wholePeak = traced(lambda: sasProgram(path, cache=False, budget=False, only=('contents',)).summary)
+            streamed, streamSeconds, streamPeak = traced(lambda: Counter(type(obj).__name__ for obj in iter_objects(stream_program(path, budget=False, chunkSize=chunkSize))))
+
+            results.append({
+                'sizeMB': size,
+                'wholeSeconds': wholeSeconds,
+                'streamSeconds': streamSeconds,
+                'wholePeakMB': wholePeak,
+                'streamPeakMB': streamPeak,
+                'objects': sum(streamed.values()),
+                'matches': whole == streamed
+            })
+    logging.disable(logging.NOTSET)
+    return results
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--sizes', nargs='+', type=float, default=[1, 2, 4])
+    argParser.add_argument('--chunk', type=int, default=256 * 1024, help='Characters read at a time when streaming')
+    args = argParser.parse_args()
+
+    print('{:>6} {:>9} {:>9} {:>10} {:>10} {:>9} {:>8}'.format('MB', 'whole s', 'stream s', 'whole MB', 'stream MB', 'objects', 'matches'))
+    for result in run(args.sizes, chunkSize=args.chunk):
+        print('{sizeMB:>6} {wholeSeconds:>9.2f} {streamSeconds:>9.2f} {wholePeakMB:>10.1f} {streamPeakMB:>10.1f} {objects:>9} {matches!s:>8}'.format(**result))
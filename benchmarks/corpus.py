@@ -0,0 +1,140 @@
+"""
+Deterministic synthetic SAS corpus for the benchmarks.
+
+Programs are built from statements drawn at random, with a fixed seed, from
+a configurable mix of statement kinds. The same arguments always produce
+the same programs, so timings can be compared between commits.
+
+    from benchmarks import corpus
+    program = corpus.generate_program(100000, mix={'datastep': 2, 'junk': 1})
+"""
+import random
+import pathlib
+
+# defaultMix: Relative weight of each statement kind in a generated program
+defaultMix = {
+    'datastep': 6,
+    'proc': 4,
+    'sql': 2,
+    'macro': 2,
+    'macroCall': 2,
+    'let': 2,
+    'libname': 1,
+    'comment': 4,
+    'junk': 2,
+}
+
+ROWS = '\n'.join('{0} {1} {2}'.format(i, i * 2, i * 3) for i in range(40))
+VALUES = '\n'.join("        {0}='Value {0}'".format(i) for i in range(40))
+
+STATEMENTS = {
+    'datastep': 'data {lib}.out_{i}(keep=a b); set {lib}.in_{j}(where=(a={i})); b = a * 2; run;\n',
+    'merge': 'data out_{i}; merge in_{i}(in=a) {lib}.in_{j}; by key; if a; run;\n',
+    'proc': 'proc sort data={lib}.out_{j} out=sorted_{i} nodupkey; by a b; run;\n',
+    'summary': 'proc summary data=sorted_{j} nway; class a; var b; output out={lib}.summary_{i} sum=; run;\n',
+    'sql': 'proc sql; create table {lib}.sql_{i} as select a.*, b.value from out_{j} a left join sorted_{j} b on a.key=b.key; quit;\n',
+    'macro': '%macro macro_{i}(dsn=out_{j}, n=1 /* Number of rows */);\n    /* Macro {i} documentation */\n    data &dsn._{i}; set &dsn.; run;\n%mend;\n',
+    'macroCall': '%macro_{j}(dsn=out_{i}, n={i});\n',
+    'let': '%let var_{i} = value_{j};\n',
+    'libname': 'libname {lib} "/data/{lib}/{i}";\n',
+    'include': '%include "/code/include_{i}.sas";\n',
+    'comment': '/* Comment {i}: describes the step that follows in some detail */\n',
+    'inlineComment': '* Inline comment {i};\n',
+    'junk': 'x_{i} = y + {j}; if x_{i} > 1 then z = 1; else z = 0;\n',
+    'string': 'data note_{i}; set {lib}.in_{j}; note = "Check data=in_{j}; run it again"; run;\n',
+    'datalines': 'data cards_{i};\n    input a b c;\n    datalines;\n' + ROWS + '\n;\nrun;\n',
+    'format': 'proc format;\n    value fmt{i}_\n' + VALUES + ';\nrun;\n',
+}
+
+LIBRARIES = ('work', 'lib1', 'lib2', 'staging', 'reports')
+
+
+def generate_statements(count, mix=None, seed=0):
+    """
+    generate_statements(count, mix=None, seed=0)
+
+    Generate count SAS statements.
+
+    Parameters
+    ----------
+    count : int
+        Number of statements
+    mix : dict, optional
+        Relative weight of each kind of statement in STATEMENTS, defaults to defaultMix
+    seed : int
+        Seed of the random choices
+
+    Yields
+    ------
+    str
+    """
+    mix = defaultMix if mix is None else mix
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    for i in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        yield STATEMENTS[kind].format(i=i, j=rng.randrange(max(i, 1)), lib=rng.choice(LIBRARIES))
+
+
+def generate_program(size, mix=None, seed=0):
+    """
+    generate_program(size, mix=None, seed=0)
+
+    Generate a SAS program of at least size characters.
+
+    Parameters
+    ----------
+    size : int
+        Minimum length of the program in characters
+    mix : dict, optional
+        Relative weight of each kind of statement in STATEMENTS, defaults to defaultMix
+    seed : int
+        Seed of the random choices
+
+    Returns
+    -------
+    str
+    """
+    statements = []
+    length = 0
+    for statement in generate_statements(size, mix=mix, seed=seed):
+        if length >= size:
+            break
+        statements.append(statement)
+        length += len(statement)
+    return ''.join(statements)
+
+
+def generate_project(folder, files, size, mix=None, seed=0):
+    """
+    generate_project(folder, files, size, mix=None, seed=0)
+
+    Write a project of generated programs to folder. Programs are spread over
+    subfolders of 50 programs each.
+
+    Parameters
+    ----------
+    folder : pathlib.Path
+        Root folder of the project
+    files : int
+        Number of programs
+    size : int
+        Minimum length of each program in characters
+    mix : dict, optional
+        Relative weight of each kind of statement in STATEMENTS, defaults to defaultMix
+    seed : int
+        Seed of the random choices, each program uses seed plus its number
+
+    Returns
+    -------
+    list
+        pathlib.Path of each program written
+    """
+    paths = []
+    for i in range(files):
+        path = pathlib.Path(folder).joinpath('folder_{}'.format(i // 50), 'program_{}.sas'.format(i))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(generate_program(size, mix=mix, seed=seed + i))
+        paths.append(path)
+    return paths
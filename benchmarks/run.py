@@ -0,0 +1,197 @@
+"""
+Run the benchmark suite and save the results as JSON.
+
+Each benchmark module's run() is timed, then run again under tracemalloc
+to record its peak traced memory. Results are written with the commit they
+were measured at so runs can be compared between commits.
+
+Run from the repository root with
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+    python -m benchmarks.run --suite full --only parsers program
+"""
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import subprocess
+import tracemalloc
+
+from . import (bench_parsers, bench_force_partial_parse, bench_program, bench_project,
+               bench_render, bench_project_includes, bench_object_index, bench_lineage,
+               bench_lexer, bench_stream, bench_parallel, bench_fast_paths)
+
+MB = 1024 * 1024
+
+BENCHMARKS = {
+    'parsers': bench_parsers.run,
+    'force_partial_parse': bench_force_partial_parse.run,
+    'program': bench_program.run,
+    'project': bench_project.run,
+    'render': bench_render.run,
+    'project_includes': bench_project_includes.run,
+    'object_index': bench_object_index.run,
+    'lineage': bench_lineage.run,
+    'lexer': bench_lexer.run,
+    'stream': bench_stream.run,
+    'parallel': bench_parallel.run,
+    'fast_paths': bench_fast_paths.run,
+}
+
+# SUITES: Arguments passed to each benchmark's run(). The quick suite takes a
+# few minutes, the full suite uses each benchmark's defaults.
+SUITES = {
+    'quick': {
+        'parsers': {'repeat': 200},
+        'force_partial_parse': {'sizes': [0.1, 0.5]},
+        'program': {'sizes': [10, 100]},
+        'project': {'files': [10, 50], 'size': 2048},
+        'render': {'programs': 100},
+        'project_includes': {'depths': [10, 100]},
+        'object_index': {'sizes': [100, 1000], 'repeat': 3},
+        'lineage': {'sizes': [1000, 10000]},
+        'lexer': {'sizes': [0.5]},
+        'stream': {'sizes': [0.25, 0.5], 'chunkSize': 65536},
+        'parallel': {'size': 1, 'workers': [2]},
+        'fast_paths': {'sizes': [0.5]},
+    },
+    'full': {name: {} for name in BENCHMARKS},
+}
+
+
+def get_commit():
+    """
+    get_commit()
+
+    Returns
+    -------
+    str or None
+        Hash of the checked out commit, None if it cannot be found.
+    """
+    try:
+        res = subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, check=True)
+        return res.stdout.strip()
+    except Exception:
+        return None
+
+
+def measure(function, kwargs, memory=True):
+    """
+    measure(function, kwargs, memory=True)
+
+    Time a benchmark's run function and, if memory is True, run it again under
+    tracemalloc to find its peak memory use.
+
+    Returns
+    -------
+    dict
+        Total seconds, peak traced memory in MB and the benchmark's results.
+    """
+    start = time.perf_counter()
+    results = function(**kwargs)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            function(**kwargs)
+            peak = tracemalloc.get_traced_memory()[1] / MB
+        finally:
+            tracemalloc.stop()
+
+    return {'arguments': kwargs, 'seconds': seconds, 'peakMB': peak, 'results': results}
+
+
+def run(suite='quick', only=None, memory=True):
+    """
+    run(suite='quick', only=None, memory=True)
+
+    Run the benchmarks in a suite.
+
+    Parameters
+    ----------
+    suite : str
+        Name of the suite in SUITES
+    only : list, optional
+        Names of the benchmarks to run, by default all are run
+    memory : bool
+        Measure peak memory of each benchmark
+
+    Returns
+    -------
+    dict
+        Details of the run and the measurements of each benchmark keyed by name.
+    """
+    benchmarks = {}
+    for name, kwargs in SUITES[suite].items():
+        if only is None or name in only:
+            print('Running {}'.format(name), file=sys.stderr)
+            benchmarks[name] = measure(BENCHMARKS[name], kwargs, memory=memory)
+    return {
+        'commit': get_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'suite': suite,
+        'benchmarks': benchmarks
+    }
+
+
+def compare(current, previous):
+    """
+    compare(current, previous)
+
+    Pair up the numeric measurements of two runs. Results are matched by
+    benchmark, by position within the benchmark and by key.
+
+    Yields
+    ------
+    tuple
+        Benchmark name, label of the result, measurement, previous value,
+        current value and the ratio of current to previous.
+    """
+    for name, measured in current['benchmarks'].items():
+        if name not in previous['benchmarks']:
+            continue
+        before = previous['benchmarks'][name]
+        rows = [('total', measured, before)]
+        rows.extend((str(next(iter(row.values()))), row, old) for row, old in zip(measured['results'], before['results']))
+        for label, row, old in rows:
+            for key, value in row.items():
+                oldValue = old.get(key)
+                if isinstance(value, (int, float)) and isinstance(oldValue, (int, float)) and not isinstance(value, bool):
+                    ratio = value / oldValue if oldValue else float('nan')
+                    yield name, label, key, oldValue, value, ratio
+
+
+if __name__ == '__main__':
+    argParser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argParser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    argParser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), default=None)
+    argParser.add_argument('--output', default=None, help='File to write the JSON results to')
+    argParser.add_argument('--compare', default=None, help='JSON results of a previous run to compare against')
+    argParser.add_argument('--threshold', type=float, default=0.1, help='Relative change flagged when comparing')
+    argParser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run of each benchmark')
+    args = argParser.parse_args()
+
+    results = run(args.suite, args.only, memory=not args.no_memory)
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print('Compared with {} ({})'.format(previous.get('commit'), previous.get('timestamp')))
+        print('{:<20} {:<12} {:<18} {:>12} {:>12} {:>8}'.format('benchmark', 'result', 'measure', 'before', 'after', 'ratio'))
+        for name, label, key, before, after, ratio in compare(results, previous):
+            flag = '*' if abs(ratio - 1) > args.threshold else ''
+            print('{:<20} {:<12} {:<18} {:>12.4g} {:>12.4g} {:>8.2f} {}'.format(name, label, key, before, after, ratio, flag))
@@ -1,5 +1,7 @@
 import logging
 
+__version__ = '1.0.dev0'
+
 def format_logger(logger, context, logOut='sasdocs.log'):
     if not logger.handlers:
         logger_stream = logging.StreamHandler()
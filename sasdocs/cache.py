@@ -0,0 +1,217 @@
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import pathlib
+
+from . import __version__
+from .parsers import parserVersion
+
+log = logging.getLogger(__name__)
+
+# entryName: Name of a file written by a parseCache, the sha256 hex digest of
+# its key, or the temporary file an entry is written to before it is moved into
+# place. Nothing else in the cache directory is touched by evict or clear.
+entryName = re.compile(r'[0-9a-f]{64}(?:\.\d+\.tmp)?')
+
+
+def get_cache(cache):
+    """
+    get_cache(cache)
+
+    Normalise the cache argument accepted by sasProgram and sasProject.
+
+    Parameters
+    ----------
+    cache : None, bool, str, pathlib.Path or parseCache
+        None or False disables caching, True uses a parseCache in the default
+        '.sasdocs_cache' directory, a path uses a parseCache in that directory.
+
+    Returns
+    -------
+    parseCache or None
+        None if caching is disabled or the SASDOCS_NO_CACHE environment
+        variable is set.
+    """
+    if cache is None or cache is False or os.environ.get('SASDOCS_NO_CACHE'):
+        return None
+    if cache is True:
+        return parseCache()
+    if isinstance(cache, parseCache):
+        return cache
+    return parseCache(cache)
+
+
+class parseCache(object):
+    """
+    On disk cache of parsed SAS programs.
+
+    Each entry is a pickled dictionary of sasProgram attributes, stored in a file
+    named by the hash of the program source, the sasdocs version and the parser
+    version. Changing the file, upgrading sasdocs or changing the grammar therefore
+    leads to a cache miss rather than stale results.
+
+    Entries are evicted by evict() once older than maxAge or, oldest first,
+    once the cache grows beyond maxSize. Only files named like a cache entry are
+    ever removed, so the cache can safely point at a directory holding other files.
+
+    Attributes
+    ----------
+    path : pathlib.Path
+        Directory holding the cache entries
+    maxSize : int
+        Maximum total size of the cache entries in bytes
+    maxAge : int
+        Maximum age of a cache entry in seconds since it was last used
+    """
+
+    def __init__(self, path='.sasdocs_cache', maxSize=256*1024*1024, maxAge=30*24*60*60):
+        self.path = pathlib.Path(path)
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+
+    def key(self, source):
+        """
+        key(source)
+
+        Generate the cache key for a program's source.
+
+        Parameters
+        ----------
+        source : bytes
+            Content of the SAS program, or a digest of it
+
+        Returns
+        -------
+        str
+        """
+        sha = hashlib.sha256(source)
+        sha.update('{}:{}'.format(__version__, parserVersion).encode())
+        return sha.hexdigest()
+
+    def load(self, key):
+        """
+        load(key)
+
+        Load a cache entry, refreshing its last used time.
+
+        Parameters
+        ----------
+        key : str
+            Key returned by key()
+
+        Returns
+        -------
+        dict or None
+            Cached attributes or None if there is no usable entry.
+        """
+        entry = self.path.joinpath(key)
+        try:
+            with entry.open('rb') as f:
+                data = pickle.load(f)
+            os.utime(entry)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning("Unable to load cache entry {}: {}".format(entry, e))
+            return None
+
+    def store(self, key, data):
+        """
+        store(key, data)
+
+        Write a cache entry. The entry is written to a temporary file and moved
+        into place so concurrent builds never read a partial entry.
+
+        Parameters
+        ----------
+        key : str
+            Key returned by key()
+        data : dict
+            Attributes to cache
+        """
+        entry = self.path.joinpath(key)
+        tmp = self.path.joinpath('{}.{}.tmp'.format(key, os.getpid()))
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with tmp.open('wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except Exception as e:
+            log.warning("Unable to store cache entry {}: {}".format(entry, e))
+            if tmp.exists():
+                tmp.unlink()
+
+    def evict(self):
+        """
+        evict()
+
+        Remove entries not used within maxAge seconds, then remove the least
+        recently used entries until the cache is no larger than maxSize.
+        """
+        if not self.path.is_dir():
+            return
+        now = time.time()
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if self.maxAge is not None and now - stat.st_mtime > self.maxAge:
+                self.remove(entry)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry))
+
+        if self.maxSize is not None:
+            size = sum(entrySize for _, entrySize, _ in entries)
+            for _, entrySize, entry in sorted(entries):
+                if size <= self.maxSize:
+                    break
+                self.remove(entry)
+                size -= entrySize
+
+    def clear(self):
+        """
+        clear()
+
+        Remove every entry from the cache.
+        """
+        for entry in self.entries():
+            self.remove(entry)
+
+    def entries(self):
+        """
+        entries()
+
+        Iterate over the files in the cache directory written by the cache.
+
+        Yields
+        ------
+        pathlib.Path
+            Path to a cache entry or a temporary file of one
+        """
+        if not self.path.is_dir():
+            return
+        for entry in self.path.iterdir():
+            if entryName.fullmatch(entry.name):
+                yield entry
+
+    def remove(self, entry):
+        """
+        remove(entry)
+
+        Delete a cache entry, ignoring entries already removed by another build.
+
+        Parameters
+        ----------
+        entry : pathlib.Path
+            Path to the cache entry
+        """
+        try:
+            entry.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,115 @@
+import re
+
+# tokenPattern: Everything in a SAS program the grammar should not look inside
+# of. Each alternative captures the span to blank out in a group named after
+# what it is, keeping the delimiters around it. Alternatives are tried left to
+# right at each point, so quotes inside comments and comment markers inside
+# strings are handled by whichever starts first. The leading lookahead skips 
+# over characters no alternative can start with.
+#   - Macro quoted characters, i.e. %' inside %str(), never start a string
+#   - macro: %* ... ; macro comments
+#   - comment: /* ... */ block comments, an unclosed comment runs to the end. 
+#     The closing */ is left for the statement alternative to start from
+#   - single, double: Quoted strings, doubled quotes inside a string are read
+#     as two strings either side of the quotes
+#   - statement: * ... ; comments, * only counts at the start of a statement, 
+#     after a ; or a block comment, or at the start of the program. A * at the 
+#     start of a line may be part of a statement, i.e. select * in proc sql
+#   - datalines, datalines4: Inline data, up to the first ; or up to ;;;;. The 
+#     keyword only counts at the start of a statement, so a dataset or variable 
+#     named lines or cards is not read as inline data
+#   - unclosed: A quote with no closing quote after it, only the quote itself is
+#     captured and it is not blanked out, see lex
+tokenPattern = re.compile(r'''(?=[%/'"*;]|\A)(?:
+    %(?:['"();,]|\*(?P<macro>[^;]*)(?=;))
+    | /\*(?P<comment>.*?)(?=\*/|\Z)
+    | '(?P<single>[^']*)'
+    | "(?P<double>[^"]*)"
+    | (?:\A|;|\*/)\s*\*(?P<statement>[^;]*)(?=;)
+    | (?:\A|;)\s*(?:datalines|cards|lines)(?:4[ \t]*;(?P<datalines4>.*?)(?=;;;;|\Z)|[ \t]*;(?P<datalines>[^;]*))
+    | (?P<unclosed>['"])
+)''', flags=re.IGNORECASE|re.DOTALL|re.VERBOSE)
+
+kinds = ('macro', 'comment', 'single', 'double', 'statement', 'datalines4', 'datalines', 'unclosed')
+
+
+def iter_spans(string):
+    """
+    iter_spans(string)
+
+    Find the comments, quoted strings and inline data in a SAS program in a
+    single pass.
+
+    Parameters
+    ----------
+    string : str
+        SAS program
+
+    Yields
+    ------
+    tuple
+        Kind of span, see kinds, and the character offsets its contents start
+        and end at. Delimiters are not included.
+    """
+    for match in tokenPattern.finditer(string):
+        kind = match.lastgroup
+        if kind is not None:
+            yield kind, match.start(kind), match.end(kind)
+
+
+class maskedSource(str):
+    """
+    SAS program text carrying a copy of itself with the contents of comments,
+    quoted strings and inline data blanked out.
+
+    maskedSource compares, slices and parses as the original text. Parsers that
+    scan forward for a keyword, see parsers.scan, search the masked copy instead so
+    they skip over the blanked spans and never stop on a keyword inside them. As
+    the masked copy is the same length as the original every offset found in it
+    is valid in the original.
+
+    Attributes
+    ----------
+    masked : str
+        The text with every span found by iter_spans replaced by spaces
+    limit : int or None
+        Offset scanning parsers may not search past, the end of the step budget 
+        of the statement being parsed, see objects.parseBudget. Set by 
+        force_partial_parse.
+    unclosed : int or None
+        Offset of the first quote that is never closed. In a piece of a larger program
+        the string may be closed in the next piece, see partialParse.stream.
+    """
+    limit = None
+    unclosed = None
+
+
+def lex(string):
+    """
+    lex(string)
+
+    Build the maskedSource of a SAS program.
+
+    Parameters
+    ----------
+    string : str
+        SAS program
+
+    Returns
+    -------
+    maskedSource
+    """
+    source = maskedSource(string)
+    pieces = []
+    last = 0
+    for kind, start, end in iter_spans(string):
+        if kind == 'unclosed':
+            if source.unclosed is None:
+                source.unclosed = start
+            continue
+        pieces.append(string[last:start])
+        pieces.append(' ' * (end - start))
+        last = end
+    pieces.append(string[last:])
+    source.masked = ''.join(pieces)
+    return source
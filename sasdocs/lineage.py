@@ -0,0 +1,239 @@
+from collections import Counter
+
+
+class dataLineage(object):
+    """
+    Data lineage across all programs in a project.
+
+    Every dataStep and procedure adds an edge from each of its input datasets to
+    each of its output datasets. Datasets are identified by UID, so a dataset
+    referenced by many programs is a single node. The graph is held as dictionaries
+    of sets keyed by UID, so adding a program, removing a program and finding the
+    neighbours of a dataset do not depend on the size of the rest of the graph.
+
+    Each program's contribution is recorded so it can be removed again when the
+    program changes, see sasProject.refresh.
+
+    Attributes
+    ----------
+    datasets : dict
+        dataIdentity of every dataset in the lineage, keyed by UID
+    downstreamEdges : dict
+        UIDs of the datasets created from each dataset, keyed by UID
+    upstreamEdges : dict
+        UIDs of the datasets each dataset is created from, keyed by UID
+    producedBy : dict
+        Paths of the programs that output each dataset, keyed by UID
+    consumedBy : dict
+        Paths of the programs that take each dataset as an input, keyed by UID
+    programs : dict
+        Edges, outputs and inputs added by each program, keyed by program path
+    """
+
+    def __init__(self):
+        self.datasets = {}
+        self.downstreamEdges = {}
+        self.upstreamEdges = {}
+        self.producedBy = {}
+        self.consumedBy = {}
+        self.programs = {}
+        self.edgeCount = Counter()
+
+    def add_program(self, program):
+        """
+        add_program(program)
+
+        Add the data steps and procedures of a program, including those inside macros.
+
+        Parameters
+        ----------
+        program : sasProgram
+        """
+        steps = [obj for objectType in ('dataStep', 'procedure') for obj in program.get_objects(objectType=objectType)]
+        self.add_steps(program.path, steps)
+
+    def add_steps(self, path, steps):
+        """
+        add_steps(path, steps)
+
+        Add the inputs and outputs of a list of data steps and procedures found in the
+        program at path. Any steps previously added for path are replaced.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the program the steps were found in
+        steps : list
+            dataStep and procedure objects
+        """
+        self.remove_program(path)
+
+        edges = set()
+        outputs = set()
+        inputs = set()
+        for step in steps:
+            for dataset in step.outputs:
+                outputs.add(self.add_dataset(dataset))
+            for dataset in step.inputs:
+                inputs.add(self.add_dataset(dataset))
+                for output in step.outputs:
+                    if dataset.UID != output.UID:
+                        edges.add((dataset.UID, output.UID))
+
+        for source, target in edges:
+            if self.edgeCount[(source, target)] == 0:
+                self.downstreamEdges.setdefault(source, set()).add(target)
+                self.upstreamEdges.setdefault(target, set()).add(source)
+            self.edgeCount[(source, target)] += 1
+        for UID in outputs:
+            self.producedBy.setdefault(UID, set()).add(path)
+        for UID in inputs:
+            self.consumedBy.setdefault(UID, set()).add(path)
+
+        self.programs[path] = (edges, outputs, inputs)
+
+    def add_dataset(self, dataset):
+        self.datasets.setdefault(dataset.UID, dataset.identity)
+        return dataset.UID
+
+    def remove_program(self, path):
+        """
+        remove_program(path)
+
+        Remove everything added for the program at path. Datasets no longer referenced
+        by any program are dropped.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the program
+        """
+        if path not in self.programs:
+            return
+        edges, outputs, inputs = self.programs.pop(path)
+
+        for source, target in edges:
+            self.edgeCount[(source, target)] -= 1
+            if self.edgeCount[(source, target)] == 0:
+                del self.edgeCount[(source, target)]
+                self.discard(self.downstreamEdges, source, target)
+                self.discard(self.upstreamEdges, target, source)
+        for UID in outputs:
+            self.discard(self.producedBy, UID, path)
+        for UID in inputs:
+            self.discard(self.consumedBy, UID, path)
+
+        for UID in outputs | inputs:
+            if UID not in self.producedBy and UID not in self.consumedBy:
+                del self.datasets[UID]
+
+    @staticmethod
+    def discard(mapping, key, value):
+        values = mapping[key]
+        values.discard(value)
+        if not values:
+            del mapping[key]
+
+    def upstream(self, dataset):
+        """
+        upstream(dataset)
+
+        Find every dataset the given dataset is created from, directly or indirectly.
+
+        Parameters
+        ----------
+        dataset : str or dataObject
+            Dataset or its name, i.e. 'lib1.customers'
+
+        Returns
+        -------
+        set
+            UIDs of the upstream datasets
+        """
+        return self.closure(self.upstreamEdges, dataset)
+
+    def downstream(self, dataset):
+        """
+        downstream(dataset)
+
+        Find every dataset created from the given dataset, directly or indirectly.
+
+        Parameters
+        ----------
+        dataset : str or dataObject
+            Dataset or its name, i.e. 'lib1.customers'
+
+        Returns
+        -------
+        set
+            UIDs of the downstream datasets
+        """
+        return self.closure(self.downstreamEdges, dataset)
+
+    def closure(self, edges, dataset):
+        start = get_uid(dataset)
+        found = set()
+        worklist = [start]
+        while worklist:
+            for UID in edges.get(worklist.pop(), ()):
+                if UID not in found:
+                    found.add(UID)
+                    worklist.append(UID)
+        found.discard(start)
+        return found
+
+    def producers(self, dataset):
+        """
+        producers(dataset)
+
+        Parameters
+        ----------
+        dataset : str or dataObject
+            Dataset or its name, i.e. 'lib1.customers'
+
+        Returns
+        -------
+        set
+            Paths of the programs that output the dataset
+        """
+        return set(self.producedBy.get(get_uid(dataset), ()))
+
+    def consumers(self, dataset):
+        """
+        consumers(dataset)
+
+        Parameters
+        ----------
+        dataset : str or dataObject
+            Dataset or its name, i.e. 'lib1.customers'
+
+        Returns
+        -------
+        set
+            Paths of the programs that take the dataset as an input
+        """
+        return set(self.consumedBy.get(get_uid(dataset), ()))
+
+    def __len__(self):
+        return len(self.datasets)
+
+
+def get_uid(dataset):
+    """
+    get_uid(dataset)
+
+    UID for a dataObject or a dataset name. Names without a library are in work.
+
+    Parameters
+    ----------
+    dataset : str or dataObject
+
+    Returns
+    -------
+    str
+    """
+    if hasattr(dataset, 'UID'):
+        return dataset.UID
+    if '.' not in dataset:
+        dataset = 'work.' + dataset
+    return dataset.upper()
@@ -0,0 +1,237 @@
+from .objects import macroVariable
+
+
+class macroIndex(object):
+    """
+    Macro definitions and the call sites of each macro across all programs in a project.
+
+    Macros are keyed by their upper cased name, as SAS macro names are case
+    insensitive, so a macro defined as %macro Load; and called as %LOAD; is a single
+    entry. The index is held as dictionaries of lists keyed by name, so finding the
+    definitions of a macro or who calls it does not depend on the size of the rest
+    of the project.
+
+    Each program's contribution is recorded so it can be removed again when the
+    program changes, see sasProject.refresh.
+
+    Attributes
+    ----------
+    definitions : dict
+        Path of the program and macro object of each definition of a macro, keyed
+        by name
+    calls : dict
+        Path of the program and line of each call of a macro, keyed by name. Calls
+        are indexed whether or not the macro is defined in the project, calls whose
+        name is built from a macro variable are not indexed.
+    programs : dict
+        Names of the macros defined and called by each program, keyed by program path
+    """
+
+    def __init__(self):
+        self.definitions = {}
+        self.calls = {}
+        self.programs = {}
+
+    def add_program(self, program):
+        """
+        add_program(program)
+
+        Add the macro definitions and macro calls of a program, including those inside
+        macros. Found from the program's object index rather than by walking its contents.
+
+        Parameters
+        ----------
+        program : sasProgram
+        """
+        self.add_objects(program.path, program.get_objects(objectType='macro'), program.get_objects(objectType='macroCall'))
+
+    def add_objects(self, path, macros, calls):
+        """
+        add_objects(path, macros, calls)
+
+        Add the macro definitions and macro calls found in the program at path. Anything
+        previously added for path is replaced.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the program the objects were found in
+        macros : iterable
+            macro objects
+        calls : iterable
+            macroCall objects
+        """
+        self.remove_program(path)
+
+        defined = set()
+        called = set()
+        for definition in macros:
+            name = definition.name.upper()
+            self.definitions.setdefault(name, []).append((path, definition))
+            defined.add(name)
+        for call in calls:
+            name = get_name(call.name)
+            if name is not None:
+                self.calls.setdefault(name, []).append((path, get_line(call)))
+                called.add(name)
+
+        self.programs[path] = (defined, called)
+
+    def rebuild(self, programs):
+        """
+        rebuild(programs)
+
+        Replace everything in the index with the macros of programs, added in order. 
+        Used by sasProject.refresh when programs change order, so definitions and 
+        calls are listed as in a fresh index.
+
+        Parameters
+        ----------
+        programs : list
+            sasProgram objects
+        """
+        self.definitions = {}
+        self.calls = {}
+        self.programs = {}
+        for program in programs:
+            self.add_program(program)
+
+    def remove_program(self, path):
+        """
+        remove_program(path)
+
+        Remove everything added for the program at path.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Path of the program
+        """
+        if path not in self.programs:
+            return
+        defined, called = self.programs.pop(path)
+
+        for name in defined:
+            self.discard(self.definitions, name, path)
+        for name in called:
+            self.discard(self.calls, name, path)
+
+    @staticmethod
+    def discard(mapping, name, path):
+        entries = [entry for entry in mapping[name] if entry[0] != path]
+        if entries:
+            mapping[name] = entries
+        else:
+            del mapping[name]
+
+    def __iter__(self):
+        """
+        Yield the name, program path and macro object of each definition, with
+        definitions of the same name together.
+        """
+        for name, definitions in self.definitions.items():
+            for path, definition in definitions:
+                yield name, path, definition
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def __contains__(self, name):
+        return name.upper() in self.definitions
+
+    def get_definitions(self, name):
+        """
+        get_definitions(name)
+
+        Parameters
+        ----------
+        name : str
+            Name of the macro, in any case
+
+        Returns
+        -------
+        list
+            Path of the program and macro object of each definition of the macro
+        """
+        return list(self.definitions.get(name.upper(), ()))
+
+    def get_calls(self, name):
+        """
+        get_calls(name)
+
+        Parameters
+        ----------
+        name : str
+            Name of the macro, in any case
+
+        Returns
+        -------
+        list
+            Path of the program and line of each call of the macro, the line is None
+            where the call's posistion was not recorded
+        """
+        return list(self.calls.get(name.upper(), ()))
+
+    def callers(self, name):
+        """
+        callers(name)
+
+        Parameters
+        ----------
+        name : str
+            Name of the macro, in any case
+
+        Returns
+        -------
+        set
+            Paths of the programs that call the macro
+        """
+        return set(path for path, _ in self.calls.get(name.upper(), ()))
+
+    def undefined(self):
+        """
+        undefined()
+
+        Returns
+        -------
+        set
+            Names of the macros called but not defined, including any of SAS's own
+            macro statements and functions parsed as calls
+        """
+        return set(self.calls).difference(self.definitions)
+
+
+def get_name(name):
+    """
+    get_name(name)
+
+    Upper cased name of a macro call, the call is not resolvable if its name
+    contains a macro variable.
+
+    Parameters
+    ----------
+    name : list or str
+        Parsed sasName of the call
+
+    Returns
+    -------
+    str or None
+    """
+    if isinstance(name, str):
+        return name.upper()
+    if any(isinstance(part, macroVariable) for part in name):
+        return None
+    return ''.join(name).upper()
+
+
+def get_line(obj):
+    """
+    get_line(obj)
+
+    Line an object starts on, None if its posistion was not recorded.
+    """
+    try:
+        start = obj.start
+    except AttributeError:
+        return None
+    return start[0] if isinstance(start, (list, tuple)) else None
@@ -1,16 +1,144 @@
+import os
+import sys
+import array
+import bisect
 import pathlib
 import logging
+import weakref
+import time
 import attr
 import re
 
+from . import lexer, profiling
+
 reFlags = re.IGNORECASE|re.DOTALL
 
 log = logging.getLogger(__name__) 
 
+# statementStart: Every point in a SAS program at which one of the top 
+# level parsers can begin to match. Used by force_partial_parse to jump
+# over unparsable text in a single step.
+statementStart = re.compile(r'[\n%*]|/\*|\bdata\b|proc|libname', flags=re.IGNORECASE)
+
+# splitPoint: Start of a line no statement before it can carry on past, used
+# by split_program. Either a %macro statement following a complete statement, 
+# or a data step or procedure following the end of a step or a macro. Matched 
+# against the lexer's masked text so nothing inside a comment or string counts.
+splitPoint = re.compile(r'''
+    ;[ \t]*\n\s*?^(?=[ \t]*%macro\b)
+    | (?:\b(?:run|quit)|%mend\b[^;]*)[ \t]*;[ \t]*\n\s*?^(?=[ \t]*(?:data|proc)\b)
+''', flags=re.IGNORECASE|re.MULTILINE|re.VERBOSE)
+
+# statementKeyword: Leading keyword or character of a statement, used to report 
+# which statements the time of a parse went on when it exceeds its budget.
+statementKeyword = re.compile(r'/\*|%?\w+|.', flags=re.DOTALL)
+
+class lineIndex(object):
+    """
+    Character offsets of the start of every line in a string.
+
+    Built once per parsed string so that the character offsets recorded during parsing
+    can be converted to line:col posistions by bisection when they are needed. A 
+    string that is one piece of a larger program, see iter_partial_parse, is indexed
+    with the offset and line number it starts at in the program.
+
+    Attributes
+    ----------
+    offsets : array.array
+        Offset of the first character of each line, the first line starts at offset
+    firstLine : int
+        Line number of the first line
+    """
+    __slots__ = ('offsets', 'firstLine')
+
+    def __init__(self, string, offset=0, firstLine=1):
+        self.offsets = array.array('q', [offset])
+        self.offsets.extend(match.end() + offset for match in re.finditer('\n', string))
+        self.firstLine = firstLine
+
+    def posistion(self, offset):
+        """
+        posistion(offset)
+
+        Convert a character offset into a line:col posistion.
+
+        Parameters
+        ----------
+        offset : int
+            Character offset into the indexed string
+
+        Returns
+        -------
+        list
+            Line, starting at 1, and column, starting at 0
+        """
+        line = bisect.bisect_right(self.offsets, offset)
+        return [line + self.firstLine - 1, offset - self.offsets[line-1]]
+
+    def __getstate__(self):
+        return self.offsets, self.firstLine
+
+    def __setstate__(self, state):
+        self.offsets, self.firstLine = state
+
+
+# resolvedPaths: Result of every path resolved by resolve_path, the resolved path
+# or None if it could not be resolved. Relative paths are keyed by the working 
+# directory they were resolved from as well.
+resolvedPaths = {}
+
+def resolve_path(value):
+    '''
+    Resolve a path found in SAS code, such as an %include or libname path.
+
+    Each unique path is only looked up on the filesystem once, failures included, 
+    until clear_resolved_paths is called, so the warning for a path that cannot be 
+    resolved is only logged once. Each sasProject build starts afresh. Setting 
+    the SASDOCS_NO_FILESYSTEM environment variable stops paths being looked up at 
+    all, they are then all treated as unresolved. 
+
+    Parameters
+    ----------
+    value : str
+        Path as written in the SAS code
+
+    Returns
+    -------
+    tuple
+        pathlib.Path, resolved if possible, and a bool that is True if the path 
+        was resolved.
+    '''
+    if os.environ.get('SASDOCS_NO_FILESYSTEM'):
+        return pathlib.Path(value), False
+
+    key = value if os.path.isabs(value) else (os.getcwd(), value)
+    if key not in resolvedPaths:
+        try:
+            with profiling.stage('resolve_path'):
+                resolvedPaths[key] = pathlib.Path(value).resolve(strict=True)
+        except Exception as e:
+            resolvedPaths[key] = None
+            log.warning("Unable to directly resolve path: {}".format(e))
+
+    resolved = resolvedPaths[key]
+    if resolved is None:
+        return pathlib.Path(value), False
+    return resolved, True
+
+
+def clear_resolved_paths():
+    '''
+    Forget every path resolved by resolve_path, so files created or removed since 
+    are seen. Called when a sasProject is built and by sasProject.refresh.
+    '''
+    resolvedPaths.clear()
+
+
 def flatten_list(aList):
     '''
-    Recursively dig through a list flattening all none list
-    objects into a single list. 
+    Dig through a list flattening all none list objects into a 
+    single list. Nested lists are walked with an explicit stack 
+    of iterators, so any depth of nesting can be flattened.
 
     Parameters
     ----------
@@ -22,49 +150,473 @@ def flatten_list(aList):
     list
         Flattened list containing all objects found in aList
     '''
-    rt = []
-    for item in aList:
-        if not isinstance(item, list):
-            rt.append(item)
+    return list(iter_flat(aList))
+
+
+def iter_flat(aList):
+    '''
+    Generator version of flatten_list, yielding each none list object
+    found in aList in order without building the flattened list.
+    '''
+    stack = [iter(aList)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, list):
+                stack.append(iter(item))
+                break
+            yield item
+        else:
+            stack.pop()
+
+
+class macroAssembler(object):
+    '''
+    Generate macro objects from the macroStart & macroEnd objects in a stream 
+    of parsed objects.
+
+    Objects are passed to add as they are parsed. Each macroStart opens a 
+    macro on an explicit stack and the objects that follow are added to its 
+    contents until the matching macroEnd, so macros can be nested to any depth.
+    A macro spans from its macroStart to its macroEnd where both were marked.
+    A macroEnd with no open macro is kept as it is. A macroStart still open 
+    when finish is called is kept, followed by its contents, in whatever 
+    contains it.
+
+    Attributes
+    ----------
+    output : list
+        Objects assembled outside of any macro
+    stack : list
+        macroStart and contents of each open macro, innermost last
+    '''
+
+    def __init__(self):
+        self.output = []
+        self.stack = []
+
+    def add(self, obj):
+        '''
+        Add a parsed object, or a list of objects, to the assembly.
+        '''
+        if isinstance(obj, list):
+            for item in iter_flat(obj):
+                self.add(item)
+        elif type(obj) == macroStart:
+            self.stack.append((obj, []))
+        elif type(obj) == macroEnd and self.stack:
+            start, contents = self.stack.pop()
+            assembled = macro(ref=start.name, arguments=start.arguments, options=start.options, contents=contents)
+            if hasattr(start, 'span') and hasattr(obj, 'span'):
+                if start.lines is obj.lines:
+                    assembled.set_found_span(start.span[0], obj.span[1], start.lines)
+                else:
+                    assembled.set_found_posistion(start.start, obj.end)
+            (self.stack[-1][1] if self.stack else self.output).append(assembled)
         else:
-            rt.extend(flatten_list(item))
-    return rt
+            (self.stack[-1][1] if self.stack else self.output).append(obj)
+
+    def drain(self):
+        '''
+        Return the objects assembled outside of any macro so far, excluding 
+        newlines, and remove them from the assembly. Objects inside a macro 
+        still open are kept until it is closed.
+
+        Returns
+        -------
+        list
+        '''
+        output = [obj for obj in self.output if obj != '\n']
+        self.output = []
+        return output
 
+    def finish(self):
+        '''
+        Close any macros left open and return the assembled objects not yet 
+        drained, excluding newlines.
 
-def rebuild_macros(objs, i=0):
+        Returns
+        -------
+        list
+            Parsed objects with macros rebuilt into single macro objects.
+        '''
+        while self.stack:
+            start, contents = self.stack.pop()
+            parent = self.stack[-1][1] if self.stack else self.output
+            parent.append(start)
+            parent.extend(contents)
+        return self.drain()
+
+
+def rebuild_macros(objs):
     '''
-    Recursively generate macro objects from macroStart & macroEnd objects in 
-    processed list
+    Generate macro objects from macroStart & macroEnd objects in 
+    processed list, see macroAssembler.
 
     Parameters
     ----------
     objs : list 
         list of sas objects
-    i : int
-        recursive safe loop variable
 
     Returns
     -------
     list
         A list of parsed objects with macros rebuilt into single macro objects.
     '''
-    output = []
-    while i < len(objs):
-        obj = objs[i]
-        if len(output) > 0 and type(output[0]) == macroStart and type(obj) == macroEnd:
-            return (macro(ref=output[0].name, arguments=output[0].arguments, options=output[0].options, contents=output[1:]), i)
-        elif type(obj) != macroStart or (type(obj) == macroStart and len(output)==0) :
-            output.append(obj)
-        else:
-            _, i = rebuild_macros(objs,i=i)
-            output.append(_)
-        i+=1
-    
-    return output, i
+    assembler = macroAssembler()
+    assembler.add(objs)
+    return assembler.finish()
+
+
+class budgetExceeded(Exception):
+    """
+    Raised when parsing goes over a parseBudget.
+
+    parsers.scan raises it when a statement needs to look further ahead than the
+    step budget allows, force_partial_parse then leaves that statement unparsed 
+    and carries on. force_partial_parse raises it itself when the time budget for
+    the whole string runs out, with the objects parsed up to that point.
+
+    Attributes
+    ----------
+    parser : str
+        Name of the scanning parser that hit the step budget, or when the time 
+        budget ran out the keyword of the statements most of it was spent on
+    posistion : int
+        Character offset the parser started at or parsing stopped at
+    parsed : list or None
+        Objects parsed before the time budget ran out
+    rate : float or None
+        Parsed rate of the string, counting everything not reached as unparsed
+    """
+
+    def __init__(self, parser, posistion, parsed=None, rate=None):
+        super().__init__(parser, posistion)
+        self.parser = parser
+        self.posistion = posistion
+        self.parsed = parsed
+        self.rate = rate
+
+
+class parseBudget(object):
+    """
+    Limits on the work force_partial_parse does on one string, so a single 
+    pathological program cannot stall a project build.
+
+    Attributes
+    ----------
+    seconds : float or None
+        Wall time allowed for parsing the whole string. Checked between statements,
+        once it has run out budgetExceeded is raised. None by default, as parse 
+        time grows with the size of the program and any fixed limit would cut 
+        large programs short.
+    steps : int or None
+        Number of characters past its start a statement's scanning parsers may 
+        search, see parsers.scan. Statements that need more are left unparsed. 
+        Only applied to lexed strings.
+    clock : callable
+        Returns the current time in seconds that seconds is measured against, 
+        time.perf_counter by default
+    """
+
+    def __init__(self, seconds=None, steps=1000000, clock=time.perf_counter):
+        self.seconds = seconds
+        self.steps = steps
+        self.clock = clock
+
+    def __repr__(self):
+        return 'parseBudget(seconds={}, steps={})'.format(self.seconds, self.steps)
+
 
+def get_budget(budget):
+    """
+    get_budget(budget)
+
+    Normalise the budget argument accepted by sasProgram and sasProject.
+
+    Parameters
+    ----------
+    budget : None, bool or parseBudget
+        None uses the default parseBudget, a step limit and no time limit. A 
+        time limit in seconds is taken from the SASDOCS_PARSE_BUDGET environment
+        variable if set, 0 for no time limit. False disables both limits.
 
-def force_partial_parse(parser, string, stats=False, mark=False):
+    Returns
+    -------
+    parseBudget
+    """
+    if budget is None:
+        seconds = os.environ.get('SASDOCS_PARSE_BUDGET', '')
+        if seconds == '':
+            return parseBudget()
+        return parseBudget(seconds=float(seconds) or None)
+    if budget is False:
+        return parseBudget(seconds=None, steps=None)
+    return budget
+
+
+class partialParse(object):
+    """
+    State of a forced partial parse, carried from one piece of a program to the
+    next when it is parsed in pieces, see force_partial_parse and iter_partial_parse.
+
+    Attributes
+    ----------
+    parser : parsy.parser
+        Parser run at each statement
+    mark : bool
+        Record the character offsets each object was parsed at
+    budget : parseBudget or None
+        Limits on the time and lookahead spent parsing
+    assembler : macroAssembler
+        Assembles the parsed objects into macros
+    length : int
+        Number of characters in the pieces of the program read so far
+    skips : int
+        Number of characters passed over unparsed
+    exceeded : list
+        Name and line:col posistion of each statement left unparsed for 
+        exceeding the step budget
+    resync : bool
+        The last piece ended while looking for the next statement start, so the 
+        search carries on from where it stopped in the next piece
+    """
+
+    def __init__(self, parser, mark=False, budget=None):
+        self.parser = parser
+        self.mark = mark
+        self.budget = budget
+        self.assembler = macroAssembler()
+        self.length = 0
+        self.skips = 0
+        self.exceeded = []
+        self.resync = False
+        self.spent = {}
+        self.deadline = None
+        if budget is not None and budget.seconds is not None:
+            self.clock = budget.clock
+            self.deadline = self.clock() + budget.seconds
+
+    @property
+    def parsedRate(self):
+        return 1 - self.skips/self.length if self.length else 1.0
+
+    def next_statement(self, masked, posistion, stop, end):
+        """
+        Offset of the first point at or after posistion a SAS statement could start 
+        at. Given end, the search is cut off at stop and resync is set, as a 
+        keyword may be split across the end of the piece.
+        """
+        nextStart = statementStart.search(masked, posistion)
+        nextPosistion = len(masked) if nextStart is None else nextStart.start()
+        self.resync = end is not None and nextPosistion > stop
+        return stop if self.resync else nextPosistion
+
+    def parse(self, string, posistion=0, end=None, offset=0, firstLine=1):
+        """
+        parse(string, posistion=0, end=None, offset=0, firstLine=1)
+
+        Parse string from posistion, adding the objects found to the assembler.
+        When nothing can be parsed at the current posistion, parsing resumes at 
+        the next point a SAS statement could start (see statementStart), counting 
+        every character passed over as skipped.
+
+        Given end, string is a piece of a larger program that carries on after it.
+        Only statements starting before end are parsed, and a statement whose 
+        scanning parsers would need to search past end stops the parse so it can 
+        be parsed again once more of the program has been read.
+
+        Parameters
+        ----------
+        string : str or lexer.maskedSource
+            Program, or piece of a program, to parse
+        posistion : int
+            Offset into string to start parsing at
+        end : int, optional
+            Offset no statement may start at or after, string must be lexed
+        offset : int
+            Offset of string in the program, added to the spans of parsed objects
+        firstLine : int
+            Line number of the first line of string in the program
+
+        Returns
+        -------
+        int
+            Offset parsing stopped at, len(string) if end is not given
+
+        Raises
+        ------
+        budgetExceeded
+            If the time budget runs out, with the rate parsed so far
+        """
+        parser = self.parser
+        assembler = self.assembler
+        masked = getattr(string, 'masked', string)
+        olen = len(string)
+        stop = olen if end is None else end
+        lines = lineIndex(string, offset, firstLine) if self.mark else None
+        deadline = self.deadline
+        spent = self.spent
+        steps = None
+        limit = None
+        exceeded = []
+        if deadline is not None:
+            clock = self.clock
+            last = clock()
+            keyword = None
+        if isinstance(string, lexer.maskedSource):
+            if self.budget is not None:
+                steps = self.budget.steps
+            limit = end
+
+        if self.resync:
+            nextPosistion = self.next_statement(masked, posistion, stop, end)
+            self.skips += nextPosistion - posistion
+            posistion = nextPosistion
+
+        while posistion < stop:
+
+            if deadline is not None:
+                now = clock()
+                if keyword is not None:
+                    spent[keyword] = spent.get(keyword, 0.0) + now - last
+                if now > deadline:
+                    keyword = statementKeyword.match(masked, posistion).group(0)
+                    raise budgetExceeded(max(spent, key=spent.get) if spent else keyword, offset + posistion, 
+                                         rate=1-(self.skips+olen-posistion)/self.length)
+                last = now
+                keyword = statementKeyword.match(masked, posistion).group(0)
+
+            if steps is not None:
+                string.limit = posistion + steps if limit is None else min(posistion + steps, limit)
+            elif limit is not None:
+                string.limit = limit
+            try:
+                result = parser(string, posistion)
+            except budgetExceeded as e:
+                if limit is not None and string.limit == limit:
+                    break
+                exceeded.append(e)
+                result = None
+
+            if result is None or not result.status or result.value is None or result.index <= posistion:
+                nextPosistion = self.next_statement(masked, posistion+1, stop, end)
+                self.skips += nextPosistion - posistion
+                posistion = nextPosistion
+                continue
+            
+            obj = result.value
+            if lines is not None and not isinstance(obj,str):
+                if isinstance(obj,list):
+                    for x in obj:
+                        x.set_found_span(offset + posistion, offset + result.index, lines)
+                else:
+                    obj.set_found_span(offset + posistion, offset + result.index, lines)
+            
+            assembler.add(obj)
+            posistion = result.index
+
+        if exceeded:
+            lines = lines or lineIndex(string, offset, firstLine)
+            self.exceeded.extend((e.parser, lines.posistion(offset + e.posistion)) for e in exceeded)
+        return posistion
+
+    def stream(self, chunks):
+        """
+        stream(chunks)
+
+        Parse a program read in pieces, yielding each object outside of a macro, 
+        and each rebuilt macro, as soon as it has been parsed.
+
+        Each piece is added to the text left over from the last, lexed, and parsed
+        up to its last ; so no statement is started that may carry on into the next
+        piece. If a quoted string is still open at the end of the text, the parse 
+        stops before the statement it is in, as the string may be closed, and hold
+        more ;, in the next piece. Text from the start of the line the parse stopped 
+        on, outside of any comment or string, is carried over to the next piece, so 
+        only the statements in the piece being parsed, the contents of any open 
+        macros and the objects not yet consumed are held in memory. A statement is 
+        carried over for at most the step budget, after which it is left unparsed, 
+        so without a step budget a statement that never ends is read to the end of 
+        the program.
+
+        Parameters
+        ----------
+        chunks : iterable
+            Pieces of the program, str
+
+        Yields
+        ------
+        sasdocs.object
+
+        Raises
+        ------
+        budgetExceeded
+            If the time budget runs out, after yielding the objects parsed so far
+        """
+        steps = None if self.budget is None else self.budget.steps
+        buffer = ''
+        posistion = 0
+        offset = 0
+        firstLine = 1
+        try:
+            for chunk in chunks:
+                self.length += len(chunk)
+                buffer += chunk
+                with profiling.stage('lex'):
+                    string = lexer.lex(buffer)
+                end = string.masked.rfind(';', 0, len(buffer) - 1) + 1
+                if string.unclosed is not None:
+                    end = min(end, string.masked.rfind(';', 0, string.unclosed) + 1)
+                if end <= posistion:
+                    if steps is None or len(buffer) - posistion <= steps:
+                        continue
+                    end = len(buffer) - 1
+                posistion = self.parse(string, posistion, end=end, offset=offset, firstLine=firstLine)
+                yield from self.assembler.drain()
+
+                lineStart = string.masked.rfind('\n', 0, posistion) + 1
+                firstLine += buffer.count('\n', 0, lineStart)
+                offset += lineStart
+                buffer = buffer[lineStart:]
+                posistion -= lineStart
+
+            with profiling.stage('lex'):
+                string = lexer.lex(buffer)
+            self.parse(string, posistion, offset=offset, firstLine=firstLine)
+        except budgetExceeded:
+            yield from self.assembler.finish()
+            raise
+        self.warn_exceeded()
+        yield from self.assembler.finish()
+
+    def warn_exceeded(self):
+        """
+        warn_exceeded()
+
+        Log the statements left unparsed for exceeding the step budget, if any.
+        """
+        if self.exceeded:
+            log.warning("Parse step budget of {} characters exceeded, left unparsed: {}".format(
+                self.budget.steps, ', '.join('{} at {}:{}'.format(name, *posistion) for name, posistion in self.exceeded[:10])
+                + (', and {} more'.format(len(self.exceeded) - 10) if len(self.exceeded) > 10 else '')
+            ))
+
+
+def force_partial_parse(parser, string, stats=False, mark=False, lex=True, budget=None):
     """Force partial parse of string skipping unparsable characters
+
+    The parser is run at an offset into the original string rather than on
+    ever shorter copies of it. When nothing can be parsed at the current
+    offset, parsing resumes at the next point a SAS statement could start 
+    (see statementStart), counting every character passed over as skipped.
+
+    Before parsing the string is passed through the lexer, which blanks out 
+    comments, quoted strings and inline data in a copy of it. Parsers that 
+    scan ahead and the search for the next statement use the copy, so neither
+    stops inside one of them.
+
+    Given a parseBudget, statements that scan further ahead than its steps are
+    left unparsed and budgetExceeded is raised if its seconds run out.
     
     Parameters
     ----------
@@ -75,64 +627,96 @@ def force_partial_parse(parser, string, stats=False, mark=False):
     stats : bool
         Return percentage parsed if true
     mark : bool
-        Turn on line:col marking on the parser to identify what point in 
-        string the object was parsed at. 
+        Record the character offsets each object was parsed at, from which
+        its line:col start and end are worked out, see set_found_span.
+    lex : bool
+        Run the lexer before parsing, see lexer.lex.
+    budget : parseBudget, optional
+        Limits on the time and lookahead spent parsing, unlimited by default
 
     Returns
     -------
     list
         parsed objects from string"""
-    if mark:
-        parser = parser.mark()
     if isinstance(string, str):
-        parsed = []
-        olen = len(string)
-        skips = 0
-        lastPosistion = (1, 0)
-
-        while len(string) > 0:
-            
-            partialParse, string = parser.parse_partial(string)
-            
-            if mark:
-                start, obj, end = partialParse
-                start = [sum(x) for x in zip(start, lastPosistion)]
-                if end[0] == 0:
-                    lastPosistion = [sum(x) for x in zip(end, lastPosistion)]
-                else:
-                    lastPosistion = [end[0]+lastPosistion[0], end[1]]
-            else:
-                obj = partialParse
-
-            if obj is None:
-                string = string[1:]
-                skips += 1
-                lastPosistion = [lastPosistion[0], lastPosistion[1]+1]
-            else:
-                if mark and not isinstance(obj,str):
-                    if isinstance(obj,list):
-                        for x in obj:
-                            x.set_found_posistion(start,lastPosistion)
-                    else:
-                        obj.set_found_posistion(start,lastPosistion)
-                
-                parsed.append(obj)
-                
-
-        # print("Parsed: {:.2%}".format(1-(skips/olen)))
-        flattened = flatten_list(parsed)
-        parsed = rebuild_macros(flattened)[0]
-        if type(parsed) == list:
-            ret = [p for p in parsed if p != '\n']
-        else:
-            ret = [parsed]
+        if lex:
+            with profiling.stage('lex'):
+                string = lexer.lex(string)
+        state = partialParse(parser, mark=mark, budget=budget)
+        state.length = len(string)
+        try:
+            state.parse(string)
+        except budgetExceeded as e:
+            with profiling.stage('rebuild_macros'):
+                e.parsed = state.assembler.finish()
+            raise
+        state.warn_exceeded()
+        with profiling.stage('rebuild_macros'):
+            ret = state.assembler.finish()
         if stats:
-            return (ret, (1-skips/olen))
+            return (ret, state.parsedRate)
         else:
             return ret
     else:
         return []
 
+
+def split_program(string, segments):
+    """
+    split_program(string, segments)
+
+    Split a SAS program into about segments pieces of similar length that can 
+    be parsed independently of one another, see splitPoint. Pieces start at the 
+    start of a line and fewer are returned if the program has too few places 
+    it can be split.
+
+    Parameters
+    ----------
+    string : str or lexer.maskedSource
+        SAS program
+    segments : int
+        Number of pieces to aim for
+
+    Returns
+    -------
+    list
+        Character offsets each piece starts and ends at
+    """
+    masked = getattr(string, 'masked', None)
+    if masked is None:
+        masked = lexer.lex(string).masked
+    size = len(masked) / max(segments, 1)
+    starts = [0]
+    for match in splitPoint.finditer(masked):
+        if match.end() - starts[-1] >= size:
+            starts.append(match.end())
+    return list(zip(starts, starts[1:] + [len(masked)]))
+
+
+def iter_partial_parse(parser, chunks, mark=False, budget=None):
+    """Force partial parse of a program read in pieces, yielding objects as they are parsed
+
+    Parses as force_partial_parse without ever holding the whole program in 
+    memory, see partialParse.stream. Use partialParse directly to read the 
+    parsed rate once the objects have been consumed.
+
+    Parameters
+    ----------
+    parser : parsy.parser
+        parsy valid parsing object
+    chunks : iterable
+        Pieces of the program, str
+    mark : bool
+        Record the character offsets, from the start of the program, each object 
+        was parsed at
+    budget : parseBudget, optional
+        Limits on the time and lookahead spent parsing, unlimited by default
+
+    Yields
+    ------
+    sasdocs.object"""
+    yield from partialParse(parser, mark=mark, budget=budget).stream(chunks)
+
 # SAS object classes 
 # Class objects are roughly equivalent to abstracted SAS concepts
 # as such they are 
@@ -145,11 +729,65 @@ def force_partial_parse(parser, string, stats=False, mark=False):
 #     - libname
 #     - include
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class baseSASObject:
     """
     Base object containing general functions used by all SAS objects
+
+    All SAS objects are slotted and declare every attribute up front, including 
+    those set after init, so parsed objects carry no instance __dict__. Attributes
+    that are only set in some cases are left unset rather than defaulted.
+
+    Attributes
+    ----------
+    start : list
+        Line and character the object starts at, see set_found_span
+    end : list
+        Line and character the object ends at, see set_found_span
+    span : tuple
+        Character offsets the object starts and ends at, or the start and end 
+        posistions if set with set_found_posistion
+    lines : lineIndex or None
+        Index used to convert span to start and end
+    parent : macro or None
+        Macro the object was defined in, set by sasProgram.build_object_index, see
+        sasdocs.program.iter_objects
     """
+    span = attr.ib(init=False, repr=False, eq=False)
+    lines = attr.ib(init=False, repr=False, eq=False)
+    parent = attr.ib(init=False, repr=False, eq=False)
+
+    @property
+    def start(self):
+        if self.lines is None:
+            return self.span[0]
+        return self.lines.posistion(self.span[0])
+
+    @property
+    def end(self):
+        if self.lines is None:
+            return self.span[1]
+        return self.lines.posistion(self.span[1])
+
+    def set_found_span(self, start, end, lines):
+        """
+        set_found_span(start, end, lines)
+
+        Set the character offsets the object was found at. Used during 
+        force_partial_parse with mark=True, the start and end line:char
+        posistions are only worked out from lines when they are accessed.
+
+        Parameters
+        ----------
+        start : int 
+            Offset of the first character of the object
+        end : int
+            Offset of the character after the object
+        lines : lineIndex
+            Line index of the parsed string
+        """
+        self.span = (start, end)
+        self.lines = lines
 
     def set_found_posistion(self, start, end):
         """
@@ -166,11 +804,11 @@ class baseSASObject:
         end : tuple 
             The end line:char tuple for the objet 
         """
-        self.start = start
-        self.end = end
+        self.span = (start, end)
+        self.lines = None
 
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroVariable(baseSASObject):
     """
     Abstracted python class to reference the SAS macro variable.
@@ -188,7 +826,7 @@ class macroVariable(baseSASObject):
     def __str__(self):
         return self.variable
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class comment(baseSASObject):
     """
     Abstracted python class to reference the SAS comment.
@@ -209,7 +847,7 @@ class comment(baseSASObject):
     """
     text = attr.ib()
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroVariableDefinition(baseSASObject):
     """
     Abstracted python class for the definition and assignment of macro varaibles.
@@ -241,7 +879,7 @@ class macroVariableDefinition(baseSASObject):
     variable = attr.ib()
     value = attr.ib()
 
-@attr.s 
+@attr.s(slots=True, getstate_setstate=False)
 class include(baseSASObject):
     """
     Abstracted python class for %include statements in SAS code.
@@ -259,9 +897,16 @@ class include(baseSASObject):
     ----------
     path : str
         Hardcoded path used in the %include statement
+    rawPath : str
+        Path as written in the %include statement, see resolve
+    resolved : bool
+        True if path was found on the filesystem
 
     """
     path = attr.ib()
+    rawPath = attr.ib(init=False, repr=False, eq=False)
+    resolved = attr.ib(init=False, repr=False, eq=False)
+
     @path.validator
     def check_path_is_valid(self, attribute, value):
         """
@@ -278,17 +923,22 @@ class include(baseSASObject):
         -------
         None
         """
-        try:
-            self.path = pathlib.Path(value).resolve(strict=True)
-            self.resolved = True
-        except Exception as e:
-            self.path = pathlib.Path(value)
-            self.resolved = False
-            log.warning("Unable to directly resolve path: {}".format(e))
+        self.rawPath = value
+        self.resolve()
 
+    def resolve(self):
+        """
+        resolve()
+
+        Resolve rawPath against the filesystem, setting path and resolved. Run 
+        again on objects loaded from the parse cache, as the file may have been
+        created or removed since they were parsed.
+        """
+        self.path, self.resolved = resolve_path(self.rawPath)
 
 
-@attr.s
+
+@attr.s(slots=True, getstate_setstate=False)
 class dataArg(baseSASObject):
     """
     Abstracted python class for an argument applied to a dataset in SAS.
@@ -316,7 +966,74 @@ class dataArg(baseSASObject):
     setting = attr.ib(default=None, repr=True)
 
 
-@attr.s(repr=False)
+# dataIdentities: Canonical dataIdentity for every library.dataset spelling 
+# currently referenced in this process, see intern_data_identity.
+dataIdentities = weakref.WeakValueDictionary()
+
+def intern_data_identity(lib, ds):
+    """
+    intern_data_identity(lib, ds)
+
+    Return the canonical dataIdentity for a library.dataset spelling, creating it 
+    if this is the first live reference to it. 
+
+    Parameters
+    ----------
+    lib : str
+        Library name as written in the SAS code
+    ds : str
+        Dataset name as written in the SAS code
+
+    Returns
+    -------
+    dataIdentity
+    """
+    key = (lib, ds)
+    identity = dataIdentities.get(key)
+    if identity is None:
+        name = lib + '.' + ds
+        identity = dataIdentity(sys.intern(lib), sys.intern(ds), sys.intern(name), sys.intern(name.upper()))
+        dataIdentities[key] = identity
+    return identity
+
+
+@attr.s(slots=True, eq=False, repr=False)
+class dataIdentity:
+    """
+    Identity of a dataset shared by every dataObject referencing it with the same 
+    spelling. 
+
+    Identities are interned by intern_data_identity, so references to the same dataset 
+    share one record and the same strings, and identities can be compared with `is`. 
+    All spellings of a dataset share one interned UID string. Unpickling an identity, 
+    for example when programs are returned from a worker process or loaded from 
+    the parse cache, interns it again. The parsed library and dataset stay on each 
+    dataObject, so a reference is the same whichever references were parsed before it.
+
+    Attributes
+    ----------
+    _lib : str
+        Library name as written in the SAS code
+    _ds : str
+        Dataset name as written in the SAS code
+    name : str
+        String of the form 'library.dataset'
+    UID : str
+        Upcased version of name, the dataset's unique identifier
+    """
+    _lib = attr.ib()
+    _ds = attr.ib()
+    name = attr.ib()
+    UID = attr.ib()
+
+    def __reduce__(self):
+        return (intern_data_identity, (self._lib, self._ds))
+
+    def __repr__(self):
+        return self.name
+
+
+@attr.s(repr=False, slots=True, getstate_setstate=False)
 class dataObject(baseSASObject):
     """
     Abstracted python class for data objects created and used by SAS datasteps and procedures.
@@ -337,6 +1054,10 @@ class dataObject(baseSASObject):
     dataObjects have a `name` attribute which is the combination of the library and the datastep names seperated
     by a period. For internal linking they also have a UID attribute which is the upcased version of the name attribute.
 
+    The names are held in a dataIdentity shared by all references to the dataset. Each dataObject 
+    holds what is particular to the reference, its library and dataset as parsed, its options 
+    and position.
+
 
     Attributes
     ----------
@@ -346,6 +1067,8 @@ class dataObject(baseSASObject):
         Name used to reference the dataset in the code
     options : [dataArg]
         Options applied to the dataset at a particular point 
+    identity : dataIdentity
+        Canonical identity of the dataset
     name : str
         String of the form 'library.dataset'
     UID : str
@@ -354,30 +1077,46 @@ class dataObject(baseSASObject):
     library = attr.ib()
     dataset = attr.ib()
     options = attr.ib(default=None)
+    identity = attr.ib(init=False, repr=False, eq=False)
 
     def __attrs_post_init__(self):
         if self.library is None:
             self.library = 'work'
         
         if type(self.library) == list:
-            self._lib = ''.join([s if type(s) != macroVariable else s.variable for s in self.library])
+            lib = ''.join([s if type(s) != macroVariable else s.variable for s in self.library])
         else:
-            self._lib = str(self.library)
+            lib = str(self.library)
         
         if type(self.dataset) == list:
-            self._ds = ''.join([s if type(s) != macroVariable else s.variable for s in self.dataset])
+            ds = ''.join([s if type(s) != macroVariable else s.variable for s in self.dataset])
         else:
-            self._ds = str(self.dataset)
+            ds = str(self.dataset)
+
+        self.identity = intern_data_identity(lib, ds)
+
+    @property
+    def _lib(self):
+        return self.identity._lib
+
+    @property
+    def _ds(self):
+        return self.identity._ds
 
-        self.name = (self._lib + '.' + self._ds)
-        self.UID = self.name.upper()
+    @property
+    def name(self):
+        return self.identity.name
+
+    @property
+    def UID(self):
+        return self.identity.UID
         
     def __repr__(self):
         return self.name
     def __str__(self):
         return self.name
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class dataStep(baseSASObject):
     """
     Abstracted python class for parsing datasteps
@@ -421,7 +1160,7 @@ class dataStep(baseSASObject):
         if self.inputs is None:
             self.inputs = []
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class procedure(baseSASObject):
     """
     Abstracted python class for parsing procedures.
@@ -461,7 +1200,7 @@ class procedure(baseSASObject):
         
         self.type=self.type.lower()
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class unparsedSQLStatement(baseSASObject):
     """
     Abstracted class for unparsed SQL statements found in
@@ -477,7 +1216,7 @@ class unparsedSQLStatement(baseSASObject):
 
     text = attr.ib()
 
-@attr.s 
+@attr.s(slots=True, getstate_setstate=False)
 class libname(baseSASObject):
     """
     Abstracted python class for libname statements.
@@ -508,10 +1247,18 @@ class libname(baseSASObject):
         Define whether the libname statement is an explicit path or a pointer
     uri : string
         URL safe version of the path variable
+    rawPath : str, optional
+        Path as written in the libname statement, see resolve
     """
     library = attr.ib()
     path = attr.ib()
     pointer = attr.ib(default=None)
+    rawPath = attr.ib(init=False, repr=False, eq=False)
+    is_path = attr.ib(init=False, repr=False, eq=False)
+    uri = attr.ib(init=False, repr=False, eq=False)
+    resolved = attr.ib(init=False, repr=False, eq=False)
+    type = attr.ib(init=False, repr=False, eq=False)
+    name = attr.ib(init=False, repr=False, eq=False)
 
 
     @path.validator
@@ -531,17 +1278,24 @@ class libname(baseSASObject):
         None
         """      
         
-        if self.path is not None:
+        self.rawPath = value
+        self.resolve()
+
+    def resolve(self):
+        """
+        resolve()
+
+        Resolve rawPath against the filesystem, setting path, resolved and uri.
+        Run again on objects loaded from the parse cache, as the library may have
+        been created or removed since they were parsed.
+        """
+        if self.rawPath is not None:
             self.is_path = True
-            try:
-                self.path = pathlib.Path(value).resolve(strict=True)
+            self.path, self.resolved = resolve_path(self.rawPath)
+            if self.resolved:
                 self.uri = self.path.as_uri()
-                self.resolved = True
-            except Exception as e:
-                self.path = pathlib.Path(value)
-                self.uri = pathlib.Path(value)
-                self.resolved = False
-                log.warning("Unable to directly resolve path: {}".format(e))
+            else:
+                self.uri = self.path
         else:
             self.path = None
             self.uri = ''
@@ -557,7 +1311,7 @@ class libname(baseSASObject):
         self.name = ''.join([s if type(s) != macroVariable else s.variable for s in self.library])
 
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroStart(baseSASObject):
     """
     Flagging class for start of %macro definition
@@ -575,7 +1329,7 @@ class macroStart(baseSASObject):
     arguments = attr.ib()
     options = attr.ib(default=None)
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroEnd(baseSASObject):
     """
     Flagging class for end of %macro definition
@@ -588,7 +1342,7 @@ class macroEnd(baseSASObject):
     text = attr.ib()
 
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroargument(baseSASObject):
     """
     Abstracted python class for parsing a macro argument defintion.
@@ -620,6 +1374,9 @@ class macroargument(baseSASObject):
     arg = attr.ib()
     default = attr.ib()
     doc = attr.ib()
+    _arg = attr.ib(init=False, repr=False, eq=False)
+    _default = attr.ib(init=False, repr=False, eq=False)
+    _doc = attr.ib(init=False, repr=False, eq=False)
 
     def __attrs_post_init__(self):
         if self.arg is not None:
@@ -630,7 +1387,7 @@ class macroargument(baseSASObject):
         if isinstance(self.doc, comment):
             self._doc = self.doc.text
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macro(baseSASObject):
     """
     Abstracted python class for SAS macro.
@@ -675,6 +1432,11 @@ class macro(baseSASObject):
     arguments = attr.ib()
     contents = attr.ib(repr=False)
     options = attr.ib(default=None)
+    name = attr.ib(init=False, repr=False, eq=False)
+    rawAbout = attr.ib(init=False, repr=False, eq=False)
+    documented = attr.ib(init=False, repr=False, eq=False)
+    about = attr.ib(init=False, repr=False, eq=False)
+    shortDesc = attr.ib(init=False, repr=False, eq=False)
 
     def __attrs_post_init__(self):
         self.name = ''.join(self.ref)
@@ -699,7 +1461,7 @@ class macro(baseSASObject):
         self.shortDesc = re.sub(r'\s+',' ',self.shortDesc)       
 
 
-@attr.s
+@attr.s(slots=True, getstate_setstate=False)
 class macroCall(baseSASObject):
     """
     Abstracted python class for SAS macro call.
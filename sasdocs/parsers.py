@@ -3,11 +3,65 @@ import parsy as ps
 
 from . import objects
 
+# parserVersion: Version of the grammar and the objects it produces. Increment 
+# whenever a change alters parse results so cached parses are invalidated.
+parserVersion = 15
 
 # Parsy Objects
 # Define reFlags as ignorecase and dotall to capture new lines
 reFlags = re.IGNORECASE|re.DOTALL
 
+def scan(pattern, name, stop=None, flags=reFlags):
+    """
+    scan(pattern, name, stop=None, flags=reFlags)
+
+    Generate a regex parser for patterns that scan forward through the code 
+    looking for a keyword. If the stream is a lexer.maskedSource the pattern is 
+    matched against its masked copy, so it passes over comments, quoted strings
+    and inline data without stopping on keywords inside them. The text matched
+    is returned from the stream itself.
+
+    If the stream has a limit, set by force_partial_parse from a parseBudget, 
+    the search stops there and raises objects.budgetExceeded if it fails or 
+    reaches the limit, as it cannot be told whether looking further would have
+    matched. Patterns that never search past stop are matched as normal when 
+    stop is found before the limit, and raise when it is not.
+
+    Parameters
+    ----------
+    pattern : str
+        Regular expression
+    name : str
+        Name of the parser, reported when it exceeds the step budget
+    stop : str, optional
+        Regular expression the pattern does not search past
+    flags : int
+        re flags of the expression
+
+    Returns
+    -------
+    parsy.Parser
+    """
+    exp = re.compile(pattern, flags)
+    stopExp = None if stop is None else re.compile(stop, flags)
+
+    @ps.Parser
+    def scanner(stream, index):
+        text = getattr(stream, 'masked', stream)
+        limit = getattr(stream, 'limit', None)
+        if limit is None or limit >= len(text) or (stopExp is not None and stopExp.search(text, index, limit)):
+            match = exp.match(text, index)
+        elif stopExp is not None:
+            raise objects.budgetExceeded(name, index)
+        else:
+            match = exp.match(text, index, limit)
+            if match is None or match.end() >= limit:
+                raise objects.budgetExceeded(name, index)
+        if match:
+            return ps.Result.success(match.end(), stream[index:match.end()])
+        return ps.Result.failure(index, name)
+    return scanner
+
 # Basic Objects
 # Basic and reused parsy objects referencing various recurring 
 # regex objects
@@ -59,21 +113,36 @@ _mcv = (amp + wrd + opdot)
 mcv = (_mcv | amp + _mcv + _mcv).map(objects.macroVariable)
 
 # Inline comment: start + commentry + semicolon
-inlinecmnt = star >> ps.regex(r'[^;]+') << col
+inlinecmnt = star >> scan(r'[^;]+', 'inline comment', stop=';') << col
 # Multiline comment: Commentary start + commentry + Commentry end
-multicmnt = comstart >> ps.regex(r'.+?(?=\*\/)', flags=reFlags) << comend
+multicmnt = comstart >> scan(r'.+?(?=\*\/)', 'comment') << comend
 
 # Either inline or multiline comment, mapped to comment object
 cmnt = (inlinecmnt|multicmnt).map(objects.comment)
 
 # Complex SAS Objects
 # sasName: Any named object in SAS, can contain macrovariable as part of name
-sasName = (wrd|mcv).at_least(1)
+fullSasName = (wrd|mcv).at_least(1)
+
+# wordName: sasName made of a single word, the most common form. Names that carry 
+# on into a macro variable are left to the full grammar.
+wordName = re.compile(r'[a-zA-Z0-9_\-]+(?![a-zA-Z0-9_\-&])')
+
+@ps.Parser
+def sasName(stream, index):
+    """
+    Parse a sasName, matching a single word name with wordName in one step
+    rather than through the wrd and mcv parsers.
+    """
+    match = wordName.match(stream, index)
+    if match is None:
+        return fullSasName(stream, index)
+    return ps.Result.success(match.end(), [match.group()])
 
 # Marcovariable definition:
 mcvDef = ps.seq(
     variable =ps.regex(r'%let',flags=reFlags) + spc + opspc >> sasName << opspc + eq,
-    value = ps.regex(r'[^;]+', flags=reFlags).optional(),
+    value = scan(r'[^;]+', 'macro variable value', stop=';').optional(),
     _col = col
 ).combine_dict(objects.macroVariableDefinition)
 
@@ -88,7 +157,7 @@ datalineArg = ps.seq(
 # e.g. keep=A B C 
 datalineArgNB = ps.seq(
     option = sasName << (opspc + eq + opspc), 
-    setting = ps.regex(r'[^;]*?(?=\s+\w+\s*=)|[^\);]*?(?=\))|.*?(?=;)', flags=reFlags)
+    setting = scan(r'[^;]*?(?=\s+\w+\s*=)|[^\);]*?(?=\))|.*?(?=;)', 'dataline option', stop=';')
 ).combine_dict(objects.dataArg)
 
 datalineArgPt = ps.seq(
@@ -105,12 +174,33 @@ datalineOptions = lb + opspc >> (datalineArg|datalineArgPt|datalineArgNB|sasName
 #   - dataset: sasName after . or just sasName required
 #   - options: dataLineOptions is present
 
-dataObj = ps.seq(
+dataObjOptions = (opspc >> datalineOptions).optional()
+
+fullDataObj = ps.seq(
     library = (sasName << dot).optional(),
     dataset = (dot >> sasName) | sasName,
-    options = (opspc >> datalineOptions).optional()
+    options = dataObjOptions
 ).combine_dict(objects.dataObject)
 
+# dataObjName: library.dataset or dataset made of single words, the name of most
+# dataObjs. Names it does not match, or that carry on into a macro variable or a 
+# further ., are left to the full grammar.
+dataObjName = re.compile(r'(?:(?P<library>[a-zA-Z0-9_\-]+)\.)?(?P<dataset>[a-zA-Z0-9_\-]+)(?![a-zA-Z0-9_\-&.])')
+
+@ps.Parser
+def dataObj(stream, index):
+    """
+    Parse a dataObj, matching its name with dataObjName in one step where it can 
+    rather than through the sasName parsers, giving the same object as fullDataObj.
+    """
+    match = dataObjName.match(stream, index)
+    if match is None:
+        return fullDataObj(stream, index)
+    library, dataset = match.group('library', 'dataset')
+    options = dataObjOptions(stream, match.end())
+    return ps.Result.success(options.index, objects.dataObject(
+        library=None if library is None else [library], dataset=[dataset], options=options.value))
+
 # dataLine: Multiple dataObjs seperated by space
 dataLine = dataObj.sep_by(spc)
 
@@ -125,9 +215,9 @@ datastep = ps.seq(
     outputs = (ps.regex(r'\bdata\b', flags=re.IGNORECASE) + spc) >> dataLine,
     options = (opspc + fs + opspc >> (datalineArg|datalineArgPt|datalineArgNB|sasName).sep_by(spc)).optional(), 
     _col = opspc + col,
-    header = (ps.regex(r'(?:(?!run).)*(?=\bset\b|\bmerge\b)', flags=reFlags)).optional(),
+    header = (scan(r'(?:(?!run).)*(?=\bset\b|\bmerge\b)', 'datastep header', stop='run')).optional(),
     inputs = ((opspc + ps.regex(r'\bset\b|\bmerge\b',flags=re.IGNORECASE) + opspc) >> dataLine << opspc + col).optional(),
-    body = ps.regex(r'.*?(?=\brun\b)', flags=reFlags),
+    body = scan(r'.*?(?=\brun\b)', 'datastep body'),
     _run = run + opspc + col
 ).combine_dict(objects.dataStep)
 
@@ -139,11 +229,11 @@ datastep = ps.seq(
 
 proc = ps.seq(
     type = (ps.regex(r'proc', flags=re.IGNORECASE) + spc) >> wrd << spc,
-    _h1 = ps.regex(r'.*?(?=data)', flags=reFlags),
+    _h1 = scan(r'.*?(?=data)', 'proc header'),
     inputs = (ps.regex(r'data', flags=re.IGNORECASE) + opspc + eq + opspc) >> dataObj,
-    _h2 = ps.regex(r'.*?(?=out\s*=)', flags=reFlags).optional(),
-    outputs = ((ps.regex(r'out', flags=re.IGNORECASE) + opspc + eq + opspc) >> dataObj).sep_by(ps.regex(r'(?:(?!run|quit).)*?(?=out\s*=)', flags=reFlags)).optional(),
-    _h3 = ps.regex(r'.*?(?=run|quit)', flags=reFlags),
+    _h2 = scan(r'.*?(?=out\s*=)', 'proc input options').optional(),
+    outputs = ((ps.regex(r'out', flags=re.IGNORECASE) + opspc + eq + opspc) >> dataObj).sep_by(scan(r'(?:(?!run|quit).)*?(?=out\s*=)', 'proc outputs', stop='run|quit')).optional(),
+    _h3 = scan(r'.*?(?=run|quit)', 'proc end'),
     _run = (run|qt) + opspc + col
 ).combine_dict(objects.procedure)
 
@@ -151,19 +241,19 @@ proc = ps.seq(
 
 crtetbl = ps.seq(
     outputs = ps.regex(r'create table', flags=reFlags) + opspc >> dataObj.sep_by(opspc+cmm+opspc) <<  opspc + ps.regex(r'as'),
-    inputs = (ps.regex(r'[^;]*?from', flags=reFlags) + spc + opspc >> dataObj.sep_by(opspc+cmm+opspc)).many(),
-    _h = ps.regex(r'[^;]*?(?=;)', flags=reFlags) + col
+    inputs = (scan(r'[^;]*?from', 'create table inputs', stop=';') + spc + opspc >> dataObj.sep_by(opspc+cmm+opspc)).many(),
+    _h = scan(r'[^;]*?(?=;)', 'create table end', stop=';') + col
 ).combine_dict(objects.procedure)
 
 # unparsedSQL: Capture currently unparsed SQL statements
 
-unparsedSQL = ps.regex(r'[^;]*?;(?<!quit;)', flags=reFlags).map(objects.unparsedSQLStatement)
+unparsedSQL = scan(r'[^;]*?;(?<!quit;)', 'sql statement', stop=';').map(objects.unparsedSQLStatement)
 
 # sql: Abstracted proc sql statement, three primary components:
 #   - output: Output of the create table statement
 #   - inputs Any dataset referenced next to a from statement
 
-sql = ps.regex(r'proc sql', flags=reFlags) + opspc + col + opspc >> (crtetbl|unparsedSQL).sep_by(opspc) << ps.regex(r'.*?quit', flags=reFlags) + opspc + col
+sql = ps.regex(r'proc sql', flags=reFlags) + opspc + col + opspc >> (crtetbl|unparsedSQL).sep_by(opspc) << scan(r'.*?quit', 'sql end') + opspc + col
 
 
 # lbnm: Abstracted libname statement, three components:
@@ -210,6 +300,86 @@ mcroCall = ps.seq(
     _col = opspc + col
 ).combine_dict(objects.macroCall)
 
+
+def budgetedAlt(*parsers):
+    """
+    budgetedAlt(*parsers)
+
+    Generate a parser trying each parser in turn, as parsy.alt, where a parser 
+    that exceeds the step budget counts as failing so the next is still tried. 
+    If none match and any exceeded the budget, the objects.budgetExceeded of 
+    the one that got furthest is raised.
+
+    Returns
+    -------
+    parsy.Parser
+    """
+    @ps.Parser
+    def alternatives(stream, index):
+        result = None
+        exceeded = None
+        for parser in parsers:
+            try:
+                result = parser(stream, index).aggregate(result)
+            except objects.budgetExceeded as e:
+                if exceeded is None or e.posistion > exceeded.posistion:
+                    exceeded = e
+                continue
+            if result.status:
+                return result
+        if exceeded is not None:
+            raise exceeded
+        return result
+    return alternatives
+
+
+def keywordDispatch(table):
+    """
+    keywordDispatch(table)
+
+    Generate a parser that looks at the leading characters of the stream and 
+    only tries the parsers that could match a statement starting that way. 
+
+    Parameters
+    ----------
+    table : dict
+        Dictionary keyed by lower case first character. Each value is an ordered 
+        list of (prefix, parser) tuples, the parser of the first tuple whose lower
+        cased prefix matches the stream is run.
+
+    Returns
+    -------
+    parsy.Parser
+    """
+    @ps.Parser
+    def dispatcher(stream, index):
+        if index < len(stream):
+            for prefix, parser in table.get(stream[index].lower(), ()):
+                if stream[index:index+len(prefix)].lower() == prefix:
+                    return parser(stream, index)
+        return ps.Result.failure(index, 'SAS statement')
+    return dispatcher
+
+# statementTable: First character and keyword of each top level statement mapped 
+# to the parsers that can match it. Parsers sharing a keyword keep the order of 
+# the original nl|mcvDef|cmnt|datastep|proc|sql|lbnm|icld|mcroStart|mcroEnd|mcroCall 
+# alternation so the same object is produced. 
+statementTable = {
+    '\n': [('', nl)],
+    '*': [('', cmnt)],
+    '/': [('/*', cmnt)],
+    'd': [('', datastep)],
+    'p': [('', budgetedAlt(proc, sql))],
+    'l': [('', lbnm)],
+    '%': [
+        ('%let', budgetedAlt(mcvDef, mcroCall)),
+        ('%include', budgetedAlt(icld, mcroCall)),
+        ('%macro', budgetedAlt(mcroStart, mcroCall)),
+        ('%mend', budgetedAlt(mcroEnd, mcroCall)),
+        ('', mcroCall)
+    ]
+}
+
 # fullprogram: multiple SAS objects including macros
-fullprogram =  (nl|mcvDef|cmnt|datastep|proc|sql|lbnm|icld|mcroStart|mcroEnd|mcroCall).optional()
+fullprogram = keywordDispatch(statementTable).optional()
 
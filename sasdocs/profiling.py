@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import pathlib
+import functools
+import contextlib
+
+# activeProfiles: Stack of the stageProfiles with a stage currently running.
+# Module level stage() calls record to the innermost one, so code deep in
+# the parse can be timed without passing a profile down to it.
+activeProfiles = []
+
+
+def get_profile(profile, name):
+    """
+    get_profile(profile, name)
+
+    Normalise the profile argument accepted by sasProgram and sasProject.
+
+    Parameters
+    ----------
+    profile : None, bool, str or pathlib.Path
+        False disables profiling, True or a path to write the JSON report to
+        enables it. If None, profiling is enabled by the SASDOCS_PROFILE
+        environment variable, which takes the same values.
+    name : str
+        Name of the profiled program or project
+
+    Returns
+    -------
+    stageProfile or None
+    """
+    if profile is None:
+        profile = os.environ.get('SASDOCS_PROFILE', '')
+        if profile.lower() in ('', '0', 'false', 'no'):
+            return None
+        if profile.lower() in ('1', 'true', 'yes'):
+            profile = True
+    if profile is False:
+        return None
+    return stageProfile(name, output=None if profile is True else pathlib.Path(profile))
+
+
+class stageProfile(object):
+    """
+    Wall and CPU time spent in each stage of loading a program or project.
+
+    Stages are timed with the stage context manager. Stages started while another
+    is running are recorded under the running stage's name, i.e. 'parse/rebuild_macros',
+    so each time includes the time of the stages nested in it.
+
+    Attributes
+    ----------
+    name : str
+        Name of the profiled program or project
+    output : pathlib.Path or None
+        File the JSON report is written to
+    stages : dict
+        Total wall and CPU seconds, number of calls and count of objects for each stage
+    """
+
+    def __init__(self, name, output=None):
+        self.name = name
+        self.output = output
+        self.stages = {}
+        self.stack = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        stage(name)
+
+        Context manager timing the code run inside it as stage name.
+        """
+        self.stack.append(name)
+        record = self.stages.setdefault('/'.join(self.stack), {'wall': 0.0, 'cpu': 0.0, 'calls': 0, 'count': 0})
+        activeProfiles.append(self)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] += time.perf_counter() - wall
+            record['cpu'] += time.process_time() - cpu
+            record['calls'] += 1
+            activeProfiles.pop()
+            self.stack.pop()
+
+    def total(self):
+        """
+        total()
+
+        Returns
+        -------
+        tuple
+            Wall and CPU seconds spent in stages not nested in another stage.
+        """
+        stages = [record for stage, record in self.stages.items() if '/' not in stage]
+        return sum(record['wall'] for record in stages), sum(record['cpu'] for record in stages)
+
+    def to_dict(self):
+        wall, cpu = self.total()
+        return {'name': self.name, 'wall': wall, 'cpu': cpu, 'stages': self.stages}
+
+    def __getstate__(self):
+        return {'name': self.name, 'output': self.output, 'stages': self.stages, 'stack': []}
+
+
+def stage(name, profile=None):
+    """
+    stage(name, profile=None)
+
+    Time the code run inside the returned context manager as stage name of profile,
+    or if profile is None the innermost running profile. Does nothing if there is 
+    no profile.
+    """
+    if profile is not None:
+        return profile.stage(name)
+    if activeProfiles:
+        return activeProfiles[-1].stage(name)
+    return contextlib.nullcontext()
+
+
+def count(n):
+    """
+    count(n)
+
+    Add n objects to the count of the innermost running stage, if there is one.
+    """
+    if activeProfiles:
+        profile = activeProfiles[-1]
+        profile.stages['/'.join(profile.stack)]['count'] += n
+
+
+def profiled(name):
+    """
+    profiled(name)
+
+    Decorator timing a method of an object with a profile attribute as stage name.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profile is None:
+                return method(self, *args, **kwargs)
+            with self.profile.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def build_report(profile, programs, top=10):
+    """
+    build_report(profile, programs, top=10)
+
+    Combine the profiles of a project and its programs into a report.
+
+    Parameters
+    ----------
+    profile : stageProfile or None
+        Profile of the project
+    programs : list
+        stageProfile of each program
+    top : int
+        Number of programs listed in slowest
+
+    Returns
+    -------
+    dict
+        JSON serialisable report with the project's stages, the stages of all
+        programs added together, the top slowest programs and every program's stages.
+    """
+    stages = {}
+    for program in programs:
+        for name, record in program.stages.items():
+            total = stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0, 'count': 0})
+            for key in total:
+                total[key] += record[key]
+
+    programs = sorted((program.to_dict() for program in programs), key=lambda program: program['wall'], reverse=True)
+    return {
+        'project': None if profile is None else profile.to_dict(),
+        'stages': stages,
+        'slowest': [{'name': program['name'], 'wall': program['wall'], 'cpu': program['cpu']} for program in programs[:top]],
+        'programs': programs
+    }
+
+
+def format_report(report):
+    """
+    format_report(report)
+
+    Format the stage totals and slowest programs of a report made by build_report
+    as text tables.
+
+    Returns
+    -------
+    str
+    """
+    lines = []
+    if report['project'] is not None:
+        lines.append('{:<40} {:>10} {:>10} {:>8} {:>9}'.format('project stage', 'wall s', 'cpu s', 'calls', 'count'))
+        for name, record in report['project']['stages'].items():
+            lines.append('{:<40} {wall:>10.3f} {cpu:>10.3f} {calls:>8} {count:>9}'.format(name, **record))
+        lines.append('')
+    lines.append('{:<40} {:>10} {:>10} {:>8} {:>9}'.format('program stage', 'wall s', 'cpu s', 'calls', 'count'))
+    for name, record in sorted(report['stages'].items()):
+        lines.append('{:<40} {wall:>10.3f} {cpu:>10.3f} {calls:>8} {count:>9}'.format(name, **record))
+    lines.append('')
+    lines.append('{:<62} {:>10} {:>10}'.format('slowest programs', 'wall s', 'cpu s'))
+    for program in report['slowest']:
+        lines.append('{:<62} {wall:>10.3f} {cpu:>10.3f}'.format(str(program['name'])[-62:], **program))
+    return '\n'.join(lines)
+
+
+def write_report(report, path):
+    """
+    write_report(report, path)
+
+    Write a report made by build_report to path as JSON.
+    """
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
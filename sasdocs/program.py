@@ -1,19 +1,464 @@
 import os
 import json
+import bisect
+import mmap
+import codecs
+import hashlib
+import functools
+import contextlib
 import datetime 
 import logging
 import pathlib
-import jinja2
 import networkx
-import importlib.resources as pkg_resources
 
 from collections import Counter
 
 from . import templates, format_logger
-from .objects import force_partial_parse
+from .cache import get_cache
+from .profiling import get_profile, profiled, stage, count, build_report, write_report
+from .lexer import lex
+from .macros import macroIndex
+from .objects import force_partial_parse, iter_partial_parse, partialParse, split_program, baseSASObject, budgetExceeded, get_budget
 from .parsers import fullprogram
 
 
+# sourceEncodings: Encodings tried in turn to decode a program when no encoding 
+# is given and it has no byte order mark. cp1252 is SAS's WLATIN1, latin-1 decodes
+# anything, including the few bytes cp1252 leaves undefined.
+sourceEncodings = ('utf-8', 'cp1252', 'latin-1')
+
+# byteOrderMarks: Encoding of the source for each byte order mark
+byteOrderMarks = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# sourceChunkSize: Characters read at a time when a program is streamed, see stream_program
+sourceChunkSize = 1024 * 1024
+
+# parallelSize: Programs of at least this many characters are split and parsed
+# in a process pool when one is given, see parallel_parse. Smaller programs are 
+# quicker to parse than to send to the pool.
+parallelSize = 256 * 1024
+
+# segmentSize: Number of characters aimed for in each piece of a program parsed
+# by parallel_parse
+segmentSize = 64 * 1024
+
+
+@contextlib.contextmanager
+def map_source(path):
+    """
+    map_source(path)
+
+    Context manager memory mapping the file at path read only. The mapping 
+    is closed on exit.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path to the SAS program
+
+    Yields
+    ------
+    mmap.mmap or bytes
+        The mapped file, empty files, which cannot be mapped, give b''
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def decode_source(data, encoding=None):
+    """
+    decode_source(data, encoding=None)
+
+    Decode the bytes of a SAS program, converting \\r\\n and \\r line endings 
+    to \\n as reading in text mode does.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Content of the program, such as the mapping from map_source
+    encoding : str, optional
+        Encoding of the program. If not given it is detected from a byte order
+        mark, otherwise each of sourceEncodings is tried in turn.
+
+    Returns
+    -------
+    tuple
+        Decoded source and the encoding used
+    """
+    if encoding is None:
+        encoding = marked_encoding(data)
+
+    if encoding is not None:
+        text = str(data, encoding)
+    else:
+        for encoding in sourceEncodings:
+            try:
+                text = str(data, encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, encoding
+
+
+def marked_encoding(data):
+    """
+    marked_encoding(data)
+
+    Returns
+    -------
+    str or None
+        Encoding given by the byte order mark data starts with, None if it has none
+    """
+    for mark, encoding in byteOrderMarks:
+        if data[:len(mark)] == mark:
+            return encoding
+    return None
+
+
+def detect_encoding(data, chunkSize=sourceChunkSize):
+    """
+    detect_encoding(data, chunkSize=sourceChunkSize)
+
+    Find the encoding decode_source would decode the bytes of a SAS program with,
+    decoding chunkSize bytes at a time so the decoded text is never held in memory.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Content of the program, such as the mapping from map_source
+    chunkSize : int
+        Number of bytes decoded at a time
+
+    Returns
+    -------
+    str
+    """
+    encoding = marked_encoding(data)
+    if encoding is not None:
+        return encoding
+    for encoding in sourceEncodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for i in range(0, len(data), chunkSize):
+                decoder.decode(data[i:i+chunkSize])
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+
+def iter_source(path, encoding=None, chunkSize=sourceChunkSize):
+    """
+    iter_source(path, encoding=None, chunkSize=sourceChunkSize)
+
+    Read the source of a SAS program in pieces, decoded and with line endings 
+    converted as decode_source does.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path to the SAS program
+    encoding : str, optional
+        Encoding of the program, detected if not given, see detect_encoding
+    chunkSize : int
+        Maximum number of characters in each piece
+
+    Yields
+    ------
+    str
+    """
+    if encoding is None:
+        with map_source(path) as data:
+            encoding = detect_encoding(data)
+    with open(path, 'r', encoding=encoding) as f:
+        yield from iter(functools.partial(f.read, chunkSize), '')
+
+
+def read_source(path, encoding=None):
+    """
+    read_source(path, encoding=None)
+
+    Read the source of a SAS program, see decode_source.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path to the SAS program
+    encoding : str, optional
+        Encoding of the program, detected if not given
+
+    Returns
+    -------
+    str
+    """
+    with map_source(path) as data:
+        return decode_source(data, encoding)[0]
+
+
+def source_hash(data):
+    """
+    source_hash(data)
+
+    Hash the source of a SAS program, used to tell whether a program has changed.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Content of the program, such as the mapping from map_source
+
+    Returns
+    -------
+    str
+        Hex digest of the SHA-256 of the source
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_program(path, encoding=None, budget=None, chunkSize=sourceChunkSize, state=None):
+    """
+    stream_program(path, encoding=None, budget=None, chunkSize=sourceChunkSize, state=None)
+
+    Parse a SAS program a piece at a time, yielding the objects in it as they are 
+    parsed rather than building a sasProgram. Memory use is bounded by chunkSize 
+    and the step budget rather than the size of the program, so long as the objects 
+    are consumed as they are yielded. Pass the objects through iter_objects to 
+    also reach the contents of macros, i.e. to count or index them, or to 
+    sasdocs.lineage.dataLineage.add_steps.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path to the SAS program
+    encoding : str, optional
+        Encoding of the program, detected if not given
+    budget : None, bool or sasdocs.objects.parseBudget
+        Limits on parsing the program, see sasdocs.objects.get_budget
+    chunkSize : int
+        Number of characters read at a time
+    state : sasdocs.objects.partialParse, optional
+        Parse to stream the program into, given to read its parsedRate once 
+        the objects have been consumed. Its budget is used in place of budget.
+
+    Yields
+    ------
+    sasdocs.object
+    """
+    chunks = iter_source(path, encoding=encoding, chunkSize=chunkSize)
+    if state is None:
+        yield from iter_partial_parse(fullprogram, chunks, mark=True, budget=get_budget(budget))
+    else:
+        yield from state.stream(chunks)
+
+
+def parse_segment(segment, offset, firstLine, budget, posistion=0, end=None):
+    """
+    parse_segment(segment, offset, firstLine, budget, posistion=0, end=None)
+
+    Parse one piece of a program split by split_program, run in the pool by parallel_parse.
+
+    Given end, the piece is followed by more of the program, which segment includes 
+    at least the first character of. Only statements starting before end are parsed 
+    and a statement whose scanning parsers would need to search past end stops the 
+    parse, as partialParse.stream bounds each piece it reads.
+
+    Parameters
+    ----------
+    segment : str
+        Text of the piece
+    offset : int
+        Character offset of the piece in the program
+    firstLine : int
+        Line number the piece starts on
+    budget : sasdocs.objects.parseBudget
+        Limits on parsing the piece
+    posistion : int
+        Offset into segment to start parsing at
+    end : int, optional
+        Offset into segment the piece ends at, None if it ends the program
+
+    Returns
+    -------
+    tuple
+        Objects parsed, with any macros left open unwound, characters skipped,
+        statements that exceeded the step budget, see sasdocs.objects.partialParse, 
+        and the offset in the program parsing stopped at.
+    """
+    state = partialParse(fullprogram, mark=True, budget=budget)
+    state.length = len(segment)
+    try:
+        stop = state.parse(lex(segment), posistion, end=end, offset=offset, firstLine=firstLine)
+    except budgetExceeded as e:
+        e.parsed = state.assembler.finish()
+        raise
+    return state.assembler.finish(), state.skips, state.exceeded, offset + stop
+
+
+def parallel_parse(source, executor, segments, budget=None):
+    """
+    parallel_parse(source, executor, segments, budget=None)
+
+    Parse a program as force_partial_parse, with stats and mark, split into 
+    pieces that are parsed in a process pool, see split_program. The objects 
+    parsed from each piece are added to one macroAssembler in order, so macros
+    defined across pieces are rebuilt as they would be parsed whole. The time 
+    budget applies to each piece.
+
+    A statement whose scanning parsers search past the end of its piece stops 
+    the parse of the piece. The program is then parsed serially from that 
+    statement, in this process, until a parse stops at the end of a piece, and 
+    the results of the pieces parsed over are dropped, along with any error 
+    parsing them in the pool. So the objects and rate are always those of 
+    parsing the program whole.
+
+    Parameters
+    ----------
+    source : str
+        SAS program
+    executor : concurrent.futures.Executor
+        Pool to parse the pieces in
+    segments : int
+        Number of pieces to aim for
+    budget : sasdocs.objects.parseBudget, optional
+        Limits on parsing each piece
+
+    Returns
+    -------
+    tuple
+        Parsed objects and the rate parsed
+
+    Raises
+    ------
+    budgetExceeded
+        If a piece whose result is used runs out of time, with the objects 
+        parsed before it and the rate parsed counting the pieces after it as 
+        unparsed.
+    """
+    with stage('lex'):
+        string = lex(source)
+    with stage('split'):
+        spans = split_program(string, segments)
+    firstLines = [1]
+    for (start, end) in spans[:-1]:
+        firstLines.append(firstLines[-1] + source.count('\n', start, end))
+
+    starts = [start for start, _ in spans]
+    ends = [end - start for start, end in spans[:-1]] + [None]
+
+    state = partialParse(fullprogram, mark=True, budget=budget)
+    state.length = len(source)
+    pieces = [executor.submit(parse_segment, source[start:end + 1], start, firstLine, budget, 0, pieceEnd) 
+              for (start, end), firstLine, pieceEnd in zip(spans, firstLines, ends)]
+    resume = None
+    try:
+        for i, (start, end) in enumerate(spans):
+            if resume is None:
+                try:
+                    piece = pieces[i].result()
+                except budgetExceeded as e:
+                    raise budget_exceeded(state, e, source, start, end)
+            else:
+                pieces[i].cancel()
+                k = bisect.bisect_right(starts, resume) - 1
+                try:
+                    with stage('reparse'):
+                        piece = parse_segment(source[starts[k]:end + 1], starts[k], firstLines[k], budget, 
+                                              resume - starts[k], None if ends[i] is None else end - starts[k])
+                except budgetExceeded as e:
+                    raise budget_exceeded(state, e, source, starts[k], end)
+            objects, skips, exceeded, stop = piece
+            state.assembler.add(objects)
+            state.skips += skips
+            state.exceeded.extend(exceeded)
+            resume = None if stop == end else stop
+    finally:
+        for piece in pieces:
+            piece.cancel()
+    state.warn_exceeded()
+    with stage('rebuild_macros'):
+        return state.assembler.finish(), state.parsedRate
+
+
+def budget_exceeded(state, e, source, start, end):
+    """
+    budget_exceeded(state, e, source, start, end)
+
+    The budgetExceeded for the whole program when the piece of it from start to 
+    end runs out of time, see parallel_parse.
+    """
+    state.assembler.add(e.parsed)
+    length = min(end + 1, len(source)) - start
+    unparsed = (1 - e.rate) * length + len(source) - start - length
+    return budgetExceeded(e.parser, e.posistion, parsed=state.assembler.finish(), rate=1 - (state.skips + unparsed) / state.length)
+
+
+def iter_objects(objects):
+    """
+    iter_objects(objects)
+
+    Walk a list or stream of parsed objects, yielding each object followed by the
+    contents of any macro. The macro an object is defined in is set as the object's
+    parent attribute, None for objects outside of a macro.
+
+    The walk uses an explicit stack so deeply nested macros do not hit the recursion limit.
+
+    Parameters
+    ----------
+    objects : iterable
+        Parsed objects, such as sasProgram.contents or the objects yielded by stream_program
+
+    Yields
+    ------
+    sasdocs.object
+    """
+    stack = [(iter(objects), None)]
+    while stack:
+        objs, parent = stack[-1]
+        for obj in objs:
+            if isinstance(obj, baseSASObject):
+                obj.parent = parent
+            yield obj
+            if type(obj).__name__ == 'macro':
+                stack.append((iter(obj.contents), obj))
+                break
+        else:
+            stack.pop()
+
+
+def index_objects(objects):
+    """
+    index_objects(objects)
+
+    Index a list or stream of parsed objects by object type, see iter_objects.
+
+    Returns
+    -------
+    tuple
+        Lists of the objects keyed by type name, and every object other than 
+        macros in the order they were found.
+    """
+    objectIndex = {}
+    objectOrder = []
+    for obj in iter_objects(objects):
+        objType = type(obj).__name__
+        objectIndex.setdefault(objType, []).append(obj)
+        if objType != 'macro':
+            objectOrder.append(obj)
+    return objectIndex, objectOrder
+
+
 class sasProgram(object):
     """
     Abstracted SAS program class.
@@ -33,43 +478,199 @@ class sasProgram(object):
     failedLoad : int
         Flag if there was a failure to load/parse the program file
     raw : str
-        Raw string version of the program file
+        Source of the program, read from the file on first access rather than held 
+        in memory while parsing. Empty if the file has changed since it was parsed, 
+        so it always matches contents.
+    encoding : str
+        Encoding the program was decoded with, see decode_source
+    lines : int
+        Number of lines in the program
     parsedRate : float
         Percentage of the program file successfully parsed 
+    cache : sasdocs.cache.parseCache
+        Parse cache the program is loaded from and stored to, None if the program
+        was created without a cache.
+    fromCache : bool
+        True if the parsed contents were loaded from the cache
+    mtime : int
+        Modification time of the file in nanoseconds when it was loaded
+    size : int
+        Size of the file in bytes when it was loaded
+    contentHash : str
+        SHA-256 of the source, see source_hash
+    profile : sasdocs.profiling.stageProfile
+        Time spent in each stage of loading and documenting the program, None unless 
+        profiling is enabled.
+    budget : sasdocs.objects.parseBudget
+        Limits on the time and lookahead spent parsing the program
+    exceededBudget : bool
+        True if parsing ran out of time and the rest of the program was left 
+        unparsed. Such programs are not stored in the cache.
+    objectIndex : dict
+        Lists of the objects found in the program, including those inside macros, 
+        keyed by object type name. See build_object_index.
+    summary : dict
+        Count of each object type in the program, computed on first access.
+    dataObjects : dict
+        References to each dataObject in the program, computed on first access. 
+        See get_data_objects.
+    networkGraph : networkx.DiGraph
+        Data flow through the program, computed on first access. See build_network.
+    networkJSON : str
+        Node link JSON of networkGraph, computed on first access.
+    hasNodes : bool
+        True if networkGraph contains any data objects.
+    macroIndex : sasdocs.macros.macroIndex
+        Definitions and call sites of the macros in the program, computed on first 
+        access. See sasProject.macroIndex for the index across a project.
+
+    Parameters
+    ----------
+    path : str
+        Filepath to the SAS file to be parsed.
+    cache : None, bool, str, pathlib.Path or sasdocs.cache.parseCache
+        Parse cache to use, see sasdocs.cache.get_cache.
+    only : tuple, optional
+        Names of the attributes to compute when the program is loaded. By default 
+        the extended info and documentation are computed. Passing only=('contents',) 
+        just parses the program, for tools scanning many files. Attributes not 
+        named are computed on first access where they are lazy properties.
+    profile : None, bool, str or pathlib.Path
+        Record the time spent in each stage in self.profile, see 
+        sasdocs.profiling.get_profile. Given a path the report is also written 
+        there as JSON once the program is loaded.
+    budget : None, bool or sasdocs.objects.parseBudget
+        Limits on parsing the program, see sasdocs.objects.get_budget.
+    encoding : str, optional
+        Encoding of the file, i.e. 'latin-1'. By default it is detected, see 
+        decode_source.
+    executor : concurrent.futures.Executor, optional
+        Process pool to parse the program in when it has at least parallelSize
+        characters, see parallel_parse.
     """
 
-    def __init__(self, path):
+    # cachedAttributes: Attributes stored in and restored from the parse cache
+    cachedAttributes = ('contents', 'parsedRate', 'lines', 'encoding', 'documentation', 'documented')
+
+    # extendedAttributes: Attributes set by get_extended_info
+    extendedAttributes = ('name', 'nameURL', 'lines', 'lastEdit', 'parsed')
+
+    # documentationAttributes: Attributes set by parse_code_documentation
+    documentationAttributes = ('documentation', 'documented')
+
+    def __init__(self, path, cache=None, only=None, profile=None, budget=None, encoding=None, executor=None):
 
         self.path = path
+        self.cache = get_cache(cache)
+        self.profile = get_profile(profile, str(path))
+        self.budget = get_budget(budget)
+        self.encoding = encoding
+        self.fromCache = False
+        self.exceededBudget = False
+        self._summary = None
+        self._dataObjects = None
+        self._networkGraph = None
+        self._networkJSON = None
+        self._macroIndex = None
+        self._raw = None
         self.logger = logging.getLogger(__name__)
         try: 
             self.logger = format_logger(self.logger,{'path':self.path})
         except Exception as e:
             self.logger.exception("Unable to format log. {}".format(e))
         
-        if self.load_file(path) is False:
+        if self.load_file(path, executor=executor) is False:
             self.contents = []
             self.failedLoad = 1
+            self.build_object_index()
         else:
             self.failedLoad = 0
-            self.get_extended_info()
-            self.parse_code_documentation()
+            self.build_object_index()
+            if self.fromCache:
+                self.resolve_paths()
+            if only is None or set(only).intersection(self.extendedAttributes):
+                self.get_extended_info()
+            if not hasattr(self, 'documented') and (only is None or set(only).intersection(self.documentationAttributes)):
+                self.parse_code_documentation()
+            for attribute in only or ():
+                getattr(self, attribute)
+            if not self.fromCache and not self.exceededBudget:
+                self.save_to_cache()
+
+        if self.profile is not None and self.profile.output is not None:
+            write_report(build_report(None, [self.profile]), self.profile.output)
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            try:
+                with map_source(self.path) as data:
+                    if source_hash(data) != self.contentHash:
+                        self.logger.warning("Unable to read source, the file has changed since it was parsed")
+                        return ''
+                    self._raw = decode_source(data, self.encoding)[0]
+            except Exception as e:
+                self.logger.warning("Unable to read file: {}".format(e))
+                return ''
+        return self._raw
+
+    @property
+    def summary(self):
+        if self._summary is None:
+            self._summary = dict(self.summarise_objects())
+        return self._summary
+
+    @property
+    def dataObjects(self):
+        if self._dataObjects is None:
             self.get_data_objects()
-            self.build_network()
+        return self._dataObjects
 
-    def load_file(self, path):
+    @property
+    def networkGraph(self):
+        if self._networkGraph is None:
+            self.build_network()
+        return self._networkGraph
+
+    @property
+    def networkJSON(self):
+        if self._networkJSON is None:
+            with stage('network_json'):
+                self._networkJSON = json.dumps(networkx.readwrite.json_graph.node_link_data(self.networkGraph))
+        return self._networkJSON
+
+    @property
+    def hasNodes(self):
+        return self.networkGraph.number_of_nodes() > 0
+
+    @property
+    def macroIndex(self):
+        if self._macroIndex is None:
+            with stage('macro_index'):
+                self._macroIndex = macroIndex()
+                self._macroIndex.add_program(self)
+        return self._macroIndex
+
+    @profiled('load')
+    def load_file(self, path, executor=None):
         """
-        load_file(path)
+        load_file(path, executor=None)
 
         Attempt to load the given path and parse into a sasProgram object. Errors logged on failure
         to resolve path, read file and parse. 
 
-        Sets values of path, raw, contents and parsed rate if successful. 
+        Sets values of path, encoding, lines, contents and parsed rate if successful. The 
+        file is memory mapped and hashed before it is decoded. If the program has a cache 
+        and the file is unchanged since it was cached with the same step budget, the attributes 
+        in cachedAttributes are loaded from the cache instead and the file is never decoded. 
+        The decoded source is not kept once parsed, see raw.
 
         Parameters
         ----------
         path : str
             Filepath to the SAS file to be parsed.
+        executor : concurrent.futures.Executor, optional
+            Process pool to parse large programs in, see parallel_parse.
         """
         try:
             self.path = pathlib.Path(path).resolve(strict=True)
@@ -78,30 +679,109 @@ class sasProgram(object):
             self.logger.error("Unable to resolve path: {}".format(e))
             return False
             
+        cached = None
         try:
-            with open(self.path,'r') as f :
-                self.raw = f.read()
+            stat = os.stat(self.path)
+            with map_source(self.path) as data:
+                with stage('hash'):
+                    self.contentHash = source_hash(data)
+
+                if self.cache is not None:
+                    self.cacheKey = self.cache.key('{}:{}:{}'.format(self.contentHash, self.encoding or '', self.budget.steps).encode())
+                    with stage('cache_load'):
+                        cached = self.cache.load(self.cacheKey)
+
+                if cached is None:
+                    with stage('read'):
+                        source, self.encoding = decode_source(data, self.encoding)
         except Exception as e:
             self.logger.exception("Unable to read file: {}".format(e))
             return False
 
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+
+        if cached is not None:
+            self.__dict__.update(cached)
+            self.fromCache = True
+            return
+
+        self.lines = source.count('\n')
         try:
-            self.contents, self.parsedRate = force_partial_parse(fullprogram, self.raw, stats=True, mark=True)
+            with stage('parse'):
+                try:
+                    parsed = None
+                    if executor is not None and len(source) >= parallelSize:
+                        try:
+                            parsed = parallel_parse(source, executor, len(source) // segmentSize, budget=self.budget)
+                        except budgetExceeded:
+                            raise
+                        except Exception as e:
+                            self.logger.warning("Unable to parse in parallel, parsing serially: {}".format(e))
+                    if parsed is None:
+                        parsed = force_partial_parse(fullprogram, source, stats=True, mark=True, budget=self.budget)
+                    self.contents, self.parsedRate = parsed
+                except budgetExceeded as e:
+                    self.contents, self.parsedRate = e.parsed, e.rate
+                    self.exceededBudget = True
+                    self.logger.warning("Parse time budget of {}s exceeded on line {}, mostly parsing '{}' statements. The rest of the program is left unparsed".format(
+                        self.budget.seconds, source.count('\n', 0, e.posistion) + 1, e.parser))
+                count(len(self.contents))
         except Exception as e:
             self.logger.exception("Unable to parse file: {}".format(e))
             return False
 
+    @profiled('cache_store')
+    def save_to_cache(self):
+        """
+        save_to_cache()
+
+        Store the parsed contents and any other attributes listed in cachedAttributes
+        that have been computed in the program's cache, if it has one. Lazy derived 
+        attributes are cheap to rebuild from the contents and are not cached.
+        """
+        if self.cache is not None:
+            self.cache.store(self.cacheKey, {attribute:getattr(self, attribute) for attribute in self.cachedAttributes if hasattr(self, attribute)})
+
+    @profiled('build_object_index')
+    def build_object_index(self):
+        """
+        build_object_index()
+
+        Walk the program's contents once, including the contents of macros, and record each 
+        object in self.objectIndex under its type name in the order get_objects yields them.
+        See index_objects.
+        """
+        self.objectIndex, self.objectOrder = index_objects(self.contents)
+        count(sum(len(objects) for objects in self.objectIndex.values()))
+
+    @profiled('resolve_paths')
+    def resolve_paths(self):
+        """
+        resolve_paths()
+
+        Resolve the paths of the program's include and libname statements against the 
+        filesystem again. Called when the contents are loaded from the cache, which 
+        holds the paths as they were resolved when the program was parsed.
+        """
+        for objectType in ('include', 'libname'):
+            for obj in self.get_objects(objectType=objectType):
+                obj.resolve()
+
     def get_objects(self, object=None, objectType=None):
         """
         get_objects(object=None, objectType=None)
 
-        Recursively loop through parsed objects in the programs contents, yielding each object. If the object 
+        Loop through parsed objects in the programs contents, yielding each object. If the object 
         is a macro object, enter and yield sas objects found in the macro's contents. 
 
-        This function will never return a macro object. 
+        This function will never return a macro object, unless objectType is 'macro'. 
 
         If passed with optional objectType, this function will only yield objects of type equal to objectType. 
 
+        For the whole program this is a lookup in self.objectIndex, the contents are only walked
+        when passed a macro object.
+
         Parameters
         ----------
         object : None, macro 
@@ -114,7 +794,11 @@ class sasProgram(object):
         sasdocs.object 
         """
         if object is None:
-            object = self
+            if objectType is None:
+                yield from self.objectOrder
+            else:
+                yield from self.objectIndex.get(objectType, ())
+            return
         for obj in object.contents:
             if type(obj).__name__ == 'macro':
                 if objectType == 'macro':
@@ -126,54 +810,53 @@ class sasProgram(object):
             else:
                 yield obj
     
+    @profiled('get_data_objects')
     def get_data_objects(self):
         """
         get_data_objects
 
         Loop through all datasteps and procedures and add any valid dataobjects
-        to a list self.dataObjects
+        to a dict self.dataObjects keyed by UID. Called on first access of self.dataObjects.
         """
-        self.dataObjects = {}
+        self._dataObjects = {}
 
         for validObject in ('dataStep', 'procedure'):
             for proc in self.get_objects(objectType=validObject):
                 for dataset in proc.inputs + proc.outputs:
-                    if dataset.UID not in self.dataObjects.keys():
-                        self.dataObjects[dataset.UID] = [{'obj':dataset, 'start':proc.start, 'end':proc.end}]
-                    else:
-                        self.dataObjects[dataset.UID].append({'obj':dataset, 'start':proc.start, 'end':proc.end})    
+                    self._dataObjects.setdefault(dataset.UID, []).append({'obj':dataset, 'start':proc.start, 'end':proc.end})
+        count(len(self._dataObjects))
 
+    @profiled('build_network')
     def build_network(self):
         """
         build_network
 
-        Generate a JSON containing the network diagram for the SAS code and add to class variable self.networkJSON
-        Add class varaible self.hasNodes containing a bool as to whether this code contains any valid data objects.
+        Generate the network diagram for the SAS code as self.networkGraph. Called on first 
+        access of self.networkGraph, self.networkJSON or self.hasNodes.
         """
 
-        self.networkGraph = networkx.DiGraph()
+        self._networkJSON = None
+        networkGraph = networkx.DiGraph()
 
         for validObject in ('dataStep','procedure'):
             for obj in self.get_objects(objectType=validObject):
 
                 for input in obj.inputs:
-                    if self.networkGraph.has_node(input.UID) is False:
-                        self.networkGraph.add_node(input.UID, library=input._lib, dataset=input._ds, line=obj.start[0])
+                    if networkGraph.has_node(input.UID) is False:
+                        networkGraph.add_node(input.UID, library=input._lib, dataset=input._ds, line=obj.start[0])
                     
                     for output in obj.outputs:
-                        if self.networkGraph.has_node(output.UID) is False:
-                            self.networkGraph.add_node(output.UID, library=output._lib, dataset=output._ds, line=obj.start[0])
+                        if networkGraph.has_node(output.UID) is False:
+                            networkGraph.add_node(output.UID, library=output._lib, dataset=output._ds, line=obj.start[0])
                         
                         if input.UID != output.UID:
                             if hasattr(obj,'type'):
-                                self.networkGraph.add_edge(input.UID, output.UID, label=f'proc {obj.type}')
+                                networkGraph.add_edge(input.UID, output.UID, label=f'proc {obj.type}')
                             else:
-                                self.networkGraph.add_edge(input.UID, output.UID)
+                                networkGraph.add_edge(input.UID, output.UID)
 
-
-        network = networkx.readwrite.json_graph.node_link_data(self.networkGraph)
-        self.hasNodes = len(network['nodes']) > 0    
-        self.networkJSON = json.dumps(network)
+        self._networkGraph = networkGraph
+        count(networkGraph.number_of_nodes())
 
 
 
@@ -181,13 +864,14 @@ class sasProgram(object):
         """
         summarise_objects(object=None)
 
-        Recursively loop through parsed objects in the programs contents, counting each object by object type.
-        This function will count macros and the contents of said macros.
+        Count each parsed object in the programs contents by object type. This function will 
+        count macros and the contents of said macros. For the whole program the counts are taken
+        from self.objectIndex.
 
         Parameters
         ----------
         object : None, macro 
-            Recursion parameter, if none loop through self.contents else loop through object.contents
+            Recursion parameter, if none count self.contents else loop through object.contents
         
         Returns
         -------
@@ -195,13 +879,14 @@ class sasProgram(object):
             Collections Counter object for all sasdoc.object types found in program.
         """
         if object is None:
-            object = self
+            return Counter({objType:len(objects) for objType, objects in self.objectIndex.items()})
         counter = Counter(type(obj).__name__ for obj in object.contents)
         for obj in object.contents:
             if type(obj).__name__ == 'macro':
                 counter += self.summarise_objects(obj)
         return counter
 
+    @profiled('get_extended_info')
     def get_extended_info(self):
         """
         get_extended_info()
@@ -214,18 +899,16 @@ class sasProgram(object):
             path : Full path to the SAS code,
             lines : Number of lines in the SAS code,
             lastEdit : Timestamp for the last edit of the SAS code,
-            summary : Counter object returned by summarise_objects,
             parsed : Percentage of the SAS code succesfully parsed
         """
         
         self.name = self.path.stem
         self.nameURL = self.name.replace(' ','%20')
-        self.lines = self.raw.count('\n')
         self.lastEdit = "{:%Y-%m-%d %H:%M}".format(datetime.datetime.fromtimestamp(os.stat(self.path).st_mtime))
-        self.summary = dict(self.summarise_objects())
         self.parsed = "{:.2%}".format(self.parsedRate)
     
 
+    @profiled('parse_code_documentation')
     def parse_code_documentation(self):
         """
         parse_code_documentation 
@@ -253,6 +936,7 @@ class sasProgram(object):
             self.documentation = '\n'.join([comment.text for comment in cmnts])
             self.documented = True
     
+    @profiled('render')
     def generate_documentation(self, template='program.md'):
         """
         generate_documentation
@@ -266,7 +950,7 @@ class sasProgram(object):
 
         """
 
-        template = jinja2.Template(pkg_resources.read_text(templates, template))
+        template = templates.environment.get_template(template)
         return template.render(program=self)
 
 
@@ -1,18 +1,83 @@
+import os
 import re
 import datetime 
 import logging
 import pathlib
 import datetime
-import jinja2
+import functools
+import concurrent.futures
 
-import importlib.resources as pkg_resources
 
 from collections import Counter
 
 from . import templates, format_logger
-from .program import sasProgram
+from .cache import get_cache
+from .objects import clear_resolved_paths, get_budget
+from .lineage import dataLineage
+from .macros import macroIndex
+from .profiling import get_profile, profiled, stage, build_report, format_report, write_report
+from .program import sasProgram, map_source, source_hash, parallelSize
 
 
+def load_program(path, cache=None, profile=False, budget=None, encoding=None, executor=None):
+    """
+    load_program(path, cache=None, profile=False, budget=None, encoding=None, executor=None)
+
+    Parse the SAS program at path. Defined at module level so that it can be 
+    sent to worker processes by sasProject.parse_programs, the returned 
+    sasProgram is picklable.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File path to the SAS program
+    cache : sasdocs.cache.parseCache, optional
+        Parse cache passed to the sasProgram
+    profile : bool
+        Profile the sasProgram
+    budget : sasdocs.objects.parseBudget, optional
+        Limits on parsing the program
+    encoding : str, optional
+        Encoding of the program, detected if not given
+    executor : concurrent.futures.Executor, optional
+        Pool to parse a large program in, only given in the main process
+
+    Returns
+    -------
+    sasProgram
+    """
+    return sasProgram(path, cache=cache, profile=profile, budget=budget, encoding=encoding, executor=executor)
+
+def file_state(path):
+    """
+    file_state(path)
+
+    Returns
+    -------
+    tuple or None
+        Modification time in nanoseconds and size in bytes of the file at path, 
+        None if it cannot be found
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def program_size(path):
+    """
+    program_size(path)
+
+    Returns
+    -------
+    int
+        Size of the file at path in bytes, 0 if it cannot be found
+    """
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
 
 class sasProject(object):
     """
@@ -32,11 +97,43 @@ class sasProject(object):
         List of parsed .sas programs found in the project root or subfolders
     macroVariables : [macroVariableDefinition]
         List of all macro variable defintions found in all programs in the project
+    workers : int, optional
+        Number of worker processes used to parse programs. None or 1 parses
+        programs serially in the current process. 
+    cache : sasdocs.cache.parseCache
+        Parse cache shared by the project's programs, None if created without a cache. 
+        Accepts the same values as the cache argument of sasProgram.
+    includeGraph : dict
+        Resolved paths of the files each program includes, keyed by program path. 
+    failedPrograms : dict
+        Modification time and size, see file_state, of each file that failed to load 
+        as a program, keyed by path. refresh only tries them again once they change.
+    lineage : sasdocs.lineage.dataLineage
+        Data lineage across all the project's programs, built as programs are added 
+        and patched by refresh.
+    macroIndex : sasdocs.macros.macroIndex
+        Definitions and call sites of every macro in the project's programs, built 
+        as programs are added and patched by refresh.
+    profile : sasdocs.profiling.stageProfile
+        Time spent in each stage of building the project, None unless profiling is 
+        enabled by the profile argument or the SASDOCS_PROFILE environment variable.
+        Each program is then profiled too, see profile_report.
+    budget : sasdocs.objects.parseBudget
+        Limits on the time and lookahead spent parsing each program. Accepts 
+        the same values as the budget argument of sasProgram.
+    encoding : str
+        Encoding of every program in the project, None to detect each program's 
+        encoding, see sasdocs.program.decode_source.
     """
 
-    def __init__(self, path):
+    def __init__(self, path, workers=None, cache=None, profile=None, budget=None, encoding=None):
 
         self.path = path
+        self.workers = workers
+        self.cache = get_cache(cache)
+        self.profile = get_profile(profile, str(path))
+        self.budget = get_budget(budget)
+        self.encoding = encoding
         self.logger = logging.getLogger(__name__)
         try: 
             self.logger = format_logger(self.logger,{'path':self.path})
@@ -45,12 +142,21 @@ class sasProject(object):
         
         self.programs = []
         self.documentation = {}
+        self.includeGraph = {}
+        self.failedPrograms = {}
+        self.lineage = dataLineage()
+        self.macroIndex = macroIndex()
 
+        clear_resolved_paths()
         if self.load_project(path) is False:
             return None
         
         self.get_extended_info()
 
+        if self.profile is not None:
+            self.emit_profile()
+
+    @profiled('load_project')
     def load_project(self, path):
         """
         load_project(path)
@@ -72,7 +178,8 @@ class sasProject(object):
             return False
 
         try: 
-            programPaths = self.path.rglob('*.sas')
+            with stage('discover'):
+                programPaths = sorted(self.path.rglob('*.sas'))
         except Exception as e:
             self.logger.exception("Unable to search folder: {}".format(e))
             return False
@@ -82,9 +189,13 @@ class sasProject(object):
         except Exception as e:
             self.logger.exception("Unable to add programs to project: {}".format(e))
             return False
+
+        if self.cache is not None:
+            self.cache.evict()
         
         # self.macroVariables = {d.variable:d.value for d in self.get_objects(objectType='macroVariableDefinition')}
         
+    @profiled('add_programs')
     def add_programs_to_project(self, programPaths):
         """
         add_programs_to_project(programPaths)
@@ -93,7 +204,9 @@ class sasProject(object):
         objects contain an include object, where possible follow the path in the %include statement, parse file and add to 
         the project's programs list. 
 
-        Does not parse the program if the path has already been visited.
+        Paths are resolved and tracked in a visited set, so each file is parsed exactly once 
+        even if it is included many times or includes form a cycle. Only the include statements 
+        of newly parsed programs are followed. Files in failedPrograms are not tried again.
 
         Parameters
         ----------
@@ -101,17 +214,227 @@ class sasProject(object):
             List of discovered program paths in the project's directories.
 
         """
+        visited = set(program.path for program in self.programs).union(self.failedPrograms)
+        worklist = []
         for path in programPaths:
-            if path not in [program.path for program in self.programs]:
-                self.programs.append(sasProgram(path))
-        
-        includePaths = set(include.path for include in self.get_objects(objectType='include'))
-        while includePaths.difference(set([program.path for program in self.programs])):
-            for path in includePaths:
-                self.programs.append(sasProgram(path))
-            includePaths = set(include.path for include in self.get_objects(objectType='include'))
+            path = pathlib.Path(path).resolve()
+            if path not in visited:
+                visited.add(path)
+                worklist.append(path)
+
+        executor = self.create_pool()
+        try:
+            while worklist:
+                programs = self.parse_programs(worklist, executor=executor)
+                self.programs.extend(programs)
+                worklist = []
+                for program in programs:
+                    if program.failedLoad == 1:
+                        self.failedPrograms[program.path] = file_state(program.path)
+                        continue
+                    with stage('lineage'):
+                        self.lineage.add_program(program)
+                    with stage('macro_index'):
+                        self.macroIndex.add_program(program)
+                    self.includeGraph[program.path] = set()
+                    for include in program.get_objects(objectType='include'):
+                        self.includeGraph[program.path].add(include.path.resolve())
+                        if include.resolved and include.path not in visited:
+                            visited.add(include.path)
+                            worklist.append(include.path)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
         self.programs = [program for program in self.programs if program.failedLoad != 1]
+
+    @profiled('refresh')
+    def refresh(self):
+        """
+        refresh()
+
+        Bring the project up to date with the files on disk, re-parsing only what has changed.
+
+        A program is re-parsed if its file's modification time or size differ from when it was 
+        loaded and its content hash has changed, if it is new, or if it includes, directly or 
+        through other programs, a file that changed, appeared or was removed. A file that 
+        failed to load is only tried again once its modification time or size change. Programs 
+        whose files were removed, or that are outside the project folder and no longer included, 
+        are dropped. programs, summary, objects, lineage and macroIndex are patched in place, 
+        and programs are kept in the order a fresh sasProject would list them in.
+
+        Returns
+        -------
+        set
+            Paths of the programs that were re-parsed or dropped.
+        """
+        if not hasattr(self, 'summary'):
+            return set()
+
+        clear_resolved_paths()
+        try:
+            discovered = set(path.resolve() for path in self.path.rglob('*.sas'))
+        except Exception as e:
+            self.logger.exception("Unable to search folder: {}".format(e))
+            return set()
+
+        current = {program.path: program for program in self.programs}
+        failed = set(path for path, state in self.failedPrograms.items() if file_state(path) == state)
+        self.failedPrograms = {path: self.failedPrograms[path] for path in failed}
+        changed = discovered.difference(current, failed)
+        removed = set()
+        for path, program in current.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                removed.add(path)
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != (program.mtime, program.size):
+                with map_source(path) as data:
+                    sourceChanged = source_hash(data) != program.contentHash
+                if sourceChanged:
+                    changed.add(path)
+                else:
+                    program.mtime, program.size = stat.st_mtime_ns, stat.st_size
+        for includes in self.includeGraph.values():
+            for include in includes:
+                if include not in current and include not in failed and os.path.isfile(include):
+                    changed.add(include)
+
+        includers = {}
+        for path, includes in self.includeGraph.items():
+            for include in includes:
+                includers.setdefault(include, set()).add(path)
+
+        stale = changed | removed
+        worklist = list(stale)
+        while worklist:
+            for includer in includers.get(worklist.pop(), ()):
+                if includer not in stale:
+                    stale.add(includer)
+                    worklist.append(includer)
+        
+        if not stale:
+            return stale
+
+        previous = self.programs
+        self.programs = [program for program in self.programs if program.path not in stale]
+        for path in stale:
+            self.includeGraph.pop(path, None)
+            self.lineage.remove_program(path)
+            self.macroIndex.remove_program(path)
+        self.add_programs_to_project(sorted(stale.difference(removed)))
+
+        reachable = set(program.path for program in self.programs if self.path in program.path.parents)
+        worklist = list(reachable)
+        while worklist:
+            for include in self.includeGraph.get(worklist.pop(), ()):
+                if include not in reachable:
+                    reachable.add(include)
+                    worklist.append(include)
+        self.programs = [program for program in self.programs if program.path in reachable]
+        for path in set(self.lineage.programs).difference(program.path for program in self.programs):
+            self.lineage.remove_program(path)
+        for path in set(self.macroIndex.programs).difference(program.path for program in self.programs):
+            self.macroIndex.remove_program(path)
+        appended = list(self.programs)
+        self.sort_programs(sorted(discovered))
+        if self.programs != appended:
+            with stage('macro_index'):
+                self.macroIndex.rebuild(self.programs)
+        
+        kept = set(id(program) for program in self.programs)
+        dropped = [program for program in previous if id(program) not in kept]
+        existing = set(id(program) for program in previous)
+        added = [program for program in self.programs if id(program) not in existing]
+        self.update_extended_info(dropped, added)
+
+        return stale.union(program.path for program in dropped)
+
+    def sort_programs(self, programPaths):
+        """
+        sort_programs(programPaths)
+
+        Put programs in the order add_programs_to_project finds them in from programPaths, 
+        the given paths in order then the files they include, breadth first.
+
+        Parameters
+        ----------
+        programPaths : list
+            Sorted paths of the .sas files in the project's directories.
+        """
+        programs = {program.path: program for program in self.programs}
+        order = {}
+        worklist = programPaths
+        while worklist:
+            includes = []
+            for path in worklist:
+                if path in order:
+                    continue
+                order[path] = len(order)
+                if path in programs:
+                    includes.extend(include.path for include in programs[path].get_objects(objectType='include') if include.resolved)
+            worklist = includes
+        self.programs.sort(key=lambda program: order.get(program.path, len(order)))
+
+    def create_pool(self):
+        """
+        create_pool()
+
+        Create the process pool used to parse programs if the project was created with 
+        more than one worker. 
+
+        Returns
+        -------
+        concurrent.futures.ProcessPoolExecutor or None
+            None if programs should be parsed serially.
+        """
+        if self.workers is not None and self.workers > 1:
+            try:
+                return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            except Exception as e:
+                self.logger.warning("Unable to create process pool, parsing serially: {}".format(e))
+        return None
+
+    @profiled('parse_programs')
+    def parse_programs(self, programPaths, executor=None):
+        """
+        parse_programs(programPaths, executor=None)
+
+        Generate a sasProgram object for each path. If given a process pool the programs 
+        are parsed in the pool, otherwise, or if the pool cannot be used, they are parsed 
+        one after another. 
+
+        Programs of parallelSize bytes or more are loaded in this process once the 
+        others have been sent to the pool, and split into pieces that are parsed in 
+        the pool, see sasdocs.program.parallel_parse, so a single large program does 
+        not hold up the whole project.
+
+        Parameters
+        ----------
+        programPaths : list
+            List of paths to .sas files.
+        executor : concurrent.futures.Executor, optional
+            Pool returned by create_pool.
+
+        Returns
+        -------
+        list
+            sasProgram objects in the same order as programPaths.
+        """
+        programPaths = list(programPaths)
+        loader = functools.partial(load_program, cache=self.cache, profile=self.profile is not None, budget=self.budget, encoding=self.encoding)
+        large = [executor is not None and program_size(path) >= parallelSize for path in programPaths]
+        if executor is not None and (len(programPaths) > 1 or any(large)):
+            small = [path for path, isLarge in zip(programPaths, large) if not isLarge]
+            chunksize = max(1, len(small) // (self.workers * 4))
+            try:
+                programs = executor.map(loader, small, chunksize=chunksize)
+                largePrograms = iter([loader(path, executor=executor) for path, isLarge in zip(programPaths, large) if isLarge])
+                return [next(largePrograms) if isLarge else next(programs) for isLarge in large]
+            except Exception as e:
+                self.logger.warning("Unable to parse programs in parallel, parsing serially: {}".format(e))
+        return [loader(path) for path in programPaths]
     
     def add_addtional_documentation_to_project(self):
         """
@@ -183,6 +506,7 @@ class sasProject(object):
         for program in self.programs:
             yield from program.get_objects(objectType=objectType)
 
+    @profiled('get_extended_info')
     def get_extended_info(self):
         """
         get_extended_info
@@ -206,21 +530,150 @@ class sasProject(object):
         self.objects = dict(prgSum)
         self.buildTime = "{:%Y-%m-%d %H:%M}".format(datetime.datetime.now())
         
-    def generate_documentation(self, macroOnly=False):
+    def update_extended_info(self, dropped, added):
+        """
+        update_extended_info(dropped, added)
+
+        Patch the attributes set by get_extended_info after programs have been dropped 
+        from and added to the project, without recounting unchanged programs.
+
+        Parameters
+        ----------
+        dropped : list
+            sasProgram objects no longer in the project
+        added : list
+            sasProgram objects new to the project
+        """
+        summary = Counter(self.summary)
+        for program in dropped:
+            summary.subtract(self.objects.pop(program, {}))
+        for program in added:
+            self.objects[program] = dict(program.summary)
+            summary.update(program.summary)
+        self.objects = {program: self.objects[program] for program in self.programs}
+        
+        self.summary = {obj:count for obj, count in summary.items() if count > 0}
+        self.nPrograms = len(self.programs)
+        self.buildTime = "{:%Y-%m-%d %H:%M}".format(datetime.datetime.now())
+
+    def profile_report(self, top=10):
+        """
+        profile_report(top=10)
+
+        Report of the time spent building the project and each of its programs, 
+        including documentation rendered so far. See sasdocs.profiling.build_report.
+
+        Parameters
+        ----------
+        top : int
+            Number of the slowest programs listed
+
+        Returns
+        -------
+        dict or None
+            None if the project was not profiled.
+        """
+        if self.profile is None:
+            return None
+        return build_report(self.profile, [program.profile for program in self.programs if program.profile is not None], top=top)
+
+    def emit_profile(self, top=10):
+        """
+        emit_profile(top=10)
+
+        Log the stage timings and top slowest programs of profile_report as a table, 
+        and write the report as JSON if the project was given a path to profile to. 
+        Called once the project is built, call again after generating documentation 
+        to include rendering.
+
+        Parameters
+        ----------
+        top : int
+            Number of the slowest programs listed
+        """
+        report = self.profile_report(top=top)
+        if report is None:
+            return
+        self.logger.info("Profile:\n{}".format(format_report(report)))
+        if self.profile.output is not None:
+            try:
+                write_report(report, self.profile.output)
+            except Exception as e:
+                self.logger.warning("Unable to write profile: {}".format(e))
+
+    def iter_documentation(self, macroOnly=False, includeMacros=True):
         """
-        generate_documentation(outputDirectory=None)
+        iter_documentation(macroOnly=False, includeMacros=True)
 
-        Generate documentation for the project using the jinja2 templates
+        Render documentation for the project one program at a time using the jinja2 
+        templates. Only the markdown for the current program is held in memory.
+
+        Parameters
+        ----------
+        macroOnly : bool
+            If True only the macro index is rendered
+        includeMacros : bool
+            If False the macro index is not rendered
 
+        Yields
+        ------
+        tuple
+            Name and markdown documentation for each program, then 'macros' and the 
+            markdown macro index.
         """
-        documentation = {}
         if not macroOnly:
             for program in self.programs:
-                documentation[program.name] = program.generate_documentation()
-        
-        template = jinja2.Template(pkg_resources.read_text(templates, 'macro.md'))
-        documentation['macros']=template.render(program=self)
+                yield program.name, program.generate_documentation()
+
+        if includeMacros:
+            with stage('render_macros', self.profile):
+                template = templates.environment.get_template('macro.md')
+                documentation = template.render(program=self)
+            yield 'macros', documentation
+
+    def generate_documentation(self, macroOnly=False):
+        """
+        generate_documentation(macroOnly=False)
 
-        return documentation
+        Generate documentation for the project using the jinja2 templates. See 
+        iter_documentation.
+
+        Returns
+        -------
+        dict
+            Markdown documentation keyed by program name, with the macro index 
+            under 'macros'.
+        """
+        return dict(self.iter_documentation(macroOnly=macroOnly))
+
+    def write_documentation(self, outputDirectory, macroOnly=False):
+        """
+        write_documentation(outputDirectory, macroOnly=False)
+
+        Write the documentation for each program to outputDirectory as soon as it
+        is rendered, as [program name].md, along with the macro index as macros.md.
+
+        Parameters
+        ----------
+        outputDirectory : str
+            Folder the markdown files are written to, created if it does not exist
+        macroOnly : bool
+            If True only the macro index is written
+
+        Returns
+        -------
+        list
+            pathlib.Path of each file written
+        """
+        outputDirectory = pathlib.Path(outputDirectory)
+        outputDirectory.mkdir(parents=True, exist_ok=True)
+
+        written = []
+        for name, documentation in self.iter_documentation(macroOnly=macroOnly):
+            path = outputDirectory.joinpath('{}.md'.format(name))
+            with path.open('w', encoding='utf-8') as f:
+                f.write(documentation)
+            written.append(path)
+        return written
         
         
@@ -3,6 +3,7 @@ import m2r
 import sphinx
 
 from docutils.parsers import rst
+from docutils.parsers.rst import directives
 from docutils import nodes, statemachine
 from sphinx.util.docutils import SphinxDirective 
 
@@ -17,12 +18,55 @@ from . import sphinxStatic
 
 __version__ = 0.01
 
+def get_project(app, path, workers=None):
+    """
+    get_project(app, path, workers=None)
+
+    Return an up to date sasProject for path, re-parsing only changed programs if 
+    the project has already been built with the same workers during this build. 
+
+    Built projects are held in app.sasdocsProjects keyed by path and workers, so a 
+    directive referencing the same folder again refreshes the project instead of 
+    parsing it again. They are dropped when the build finishes, see clear_projects.
+
+    Parameters
+    ----------
+    app : sphinx.application.Sphinx
+        Application the directive is run by
+    path : str
+        Root folder of the project
+    workers : int, optional
+        Number of worker processes used to parse programs
+
+    Returns
+    -------
+    sasProject
+    """
+    projects = app.sasdocsProjects
+    key = (path, workers)
+    if key in projects:
+        projects[key].refresh()
+        return projects[key]
+    project = sasProject(path, workers=workers)
+    if hasattr(project, 'summary'):
+        projects[key] = project
+    return project
+
+def clear_projects(app, exception):
+    """
+    clear_projects(app, exception)
+
+    Drop the projects built during a build, connected to Sphinx's build-finished event.
+    """
+    app.sasdocsProjects.clear()
+
 class SASDirective(SphinxDirective):
     
     has_content = True
     required_arguments = 1
     optional_arguments = 0
     final_argument_whitespace = False
+    option_spec = {'workers': directives.positive_int}
 
     def run(self):
         sasfile = self.arguments[0]
@@ -33,9 +77,9 @@ class SASDirective(SphinxDirective):
             self.state_machine.insert_input(parsedSAS.split('\n'), '')
             return []
         else:
-            parsedSAS = sasProject(srcpath)
-            for prg in parsedSAS.programs:
-                documentation = m2r.convert(prg.generate_documentation())
+            parsedSAS = get_project(self.env.app, srcpath, workers=self.options.get('workers'))
+            for _, documentation in parsedSAS.iter_documentation(includeMacros=False):
+                documentation = m2r.convert(documentation)
                 self.state_machine.insert_input(documentation.split('\n'), '')
             return []
 
@@ -45,6 +89,7 @@ class SASMacroDirective(SphinxDirective):
     required_arguments = 1
     optional_arguments = 0
     final_argument_whitespace = False
+    option_spec = {'workers': directives.positive_int}
 
     def run(self):
         sasfile = self.arguments[0]
@@ -55,7 +100,7 @@ class SASMacroDirective(SphinxDirective):
             self.state_machine.insert_input(parsedSAS.split('\n'), '')
             return []
         else:
-            parsedSAS = sasProject(srcpath)
+            parsedSAS = get_project(self.env.app, srcpath, workers=self.options.get('workers'))
             documentation = m2r.convert(parsedSAS.generate_documentation(macroOnly=True)['macros'])
             self.state_machine.insert_input(documentation.split('\n'), '')
             return []
@@ -77,6 +122,9 @@ def setup(app):
     app.add_directive('sasinclude', SASDirective)
     app.add_directive('sasmacroinclude', SASMacroDirective)
 
+    app.sasdocsProjects = {}
+    app.connect('build-finished', clear_projects)
+
 
     jsfilesCDN = [r'https://cdnjs.cloudflare.com/ajax/libs/d3/5.15.0/d3.min.js',  
                   r'https://cdnjs.cloudflare.com/ajax/libs/codemirror/5.52.0/codemirror.min.js', 
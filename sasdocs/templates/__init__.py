@@ -0,0 +1,36 @@
+import os
+import logging
+
+import jinja2
+
+log = logging.getLogger(__name__)
+
+
+def get_bytecode_cache():
+    """
+    get_bytecode_cache()
+
+    Create the on disk cache of compiled template bytecode shared between runs 
+    and worker processes.
+
+    Returns
+    -------
+    jinja2.FileSystemBytecodeCache or None
+        None if the SASDOCS_NO_CACHE environment variable is set or the cache 
+        directory cannot be used.
+    """
+    if os.environ.get('SASDOCS_NO_CACHE'):
+        return None
+    try:
+        return jinja2.FileSystemBytecodeCache()
+    except Exception as e:
+        log.warning("Unable to create template bytecode cache: {}".format(e))
+        return None
+
+
+# environment: jinja2 environment for the sasdocs templates. Each template is 
+# compiled once per process and reused by every program and project rendered.
+environment = jinja2.Environment(
+    loader=jinja2.PackageLoader('sasdocs', 'templates'),
+    bytecode_cache=get_bytecode_cache()
+)
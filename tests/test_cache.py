@@ -0,0 +1,135 @@
+import os
+import time
+import shutil
+import pytest
+
+from sasdocs.cache import parseCache, get_cache
+from sasdocs.objects import clear_resolved_paths
+from sasdocs.program import sasProgram
+from sasdocs.project import sasProject
+
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path.joinpath('macro_1.sas')
+    shutil.copy('./tests/samples/macro_1.sas', str(path))
+    return path
+
+
+def test_cached_program(tmp_path, program):
+    cache = parseCache(tmp_path.joinpath('cache'))
+    first = sasProgram(program, cache=cache)
+    second = sasProgram(program, cache=cache)
+    assert first.fromCache is False
+    assert second.fromCache is True
+    assert second.contents == first.contents
+    assert second.parsed == first.parsed
+    assert second.summary == first.summary
+    assert second.dataObjects.keys() == first.dataObjects.keys()
+    assert second.networkJSON == first.networkJSON
+
+
+def test_cached_program_changed(tmp_path, program):
+    cache = parseCache(tmp_path.joinpath('cache'))
+    sasProgram(program, cache=cache)
+    with program.open('a') as f:
+        f.write('\ndata b; set c; run;\n')
+    res = sasProgram(program, cache=cache)
+    assert res.fromCache is False
+    assert res.summary['dataStep'] == 3
+
+
+@pytest.mark.parametrize("cache", [None, False])
+def test_cache_bypass(tmp_path, program, cache):
+    res = sasProgram(program, cache=cache)
+    assert res.cache is None
+    assert res.fromCache is False
+
+
+def test_cache_bypass_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('SASDOCS_NO_CACHE', '1')
+    assert get_cache(tmp_path) is None
+
+
+def test_cache_evict_age(tmp_path):
+    cache = parseCache(tmp_path, maxAge=60)
+    old, new = cache.key(b'old'), cache.key(b'new')
+    cache.store(old, {})
+    cache.store(new, {})
+    past = time.time() - 120
+    os.utime(str(tmp_path.joinpath(old)), (past, past))
+    cache.evict()
+    assert cache.load(old) is None
+    assert cache.load(new) == {}
+
+
+def test_cache_evict_size(tmp_path):
+    cache = parseCache(tmp_path, maxSize=None)
+    keys = [cache.key(str(i).encode()) for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.store(key, {'data': 'x' * 1000})
+        past = time.time() - 100 + i
+        os.utime(str(tmp_path.joinpath(key)), (past, past))
+    cache.maxSize = 2500
+    cache.evict()
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == sorted(keys[2:])
+
+
+def test_cache_keeps_other_files(tmp_path):
+    cache = parseCache(tmp_path, maxSize=0, maxAge=60)
+    key = cache.key(b'program')
+    cache.store(key, {})
+    tmp_path.joinpath('{}.123.tmp'.format(key)).write_bytes(b'partial')
+    for name in ('old', 'large.sas7bdat', key[:-1]):
+        tmp_path.joinpath(name).write_bytes(b'x' * 1000)
+        past = time.time() - 120
+        os.utime(str(tmp_path.joinpath(name)), (past, past))
+    others = {'old', 'large.sas7bdat', key[:-1]}
+
+    cache.evict()
+    assert {entry.name for entry in tmp_path.iterdir()} == others
+
+    cache.store(key, {})
+    cache.clear()
+    assert {entry.name for entry in tmp_path.iterdir()} == others
+
+
+def test_cached_project(tmp_path):
+    cache = tmp_path.joinpath('cache')
+    first = sasProject('./tests/samples', cache=cache)
+    second = sasProject('./tests/samples', cache=cache)
+    assert all(prg.fromCache for prg in second.programs)
+    assert second.summary == first.summary
+
+
+def test_cached_project_include_created(tmp_path):
+    cache = tmp_path.joinpath('cache')
+    root = tmp_path.joinpath('project')
+    root.mkdir()
+    lib = tmp_path.joinpath('lib.sas')
+    root.joinpath('main.sas').write_text('%include "{}";\n'.format(lib))
+    first = sasProject(root, cache=cache)
+    assert [prg.name for prg in first.programs] == ['main']
+
+    lib.write_text('data a; set b; run;\n')
+    second = sasProject(root, cache=cache)
+    assert second.programs[0].fromCache is True
+    assert [prg.name for prg in second.programs] == ['main', 'lib']
+
+
+def test_cached_program_libname_created(tmp_path):
+    cache = parseCache(tmp_path.joinpath('cache'))
+    data = tmp_path.joinpath('data')
+    path = tmp_path.joinpath('a.sas')
+    path.write_text('libname lib1 "{}";\n'.format(data))
+    first = next(sasProgram(path, cache=cache).get_objects(objectType='libname'))
+    assert first.resolved is False
+
+    data.mkdir()
+    clear_resolved_paths()
+    program = sasProgram(path, cache=cache)
+    second = next(program.get_objects(objectType='libname'))
+    assert program.fromCache is True
+    assert second.resolved is True
+    assert second.uri == data.resolve().as_uri()
+
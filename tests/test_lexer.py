@@ -0,0 +1,90 @@
+import pathlib
+import pytest
+
+from sasdocs.lexer import lex, iter_spans
+from sasdocs.objects import force_partial_parse, dataStep, procedure, dataObject
+from sasdocs.parsers import fullprogram
+
+
+testcases = [
+    ('x = "a;b";', [('double', 5, 8)]),
+    ("x = 'it''s';", [('single', 5, 7), ('single', 9, 10)]),
+    ('/* "not a string" */', [('comment', 2, 18)]),
+    ('"/* not a comment */"', [('double', 1, 20)]),
+    ('* statement comment;\nx = a * b;', [('statement', 1, 19)]),
+    ('%* macro comment;', [('macro', 2, 16)]),
+    ('*a;*b;\n  *c;', [('statement', 1, 2), ('statement', 4, 5), ('statement', 10, 11)]),
+    ("%put %str(%');", []),
+    ("datalines;\nO'Brien\n;", [('datalines', 10, 19)]),
+    ("cards4;\na;b\n;;;;", [('datalines4', 7, 12)]),
+    ("x = 'unclosed;", [('unclosed', 4, 5)]),
+    ('x = "a";\ny = \'b;\nz = "c;', [('double', 5, 6), ('unclosed', 13, 14), ('unclosed', 21, 22)]),
+    ('/* unclosed', [('comment', 2, 11)]),
+    ('data a; set lines; run;', []),
+    ('var cards;\nrun;', []),
+    ('x = 1;\n  datalines;\n1 2\n;', [('datalines', 19, 24)]),
+    ('select\n *\n from a;', []),
+    ('/* a */\n* b;', [('comment', 2, 5), ('statement', 9, 11)])
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_iter_spans(case, expected):
+    assert list(iter_spans(case)) == expected
+
+
+def test_lex_masks_spans():
+    case = 'data a; x = "run;"; /* run; */ run;'
+    source = lex(case)
+    assert source == case
+    assert len(source.masked) == len(case)
+    assert source.masked == 'data a; x = "    "; /*      */ run;'
+    assert source.unclosed is None
+
+
+def test_lex_unclosed_quote():
+    case = "data a; x = 'b; run;"
+    source = lex(case)
+    assert source.unclosed == 12
+    assert source.masked == case
+
+
+testcases = [
+    ('data a; set b; x = "y; run;"; z = 1; run;', 
+        [dataStep(outputs=[dataObject(library=None, dataset=['a'], options=None)], header=' ', inputs=[dataObject(library=None, dataset=['b'], options=None)], body=' x = "y; run;"; z = 1; ')]),
+    ('proc print data=a; title "Print out=b"; run;', 
+        [procedure(outputs=[], inputs=dataObject(library=None, dataset=['a'], options=None), type='print')]),
+    ("proc sql; create table x as select ';' as a from y; quit;", 
+        [procedure(outputs=[dataObject(library=None, dataset=['x'], options=None)], inputs=[dataObject(library=None, dataset=['y'], options=None)])])
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_lexed_parse_skips_strings(case, expected):
+    assert force_partial_parse(fullprogram, case) == expected
+
+
+def step_datasets(step):
+    inputs = step.inputs if isinstance(step.inputs, list) else [step.inputs]
+    return [dataset.UID for dataset in step.outputs], [dataset.UID for dataset in inputs]
+
+testcases = [
+    ('data a; set lines; run;\ndata b; set c; run;', [(['WORK.A'], ['WORK.LINES']), (['WORK.B'], ['WORK.C'])]),
+    ('data a; set b; var cards; run;\ndata c; set d; run;', [(['WORK.A'], ['WORK.B']), (['WORK.C'], ['WORK.D'])]),
+    ('proc print data=a; var lines; run;\ndata b; set c; run;', [([], ['WORK.A']), (['WORK.B'], ['WORK.C'])]),
+    ('proc sql;\n create table out as\n select\n *\n from lib1.src;\nquit;', [(['WORK.OUT'], ['LIB1.SRC'])])
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_lexed_parse_statement_keywords(case, expected):
+    steps = [obj for obj in force_partial_parse(fullprogram, case) if obj != '\n']
+    assert [step_datasets(step) for step in steps] == expected
+
+
+testcases = [path for path in sorted(pathlib.Path(__file__).parent.joinpath('samples').glob('*.sas'))]
+
+@pytest.mark.parametrize("case", testcases)
+def test_lexed_parse_matches_unlexed(case):
+    code = case.read_text()
+    lexed = force_partial_parse(fullprogram, code, stats=True, mark=True)
+    unlexed = force_partial_parse(fullprogram, code, stats=True, mark=True, lex=False)
+    assert lexed == unlexed
+    assert [obj.span for obj in lexed[0] if hasattr(obj, 'span')] == [obj.span for obj in unlexed[0] if hasattr(obj, 'span')]
@@ -0,0 +1,63 @@
+import pytest
+
+from sasdocs.lineage import dataLineage, get_uid
+from sasdocs.project import sasProject
+
+
+def lineage_state(lineage):
+    return (set(lineage.datasets), lineage.downstreamEdges, lineage.upstreamEdges, lineage.producedBy, lineage.consumedBy, dict(lineage.edgeCount))
+
+
+@pytest.fixture
+def project(tmp_path):
+    tmp_path.joinpath('a.sas').write_text('data b; set a; run;\ndata lib1.x; set lib1.y; run;\n')
+    tmp_path.joinpath('b.sas').write_text('proc sort data=b out=c; run;\n%macro m;\n  data lib1.x; set lib1.y; run;\n%mend;\n')
+    tmp_path.joinpath('c.sas').write_text('data d; merge work.c b; run;\n')
+    return sasProject(tmp_path)
+
+
+testcases = [
+    ('upstream', 'work.d', {'WORK.A', 'WORK.B', 'WORK.C'}),
+    ('upstream', 'a', set()),
+    ('downstream', 'a', {'WORK.B', 'WORK.C', 'WORK.D'}),
+    ('downstream', 'WORK.C', {'WORK.D'}),
+    ('downstream', 'lib1.y', {'LIB1.X'}),
+    ('producers', 'c', {'b.sas'}),
+    ('producers', 'lib1.x', {'a.sas', 'b.sas'}),
+    ('consumers', 'b', {'b.sas', 'c.sas'}),
+    ('consumers', 'missing', set())
+]
+
+@pytest.mark.parametrize("query,dataset,expected", testcases)
+def test_lineage_queries(project, query, dataset, expected):
+    res = getattr(project.lineage, query)(dataset)
+    if query in ('producers', 'consumers'):
+        res = set(path.name for path in res)
+    assert res == expected
+
+
+def test_lineage_nodes(project):
+    assert set(project.lineage.datasets) == {'WORK.A', 'WORK.B', 'WORK.C', 'WORK.D', 'LIB1.X', 'LIB1.Y'}
+    assert project.lineage.edgeCount[('LIB1.Y', 'LIB1.X')] == 2
+    dataset = next(project.get_objects(objectType='dataStep')).outputs[0]
+    assert get_uid(dataset) == 'WORK.B'
+    assert project.lineage.datasets['WORK.B'] is dataset.identity
+
+
+def test_lineage_remove_program(project, tmp_path):
+    project.lineage.remove_program(tmp_path.joinpath('b.sas').resolve())
+    assert project.lineage.producers('c') == set()
+    assert project.lineage.downstream('a') == {'WORK.B', 'WORK.D'}
+    assert project.lineage.edgeCount[('LIB1.Y', 'LIB1.X')] == 1
+
+    project.lineage.remove_program(tmp_path.joinpath('a.sas').resolve())
+    project.lineage.remove_program(tmp_path.joinpath('c.sas').resolve())
+    assert lineage_state(project.lineage) == lineage_state(dataLineage())
+
+
+def test_lineage_refresh(project, tmp_path):
+    tmp_path.joinpath('b.sas').write_text('proc sort data=b out=e; run;\n')
+    tmp_path.joinpath('c.sas').unlink()
+    project.refresh()
+    assert project.lineage.downstream('a') == {'WORK.B', 'WORK.E'}
+    assert lineage_state(project.lineage) == lineage_state(sasProject(tmp_path).lineage)
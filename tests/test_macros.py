@@ -0,0 +1,80 @@
+import pytest
+
+from sasdocs.macros import macroIndex
+from sasdocs.program import sasProgram
+from sasdocs.project import sasProject
+
+
+def index_state(index):
+    return (index.definitions, index.calls, index.programs)
+
+
+@pytest.fixture
+def project(tmp_path):
+    tmp_path.joinpath('a.sas').write_text('%macro Load(ds=);\n  data &ds.; set raw; run;\n%mend;\n%load(ds=x);\n')
+    tmp_path.joinpath('b.sas').write_text('data y; set x; run;\n%LOAD(ds=y);\n%&name.(ds=z);\n')
+    tmp_path.joinpath('c.sas').write_text('%macro outer;\n  %macro inner;\n    %report;\n  %mend;\n  %inner;\n%mend;\n%macro load;\n%mend;\n')
+    return sasProject(tmp_path)
+
+
+testcases = [
+    ('definitions', 'load', [('a.sas', 1), ('c.sas', 7)]),
+    ('definitions', 'INNER', [('c.sas', 2)]),
+    ('definitions', 'report', []),
+    ('calls', 'Load', [('a.sas', 4), ('b.sas', 2)]),
+    ('calls', 'inner', [('c.sas', 5)]),
+    ('calls', 'report', [('c.sas', 3)]),
+    ('calls', 'outer', [])
+]
+
+@pytest.mark.parametrize("query,name,expected", testcases)
+def test_macro_index_queries(project, query, name, expected):
+    if query == 'definitions':
+        res = [(path.name, definition.start[0]) for path, definition in project.macroIndex.get_definitions(name)]
+    else:
+        res = [(path.name, line) for path, line in project.macroIndex.get_calls(name)]
+    assert res == expected
+
+
+def test_macro_index_lookups(project):
+    index = project.macroIndex
+    assert set(index.definitions) == {'LOAD', 'OUTER', 'INNER'}
+    assert set(path.name for path in index.callers('load')) == {'a.sas', 'b.sas'}
+    assert index.undefined() == {'REPORT'}
+    assert 'Outer' in index and 'report' not in index
+    assert [(name, path.name) for name, path, _ in index] == [('LOAD', 'a.sas'), ('LOAD', 'c.sas'), ('OUTER', 'c.sas'), ('INNER', 'c.sas')]
+
+
+def test_macro_index_remove_program(project, tmp_path):
+    project.macroIndex.remove_program(tmp_path.joinpath('a.sas').resolve())
+    assert [path.name for path, _ in project.macroIndex.get_definitions('load')] == ['c.sas']
+    assert [path.name for path, _ in project.macroIndex.get_calls('load')] == ['b.sas']
+
+    project.macroIndex.remove_program(tmp_path.joinpath('b.sas').resolve())
+    project.macroIndex.remove_program(tmp_path.joinpath('c.sas').resolve())
+    assert index_state(project.macroIndex) == index_state(macroIndex())
+
+
+def test_macro_index_refresh(project, tmp_path):
+    tmp_path.joinpath('b.sas').write_text('%report;\n')
+    tmp_path.joinpath('c.sas').unlink()
+    project.refresh()
+    assert set(project.macroIndex.definitions) == {'LOAD'}
+    assert [(path.name, line) for path, line in project.macroIndex.get_calls('report')] == [('b.sas', 1)]
+    fresh = sasProject(tmp_path).macroIndex
+    assert [(name, path) for name, path, _ in project.macroIndex] == [(name, path) for name, path, _ in fresh]
+    assert project.macroIndex.calls == fresh.calls
+
+
+def test_program_macro_index(tmp_path):
+    tmp_path.joinpath('a.sas').write_text('%macro load;\n%mend;\n%load;\n')
+    program = sasProgram(tmp_path.joinpath('a.sas'))
+    assert [(path.name, line) for path, line in program.macroIndex.get_calls('LOAD')] == [('a.sas', 3)]
+    assert [definition.name for _, definition in program.macroIndex.get_definitions('load')] == ['load']
+
+
+def test_macro_index_documentation(project):
+    documentation = project.generate_documentation(macroOnly=True)['macros']
+    assert '| [Load](#Load) | No docstring found. | a.sas:4, b.sas:2 |' in documentation
+    assert '| [inner](#inner) | No docstring found. | c.sas:5 |' in documentation
+    assert 'Defined in c.sas on line 2.' in documentation
@@ -1,6 +1,12 @@
+import gc
+import sys
+import attr
+import pickle
+import itertools
 import pytest
 from sasdocs.parsers import *
 from sasdocs.objects import * 
+from sasdocs.project import sasProject
 
 testcases = [
     ("test", ["test"]),
@@ -35,6 +41,13 @@ testcases = [
 def test_dataObject_parse(case, expected):
     assert dataObj.parse(case) == expected
 
+testcases = ["test", "lib.test", "lib.test(keep=a)", "lib.test (where=(a=1))", "&test.test", "lib.&test.", "a.b.c", "lib..test", "lib.te-st"]
+
+@pytest.mark.parametrize("case", testcases)
+def test_dataObject_fast_path(case):
+    assert dataObj.parse_partial(case) == fullDataObj.parse_partial(case)
+    assert sasName.parse_partial(case) == fullSasName.parse_partial(case)
+
 testcases = [
     ("(where=(1=1))", [dataArg(option=['where'], setting='(1=1)')]),
     ("(drop=a)",[dataArg(option=['drop'], setting='a')]),
@@ -354,3 +367,336 @@ procedure(outputs=dataObject(library=['a'], dataset=['data4'], options=None), in
 def test_force_partial_incomplete_marco_parse(case, expected):
     res = force_partial_parse(fullprogram, case)
     assert res == expected
+
+
+testcases = [
+    ("proc format;\n    value fmt 1='One' 2='Two';\nrun;\n1 2 3 4\ndata a; set b; run;", [dataStep(outputs=[dataObject(library=None, dataset=['a'], options=None)], header=' ', inputs=[dataObject(library=None, dataset=['b'], options=None)], body=' ')], [([5,0],[5,19])], 0.3026),
+    ("1 2 3 4 5 6 7 8 9\n%let a = 1;", [macroVariableDefinition(variable=['a'], value=' 1')], [([2,0],[2,11])], 0.4138)
+]
+
+@pytest.mark.parametrize("case,expected,posistions,rate", testcases)
+def test_force_partial_parse_skips_unparsable(case, expected, posistions, rate):
+    res, parsedRate = force_partial_parse(fullprogram, case, stats=True, mark=True)
+    assert res == expected
+    assert [(obj.start, obj.end) for obj in res] == posistions
+    assert round(parsedRate, 4) == rate
+
+
+testcases = [
+    './tests/samples/simple_1.sas',
+    './tests/samples/macro_1.sas',
+    './tests/samples/macro_2.sas',
+    "PROC SORT DATA=a OUT=b; RUN;\nproc sql\n select data=a out=b; quit;\n%letter;\n%MEND x;\n%includex;\n/ * a\n* inline;\n%run(a=1);"
+]
+
+@pytest.mark.parametrize("case", testcases)
+def test_fullprogram_dispatch_matches_alternation(case):
+    if case.endswith('.sas'):
+        with open(case) as f:
+            case = f.read()
+    alternation = (nl|mcvDef|cmnt|datastep|proc|sql|lbnm|icld|mcroStart|mcroEnd|mcroCall).optional()
+    assert force_partial_parse(fullprogram, case, stats=True) == force_partial_parse(alternation, case, stats=True)
+
+
+@pytest.mark.parametrize("cls", [baseSASObject] + baseSASObject.__subclasses__() + [dataIdentity])
+def test_slotted_objects(cls):
+    assert attr.has(cls)
+    assert '__slots__' in vars(cls)
+    assert not hasattr(object.__new__(cls), '__dict__')
+
+
+def test_data_identity_interning():
+    a = dataObject(library=['lib1'], dataset=['interned'])
+    b = dataObject(library=['lib1'], dataset=['interned'], options=[dataArg(option=['where'], setting='(a=1)')])
+    c = dataObject(library=['LIB1'], dataset=['INTERNED'])
+    assert a.identity is b.identity
+    assert a.options != b.options
+    assert c.identity is not a.identity
+    assert c.UID is a.UID
+    assert (a.name, c.name) == ('lib1.interned', 'LIB1.INTERNED')
+    assert pickle.loads(pickle.dumps(b)).identity is a.identity
+
+    key = ('lib1', 'interned')
+    del a, b
+    gc.collect()
+    assert key not in dataIdentities
+
+
+@pytest.mark.parametrize("order", [(0, 1), (1, 0)])
+def test_data_identity_keeps_parsed_reference(order):
+    cases = [('data test_spelling;', 'work'), ('data work.test_spelling;', ['work'])]
+    parsed = []
+    for i in order:
+        parsed.append(datastep.parse(cases[i][0] + ' run;').outputs[0])
+        assert parsed[-1].library == cases[i][1]
+        assert parsed[-1].dataset == ['test_spelling']
+    assert parsed[0].identity is parsed[1].identity
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_data_identity_project(tmp_path, workers):
+    for i in range(4):
+        tmp_path.joinpath('program_{}.sas'.format(i)).write_text('data temp; set lib1.customers; run;\nproc sort data=work.temp out=lib1.customers; by a; run;\n')
+    prj = sasProject(tmp_path, workers=workers)
+    identities = {}
+    for obj in prj.get_objects():
+        for dataset in obj.inputs + obj.outputs:
+            identities.setdefault(dataset.name, set()).add(id(dataset.identity))
+    assert {name:len(ids) for name, ids in identities.items()} == {'work.temp':1, 'lib1.customers':1}
+
+
+testcases = [
+    './tests/samples/simple_1.sas',
+    './tests/samples/macro_2.sas',
+    "\n\ndata a; set b;\nrun;\n\n%let x = 1;\r\nproc sort data=a\n out=b; run; garbage\n%put;\n",
+    "data a; set b; run;"
+]
+
+@pytest.mark.parametrize("case", testcases)
+def test_force_partial_parse_line_index(case):
+    if case.endswith('.sas'):
+        with open(case) as f:
+            case = f.read()
+    res = force_partial_parse(fullprogram, case, mark=True)
+    assert len(res) > 0
+    for obj in [obj for obj in res if type(obj).__name__ != 'macro']:
+        for offset, posistion in zip(obj.span, (obj.start, obj.end)):
+            assert posistion == [case.count('\n', 0, offset) + 1, offset - case.rfind('\n', 0, offset) - 1]
+    unpickled = pickle.loads(pickle.dumps(res))
+    assert [getattr(obj, 'span', None) for obj in unpickled] == [getattr(obj, 'span', None) for obj in res]
+    assert [(obj.start, obj.end) for obj in unpickled if hasattr(obj, 'span')] == [(obj.start, obj.end) for obj in res if hasattr(obj, 'span')]
+
+
+def test_set_found_posistion():
+    obj = comment(text='a')
+    assert hasattr(obj, 'start') is False
+    obj.set_found_posistion([1, 0], [2, 5])
+    assert (obj.start, obj.end) == ([1, 0], [2, 5])
+
+
+def test_resolve_path_memoised(tmp_path, monkeypatch, caplog):
+    calls = []
+    resolve = pathlib.Path.resolve
+    def counting_resolve(self, *args, **kwargs):
+        calls.append(self)
+        return resolve(self, *args, **kwargs)
+    monkeypatch.setattr(pathlib.Path, 'resolve', counting_resolve)
+    monkeypatch.chdir(tmp_path)
+    clear_resolved_paths()
+
+    existing = tmp_path.joinpath('code.sas')
+    existing.write_text('data a; set b; run;')
+    missing = tmp_path.joinpath('missing.sas')
+    code = '%include "code.sas"; libname a "code.sas"; %include "missing.sas"; libname b "missing.sas"; %include "missing.sas";'
+    res = force_partial_parse(program, code)
+
+    assert [obj.resolved for obj in res] == [True, True, False, False, False]
+    assert [obj.path for obj in res[::2]] == [existing, pathlib.Path('missing.sas'), pathlib.Path('missing.sas')]
+    assert len(calls) == 2
+    assert len([r for r in caplog.records if 'Unable to directly resolve path' in r.message]) == 1
+
+    existing.unlink()
+    missing.write_text('')
+    assert force_partial_parse(program, code)[2].resolved is False
+    clear_resolved_paths()
+    assert [obj.resolved for obj in force_partial_parse(program, code)] == [False, False, True, True, True]
+
+
+def test_resolve_path_no_filesystem(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv('SASDOCS_NO_FILESYSTEM', '1')
+    monkeypatch.setattr(pathlib.Path, 'resolve', None)
+    monkeypatch.chdir(tmp_path)
+    tmp_path.joinpath('code.sas').write_text('')
+
+    res = force_partial_parse(program, '%include "code.sas"; libname a "code.sas";')
+    assert [obj.resolved for obj in res] == [False, False]
+    assert [obj.path for obj in res] == [pathlib.Path('code.sas'), pathlib.Path('code.sas')]
+    assert res[1].uri == pathlib.Path('code.sas')
+    assert 'Unable to directly resolve path' not in caplog.text
+
+
+testcases = [
+    ('%macro a; data a; set b; run; %mend; %macro b; %mend; %let c = 1;', 
+        [macro(ref=['a'], arguments=None, contents=[dataStep(outputs=[dataObject(library=None, dataset=['a'], options=None)], header=' ', inputs=[dataObject(library=None, dataset=['b'], options=None)], body=' ')]),
+        macro(ref=['b'], arguments=None, contents=[]),
+        macroVariableDefinition(variable=['c'], value=' 1')]),
+    ('%macro a; %macro b; %let c = 1;', 
+        [macroStart(name=['a'], arguments=None), macroStart(name=['b'], arguments=None), macroVariableDefinition(variable=['c'], value=' 1')]),
+    ('%macro a; %macro b; %let c = 1; %mend;', 
+        [macroStart(name=['a'], arguments=None), macro(ref=['b'], arguments=None, contents=[macroVariableDefinition(variable=['c'], value=' 1')])]),
+    ('%mend; %macro a; %mend; %mend;', 
+        [macroEnd(text='%mend;'), macro(ref=['a'], arguments=None, contents=[]), macroEnd(text='%mend;')]),
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_rebuild_macros_unbalanced(case, expected):
+    assert force_partial_parse(fullprogram, case) == expected
+
+
+def test_rebuild_macros_deep_nesting():
+    depth = sys.getrecursionlimit() * 2
+    res = force_partial_parse(fullprogram, '%macro m;\n' * depth + '%let a = 1;\n' + '%mend;\n' * depth)
+    assert len(res) == 1
+    for _ in range(depth - 1):
+        assert res[0].ref == ['m'] and len(res[0].contents) == 1
+        res = res[0].contents
+    assert res[0].contents == [macroVariableDefinition(variable=['a'], value=' 1')]
+
+    nested = [1]
+    for i in range(depth):
+        nested = [i, nested, i]
+    assert flatten_list(nested) == list(range(depth - 1, -1, -1)) + [1] + list(range(depth))
+
+
+testcases = [
+    ('data a; x = 1;\n', 'datastep header'),
+    ('proc sort data=a out=b;\n', 'proc outputs'),
+    ('proc sql; select a from b;\n', 'sql statement'),
+    ('%let a = 1 ', 'macro variable value'),
+    ('* a ', 'inline comment')
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_force_partial_parse_step_budget(case, expected, caplog):
+    code = case * 2000
+    res, rate = force_partial_parse(fullprogram, code, stats=True, budget=parseBudget(seconds=None, steps=500))
+    assert rate < 0.5
+    assert 'Parse step budget of 500 characters exceeded, left unparsed: {} at '.format(expected) in caplog.text
+
+
+def test_force_partial_parse_step_budget_parses_within():
+    code = 'data a; set b; run;\n' * 100 + 'proc sql; create table c as select * from d; quit;\n' 
+    assert force_partial_parse(fullprogram, code, budget=parseBudget(seconds=None, steps=500)) == force_partial_parse(fullprogram, code)
+
+
+def test_force_partial_parse_time_budget():
+    code = 'data a; set b; run;\n' * 10 + 'data a; x = 1;\n' * 5000
+    with pytest.raises(budgetExceeded) as e:
+        force_partial_parse(fullprogram, code, stats=True, mark=True, budget=parseBudget(seconds=30, steps=None, clock=itertools.count().__next__))
+    assert e.value.parser == 'data'
+    assert e.value.posistion < len(code)
+    assert len(e.value.parsed) >= 10
+    assert e.value.rate < 1
+
+
+def test_get_budget(monkeypatch):
+    assert (get_budget(None).seconds, get_budget(None).steps) == (None, 1000000)
+    assert (get_budget(False).seconds, get_budget(False).steps) == (None, None)
+    budget = parseBudget(seconds=1)
+    assert get_budget(budget) is budget
+    monkeypatch.setenv('SASDOCS_PARSE_BUDGET', '5')
+    assert get_budget(None).seconds == 5
+    monkeypatch.setenv('SASDOCS_PARSE_BUDGET', '0')
+    assert get_budget(None).seconds is None
+
+
+def test_line_index_offset():
+    lines = lineIndex('a\nbc\nd', offset=100, firstLine=10)
+    assert [lines.posistion(offset) for offset in (100, 101, 102, 104, 105)] == [[10, 0], [10, 1], [11, 0], [11, 2], [12, 0]]
+    unpickled = pickle.loads(pickle.dumps(lines))
+    assert unpickled.posistion(105) == [12, 0]
+
+
+def flatten_spans(objs):
+    return [(repr(obj), getattr(obj, 'start', None), getattr(obj, 'end', None)) for obj in flatten_list(objs)]
+
+testcases = [
+    ('./tests/samples/simple_1.sas', 1),
+    ('./tests/samples/macro_1.sas', 7),
+    ('./tests/samples/macro_2.sas', 13),
+    ('./tests/samples/macro_2.sas', 4096),
+    ("/* Header; */\ndata a; set b(where=(x='a;b'));\nrun;\n%macro m(a=1);\nproc sort data=a\n out=b; run;\n%mend;\n%let x = 1;\n garbage;\n%m(a=2);\n", 5),
+    ("data a; set b; run;", 3),
+]
+
+@pytest.mark.parametrize("case,size", testcases)
+def test_iter_partial_parse(case, size):
+    if case.endswith('.sas'):
+        with open(case) as f:
+            case = f.read()
+    res, rate = force_partial_parse(fullprogram, case, stats=True, mark=True)
+    state = partialParse(fullprogram, mark=True)
+    streamed = list(state.stream(case[i:i+size] for i in range(0, len(case), size)))
+    assert streamed == res
+    assert flatten_spans(streamed) == flatten_spans(res)
+    assert state.parsedRate == pytest.approx(rate)
+
+
+@pytest.mark.parametrize("size", [7, 37, 101, 997, 4096])
+def test_iter_partial_parse_quoted_semicolons(size):
+    case = "%let x = 'a;b;c;d;e;f;g;h';\n" * 50 + 'data a; x = "q;r"; set b(where=(y="s;t")); run;\n' * 20
+    res = force_partial_parse(fullprogram, case, mark=True)
+    streamed = list(iter_partial_parse(fullprogram, (case[i:i+size] for i in range(0, len(case), size)), mark=True))
+    assert streamed == res
+    assert flatten_spans(streamed) == flatten_spans(res)
+
+
+def test_iter_partial_parse_yields_early():
+    read = []
+    def chunks():
+        for chunk in ('data a; set b; run;\n%macro m;\n', 'data c; set d; run;\n', '%mend;\ndata e; set f; run;\n'):
+            read.append(chunk)
+            yield chunk
+    streamed = iter_partial_parse(fullprogram, chunks())
+    assert next(streamed).outputs[0].dataset == ['a']
+    assert len(read) == 1
+    assert type(next(streamed)).__name__ == 'macro'
+    assert len(read) == 3
+    assert [type(obj).__name__ for obj in streamed] == ['dataStep']
+
+
+def test_iter_partial_parse_step_budget():
+    code = 'data a; set b; run;\n' + 'data c;\n' + 'x = 1;\n' * 1000 + 'data d; set e; run;\n'
+    budget = parseBudget(seconds=None, steps=500)
+    streamed = list(iter_partial_parse(fullprogram, (code[i:i+100] for i in range(0, len(code), 100)), budget=budget))
+    assert streamed == force_partial_parse(fullprogram, code, budget=budget)
+    assert [obj.outputs[0].dataset for obj in streamed] == [['a'], ['d']]
+
+
+def test_iter_partial_parse_time_budget():
+    code = 'data a; set b; run;\n' * 10 + 'data a; x = 1;\n' * 5000
+    streamed = iter_partial_parse(fullprogram, [code], budget=parseBudget(seconds=30, steps=None, clock=itertools.count().__next__))
+    parsed = []
+    with pytest.raises(budgetExceeded) as e:
+        for obj in streamed:
+            parsed.append(obj)
+    assert e.value.parser == 'data'
+    assert len(parsed) >= 10
+
+
+testcases = [
+    ['x = 1; y = 2; d', 'ata a; set b; run;\n'],
+    list(';/* c; run; \n */'),
+    list('x = 1;\n/* c; run; \n */ proc sort data=a; by x; run;\n'),
+]
+
+@pytest.mark.parametrize("chunks", testcases)
+def test_iter_partial_parse_resync_across_chunks(chunks):
+    res = force_partial_parse(fullprogram, ''.join(chunks))
+    assert res != []
+    assert list(iter_partial_parse(fullprogram, chunks)) == res
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 21])
+def test_iter_partial_parse_chunk_sizes(size):
+    case = ("x = 1; y = 2; data a; set b; run;\n/* c; run; \n */ proc sort data=a; by x; run;\n"
+            "garbage; %let a=1;\n%macro m;\n * note; data c; set d; run;\n%mend;\n junk %m;\n")
+    res, rate = force_partial_parse(fullprogram, case, stats=True, mark=True)
+    state = partialParse(fullprogram, mark=True)
+    streamed = list(state.stream(case[i:i+size] for i in range(0, len(case), size)))
+    assert streamed == res
+    assert flatten_spans(streamed) == flatten_spans(res)
+    assert state.parsedRate == pytest.approx(rate)
+
+
+testcases = [
+    ("data a; set b; run;\n\n%macro m;\ndata c; run;\n%mend;\nproc sort data=x; run;\n", 10, ["data a; set b; run;\n\n", "%macro m;\ndata c; run;\n%mend;\n", "proc sort data=x; run;\n"]),
+    ("data a; set b; run;\n\n%macro m;\ndata c; run;\n%mend;\nproc sort data=x; run;\n", 1, ["data a; set b; run;\n\n%macro m;\ndata c; run;\n%mend;\nproc sort data=x; run;\n"]),
+    ("data y;\n/* run;\n%macro z; */\nrun;\ndata q; set r;\ndata s; run;\n", 10, ["data y;\n/* run;\n%macro z; */\nrun;\n", "data q; set r;\ndata s; run;\n"]),
+    ("proc sql;\ncreate table a as select * from b;\nquit;\n  proc print; run;\n", 10, ["proc sql;\ncreate table a as select * from b;\nquit;\n", "  proc print; run;\n"]),
+    ("", 10, [""]),
+]
+
+@pytest.mark.parametrize("case,segments,expected", testcases)
+def test_split_program(case, segments, expected):
+    assert [case[start:end] for start, end in split_program(case, segments)] == expected
@@ -0,0 +1,69 @@
+import json
+import pytest
+
+from sasdocs.program import sasProgram
+from sasdocs.project import sasProject
+from sasdocs.profiling import get_profile, stage, format_report
+
+
+def test_program_profile():
+    res = sasProgram('./tests/samples/macro_2.sas', profile=True)
+    assert {'load', 'load/read', 'load/parse', 'load/parse/rebuild_macros', 'build_object_index'} <= set(res.profile.stages)
+    assert res.profile.stages['load/parse']['count'] == len(res.contents)
+    assert res.profile.stages['build_object_index']['count'] == sum(res.summary.values())
+    assert 'render' not in res.profile.stages
+
+    res.generate_documentation()
+    assert res.profile.stages['render']['calls'] == 1
+    assert res.profile.stages['render/get_data_objects']['count'] == len(res.dataObjects)
+    wall, cpu = res.profile.total()
+    assert wall >= res.profile.stages['load']['wall'] > 0
+
+
+testcases = [
+    (None, '', False),
+    (None, '0', False),
+    (None, '1', True),
+    (False, '1', False),
+    (True, '', True)
+]
+
+@pytest.mark.parametrize("profile,environment,expected", testcases)
+def test_get_profile(monkeypatch, profile, environment, expected):
+    monkeypatch.setenv('SASDOCS_PROFILE', environment)
+    res = get_profile(profile, 'name')
+    assert (res is not None) is expected
+    if expected:
+        assert res.output is None
+
+
+def test_stage_without_profile():
+    with stage('unprofiled') as record:
+        assert record is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_project_profile(tmp_path, workers):
+    output = tmp_path.joinpath('profile.json')
+    res = sasProject('./tests/samples', workers=workers, profile=output)
+    assert all(prg.profile is not None for prg in res.programs)
+
+    report = json.loads(output.read_text())
+    assert report['stages']['load/parse']['calls'] == len(res.programs)
+    assert [prg['name'] for prg in report['slowest']] == [prg['name'] for prg in report['programs']]
+    assert 'load_project/add_programs/parse_programs' in report['project']['stages']
+
+    res.generate_documentation()
+    report = res.profile_report(top=1)
+    assert len(report['slowest']) == 1
+    assert report['stages']['render']['calls'] == len(res.programs)
+    assert 'render_macros' in report['project']['stages']
+    assert 'slowest programs' in format_report(report)
+
+
+def test_project_unprofiled(monkeypatch):
+    monkeypatch.delenv('SASDOCS_PROFILE', raising=False)
+    res = sasProject('./tests/samples')
+    assert res.profile is None
+    assert res.profile_report() is None
+    assert all(prg.profile is None for prg in res.programs)
@@ -1,7 +1,12 @@
 import pytest
 import pprint
+import itertools
+import concurrent.futures
+from collections import Counter
+from sasdocs.parsers import fullprogram
 from sasdocs.objects import *
-from sasdocs.program import sasProgram
+from sasdocs.cache import parseCache
+from sasdocs.program import sasProgram, decode_source, iter_source, stream_program, iter_objects, index_objects, parallel_parse
 
 testcases = ["bad/path"]
 
@@ -74,3 +79,231 @@ def test_get_posistion_program(case, expected):
     for obj, (start, end) in zip(res.contents,expected):
         assert obj.start == start
         assert obj.end == end
+
+
+testcases = [
+    ('./tests/samples/macro_2.sas', {'dataStep': [None, 'outer', 'inner', 'innermost'], 'procedure': ['inner'], 'macro': [None, 'outer', 'inner']}),
+    ('./tests/samples/simple_1.sas', {'include': [None], 'libname': [None], 'dataStep': [None], 'procedure': [None]})
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_object_index_program(case, expected):
+    res = sasProgram(case)
+    assert list(res.get_objects()) == list(res.get_objects(object=res))
+    parents = {objType:[None if obj.parent is None else obj.parent.name for obj in objects] for objType, objects in res.objectIndex.items()}
+    assert parents == expected
+    for objType in expected:
+        assert list(res.get_objects(objectType=objType)) == list(res.get_objects(object=res, objectType=objType))
+
+
+testcases = [
+    ('./tests/samples/macro_1.sas', ('contents',), ['contents', 'parsedRate']),
+    ('./tests/samples/macro_1.sas', ('documented',), ['contents', 'documentation', 'documented']),
+    ('./tests/samples/simple_1.sas', ('parsed', 'summary'), ['name', 'parsed', 'summary'])
+]
+
+@pytest.mark.parametrize("case,only,expected", testcases)
+def test_only_program(case, only, expected):
+    res = sasProgram(case, only=only)
+    full = sasProgram(case)
+    for attribute in expected:
+        assert getattr(res, attribute) == getattr(full, attribute)
+    if 'parsed' not in only:
+        assert hasattr(res, 'name') is False
+    if 'documented' not in only:
+        assert hasattr(res, 'documentation') is False
+    assert res._networkGraph is None
+    assert res._dataObjects is None
+    assert (res._summary is not None) is ('summary' in only)
+
+
+@pytest.mark.parametrize("case", ['./tests/samples/simple_1.sas', './tests/samples/macro_2.sas'])
+def test_lazy_derived_program(case):
+    res = sasProgram(case)
+    assert res._summary is None and res._dataObjects is None and res._networkGraph is None and res._networkJSON is None
+    assert res.summary == res.summarise_objects()
+    assert res.networkJSON == res.networkJSON
+    assert res.hasNodes is (len(res.dataObjects) > 0)
+    assert res.networkGraph is res.networkGraph
+
+
+def test_program_time_budget(tmp_path, caplog):
+    path = tmp_path.joinpath('slow.sas')
+    path.write_text('data a; set b; run;\n' + 'data a; x = 1;\n' * 5000)
+    cache = parseCache(tmp_path.joinpath('cache'))
+    budget = parseBudget(seconds=30, steps=None, clock=itertools.count().__next__)
+    res = sasProgram(path, cache=cache, budget=budget)
+    assert res.exceededBudget is True
+    assert res.failedLoad == 0
+    assert res.contents[0] == dataStep(outputs=[dataObject(library=None, dataset=['a'], options=None)], header=' ', inputs=[dataObject(library=None, dataset=['b'], options=None)], body=' ')
+    assert res.parsedRate < 1
+    assert "Parse time budget of 30s exceeded on line" in caplog.text
+    assert sasProgram(path, cache=cache, budget=budget).fromCache is False
+
+
+def test_program_step_budget_cache(tmp_path):
+    path = tmp_path.joinpath('a.sas')
+    path.write_text('data a; set b; run;\n')
+    cache = parseCache(tmp_path.joinpath('cache'))
+    limited = sasProgram(path, cache=cache, budget=parseBudget(steps=10))
+    assert limited.contents == []
+    assert sasProgram(path, cache=cache, budget=parseBudget(steps=10)).fromCache is True
+
+    res = sasProgram(path, cache=cache)
+    assert res.fromCache is False
+    assert res.summary == {'dataStep': 1}
+    assert sasProgram(path, cache=cache).fromCache is True
+
+
+testcases = [
+    ('data caf\u00e9; run;\n'.encode('utf-8'), None, 'data caf\u00e9; run;\n', 'utf-8'),
+    ('data caf\u00e9; run;\n'.encode('cp1252'), None, 'data caf\u00e9; run;\n', 'cp1252'),
+    ('x = "\u2018a\u2019";'.encode('cp1252'), None, 'x = "\u2018a\u2019";', 'cp1252'),
+    (b'x = "\x81";', None, 'x = "\x81";', 'latin-1'),
+    ('data caf\u00e9; run;'.encode('utf-8'), 'latin-1', 'data caf\u00c3\u00a9; run;', 'latin-1'),
+    ('data a;\r\nrun;\r\n'.encode('utf-8-sig'), None, 'data a;\nrun;\n', 'utf-8-sig'),
+    ('data a;\rrun;'.encode('utf-16'), None, 'data a;\nrun;', 'utf-16'),
+    (b'', None, '', 'utf-8'),
+]
+
+@pytest.mark.parametrize("case,encoding,expected,expectedEncoding", testcases)
+def test_decode_source(case, encoding, expected, expectedEncoding):
+    assert decode_source(case, encoding) == (expected, expectedEncoding)
+
+
+testcases = [
+    ('data caf\u00e9; set b; run;\r\n/* d\u00e9j\u00e0 */\r\n', 'cp1252'),
+    ('data caf\u00e9; set b; run;\n/* d\u00e9j\u00e0 */\n', 'utf-8'),
+    ('', 'utf-8'),
+]
+
+@pytest.mark.parametrize("case,encoding", testcases)
+def test_program_encoding(tmp_path, case, encoding):
+    path = tmp_path.joinpath('encoded.sas')
+    path.write_bytes(case.encode(encoding))
+    cache = parseCache(tmp_path.joinpath('cache'))
+    res = sasProgram(path, cache=cache)
+    assert res.failedLoad == 0
+    assert res.encoding == encoding
+    assert res.lines == case.count('\n')
+    assert res._raw is None
+    assert res.raw == case.replace('\r\n', '\n')
+
+    cached = sasProgram(path, cache=cache)
+    assert cached.fromCache is True
+    assert (cached.encoding, cached.lines, cached.contents) == (res.encoding, res.lines, res.contents)
+    assert cached.raw == res.raw
+
+
+def test_program_raw_matches_parse(tmp_path, caplog):
+    a, b = tmp_path.joinpath('a.sas'), tmp_path.joinpath('b.sas')
+    a.write_text('data a; set b; run;\n')
+    b.write_text('data b; set c; run;\n')
+    first, second = sasProgram(a), sasProgram(b)
+
+    assert first.raw == 'data a; set b; run;\n'
+    a.unlink()
+    assert first.raw == 'data a; set b; run;\n'
+
+    b.write_text('data b; set d; run;\n')
+    assert second.raw == ''
+    assert "the file has changed since it was parsed" in caplog.text
+
+
+testcases = [
+    ('./tests/samples/macro_1.sas', None, 16),
+    ('./tests/samples/macro_2.sas', None, 64),
+    ('data caf\u00e9; set b; run;\r\n%macro m;\r\n/* d\u00e9j\u00e0 */\r\nproc sort data=a out=b; run;\r\n%mend;\r\n', 'cp1252', 10),
+]
+
+@pytest.mark.parametrize("case,encoding,size", testcases)
+def test_stream_program(tmp_path, case, encoding, size):
+    if encoding is not None:
+        path = tmp_path.joinpath('encoded.sas')
+        path.write_bytes(case.encode(encoding))
+    else:
+        path = case
+    prg = sasProgram(path, cache=False)
+    assert ''.join(iter_source(path, chunkSize=size)) == prg.raw
+
+    state = partialParse(fullprogram, mark=True)
+    streamed = list(stream_program(path, chunkSize=size, state=state))
+    assert streamed == prg.contents
+    assert [(obj.start, obj.end) for obj in iter_objects(streamed) if hasattr(obj, 'span')] == [(obj.start, obj.end) for obj in iter_objects(prg.contents) if hasattr(obj, 'span')]
+    assert state.parsedRate == pytest.approx(prg.parsedRate)
+
+    objectIndex, objectOrder = index_objects(stream_program(path, chunkSize=size))
+    assert objectIndex == prg.objectIndex
+    assert objectOrder == prg.objectOrder
+    assert Counter(type(obj).__name__ for obj in iter_objects(stream_program(path, chunkSize=size))) == prg.summary
+
+
+def test_parallel_parse():
+    with open('./tests/samples/macro_2.sas') as f:
+        nested = f.read()
+    code = '%macro outer;\n' + nested * 5 + '%mend;\n' + ('data a; set b; run;\n/* Comment */\n' + nested) * 5 + '%macro open;\ndata c; run;\n'
+    res, rate = force_partial_parse(fullprogram, code, stats=True, mark=True)
+    with concurrent.futures.ProcessPoolExecutor(2) as executor:
+        parallel, parallelRate = parallel_parse(code, executor, 8)
+    assert parallel == res
+    assert [(obj.start, obj.end) for obj in iter_objects(parallel) if hasattr(obj, 'span')] == [(obj.start, obj.end) for obj in iter_objects(res) if hasattr(obj, 'span')]
+    assert parallelRate == pytest.approx(rate)
+
+
+testcases = [
+    ('proc print noobs; run;\nproc sort data=a out=b; by x; run;\n', [procedure(outputs=[dataObject(library=None, dataset=['b'], options=None)], inputs=[dataObject(library=None, dataset=['a'], options=None)], type='print')]),
+    ('proc sort data=a; run;\nproc means data=b out=c; run;\n', [procedure(outputs=[dataObject(library=None, dataset=['c'], options=None)], inputs=[dataObject(library=None, dataset=['a'], options=None)], type='sort')]),
+    ('proc print; run;\n' * 3 + 'proc sort data=a; run;\ndata c; set d; run;\n', [procedure(outputs=[], inputs=[dataObject(library=None, dataset=['a'], options=None)], type='sort'), dataStep(outputs=[dataObject(library=None, dataset=['c'], options=None)], inputs=[dataObject(library=None, dataset=['d'], options=None)], header=' ', body=' ')]),
+]
+
+@pytest.mark.parametrize("case,expected", testcases)
+def test_parallel_parse_scan_past_piece(case, expected):
+    assert len(split_program(case, 10)) > 1
+    res, rate = force_partial_parse(fullprogram, case, stats=True, mark=True)
+    with concurrent.futures.ProcessPoolExecutor(1) as executor:
+        parallel, parallelRate = parallel_parse(case, executor, 10)
+    assert res == expected
+    assert parallel == res
+    assert [(obj.start, obj.end) for obj in iter_objects(parallel)] == [(obj.start, obj.end) for obj in iter_objects(res)]
+    assert parallelRate == pytest.approx(rate)
+
+
+class overrunExecutor(concurrent.futures.Executor):
+    """
+    Parses the pieces of a program in this process, the pieces numbered in 
+    overrun running out of time.
+    """
+
+    def __init__(self, overrun):
+        self.overrun = overrun
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        if self.submitted in self.overrun:
+            future.set_exception(budgetExceeded('data', args[1], parsed=[], rate=0.0))
+        else:
+            future.set_result(fn(*args))
+        self.submitted += 1
+        return future
+
+
+def test_parallel_parse_piece_overrun():
+    code = 'data a; set b; run;\n' * 40
+    spans = split_program(code, 4)
+    assert len(spans) > 2
+    with pytest.raises(budgetExceeded) as e:
+        parallel_parse(code, overrunExecutor({1}), 4)
+    assert e.value.parsed == force_partial_parse(fullprogram, code[:spans[1][0]], mark=True)
+    assert e.value.rate == pytest.approx(spans[1][0] / len(code))
+
+
+def test_parallel_parse_reparsed_piece_overrun():
+    code = 'proc sort data=a; run;\ndata c; set d; run;\n' * 3
+    spans = split_program(code, 10)
+    assert len(spans) > 2
+    res, rate = force_partial_parse(fullprogram, code, stats=True, mark=True)
+    parallel, parallelRate = parallel_parse(code, overrunExecutor({1}), 10)
+    assert parallel == res
+    assert parallelRate == pytest.approx(rate)
+
@@ -1,7 +1,10 @@
+import os
 import pytest
+import jinja2
 import pprint
 
 from collections import Counter
+from sasdocs import templates
 from sasdocs.project import sasProject
 from sasdocs.program import sasProgram
 
@@ -42,3 +45,219 @@ def test_project_get_objects(case,expected):
     prjsummary = Counter(type(obj).__name__ for obj in case.get_objects()) 
     pgssummary = Counter(type(obj).__name__ for prg in case.programs for obj in prg.get_objects())
     assert pgssummary == prjsummary
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_project_workers(workers):
+    serial = sasProject('./tests/samples')
+    res = sasProject('./tests/samples', workers=workers)
+    assert [prg.path for prg in res.programs] == [prg.path for prg in serial.programs]
+    assert [prg.contents for prg in res.programs] == [prg.contents for prg in serial.programs]
+    assert res.summary == serial.summary
+
+
+def test_project_workers_fallback(monkeypatch):
+    def brokenPool(*args, **kwargs):
+        raise OSError("No process pool available")
+    monkeypatch.setattr('concurrent.futures.ProcessPoolExecutor', brokenPool)
+    res = sasProject('./tests/samples', workers=2)
+    assert set([prg.name for prg in res.programs]) == set(['macro_1', 'macro_2', 'simple_1'])
+
+
+def test_project_workers_large_program(tmp_path, monkeypatch):
+    import sasdocs.program
+    for name in ('macro_1', 'macro_2', 'simple_1'):
+        with open('./tests/samples/{}.sas'.format(name)) as f:
+            tmp_path.joinpath('{}.sas'.format(name)).write_text(f.read())
+    with open('./tests/samples/macro_2.sas') as f:
+        tmp_path.joinpath('large.sas').write_text('%macro outer;\n' + f.read() * 20 + '%mend;\n' + 'data a; set b; run;\n' * 20)
+    serial = sasProject(tmp_path)
+
+    parallel = []
+    def counting_parallel_parse(*args, **kwargs):
+        parallel.append(args[0])
+        return parallel_parse(*args, **kwargs)
+    parallel_parse = sasdocs.program.parallel_parse
+    monkeypatch.setattr('sasdocs.program.parallel_parse', counting_parallel_parse)
+    monkeypatch.setattr('sasdocs.program.parallelSize', 2000)
+    monkeypatch.setattr('sasdocs.program.segmentSize', 500)
+    monkeypatch.setattr('sasdocs.project.parallelSize', 2000)
+    res = sasProject(tmp_path, workers=2)
+    assert len(parallel) == 1
+    assert [prg.path for prg in res.programs] == [prg.path for prg in serial.programs]
+    assert [prg.contents for prg in res.programs] == [prg.contents for prg in serial.programs]
+    assert [[(obj.start, obj.end) for obj in prg.get_objects()] for prg in res.programs] == [[(obj.start, obj.end) for obj in prg.get_objects()] for prg in serial.programs]
+    assert [prg.parsedRate for prg in res.programs] == pytest.approx([prg.parsedRate for prg in serial.programs])
+
+
+def test_project_include_chain(tmp_path, monkeypatch):
+    root = tmp_path.joinpath('project')
+    external = tmp_path.joinpath('external')
+    root.mkdir()
+    external.mkdir()
+    chain = [external.joinpath('chain_{}.sas'.format(i)) for i in range(5)]
+    for i, path in enumerate(chain):
+        path.write_text('%include "{}";\ndata out_{}; set in_{}; run;\n'.format(chain[(i+1) % len(chain)], i, i))
+    root.joinpath('main.sas').write_text('%include "{}";\n%include "{}";\n'.format(chain[0], chain[3]))
+
+    loaded = []
+    def counting_load_program(path, cache=None, profile=False, budget=None, encoding=None, executor=None):
+        loaded.append(path)
+        return sasProgram(path, cache=cache, profile=profile, budget=budget, encoding=encoding, executor=executor)
+    monkeypatch.setattr('sasdocs.project.load_program', counting_load_program)
+
+    res = sasProject(root)
+    assert len(loaded) == len(set(loaded)) == 6
+    assert set(prg.name for prg in res.programs) == set(['main'] + ['chain_{}'.format(i) for i in range(5)])
+
+
+def test_project_objects_slotted(tmp_path):
+    for i in range(5):
+        tmp_path.joinpath('program_{}.sas'.format(i)).write_text(''.join(
+            '%let a{0} = 1;\ndata out_{0}(keep=a); set lib.in_{0} lib.in_{1}; run;\nproc sort data=out_{0} out=sorted_{0}; by a; run;\n'.format(j, j+1)
+            for j in range(20)
+        ))
+    prj = sasProject(tmp_path)
+    objs = list(prj.get_objects())
+    objs.extend(dataset for obj in objs if type(obj).__name__ in ('dataStep', 'procedure') for dataset in obj.inputs + obj.outputs)
+    assert len(objs) > 500
+    assert not any(hasattr(obj, '__dict__') for obj in objs)
+
+
+def test_project_refresh(tmp_path):
+    a, b, c = (tmp_path.joinpath(name) for name in ('a.sas', 'b.sas', 'c.sas'))
+    a.write_text('%include "{}";\ndata a; set b; run;\n'.format(b))
+    b.write_text('data b; set c; run;\n')
+    c.write_text('proc sort data=c out=d; run;\n')
+
+    res = sasProject(tmp_path)
+    programs = {prg.name:prg for prg in res.programs}
+    assert res.refresh() == set()
+
+    os.utime(str(c), None)
+    b.write_text('data b; set c; run;\ndata e; set b; run;\n')
+    os.utime(str(b), (1, 1))
+    assert res.refresh() == set([a, b])
+    refreshed = {prg.name:prg for prg in res.programs}
+    assert refreshed['c'] is programs['c']
+    assert refreshed['a'] is not programs['a']
+    assert refreshed['b'].summary == {'dataStep': 2}
+
+    c.unlink()
+    tmp_path.joinpath('d.sas').write_text('%let a = 1;\n')
+    assert res.refresh() == set([c, tmp_path.joinpath('d.sas')])
+
+    fresh = sasProject(tmp_path)
+    assert [prg.path for prg in res.programs] == [prg.path for prg in fresh.programs]
+    assert res.summary == fresh.summary
+    assert res.nPrograms == fresh.nPrograms
+    assert sorted(res.objects.values(), key=str) == sorted(fresh.objects.values(), key=str)
+
+
+def test_project_refresh_include_appeared(tmp_path):
+    folder, outside = tmp_path.joinpath('prj'), tmp_path.joinpath('outside')
+    folder.mkdir()
+    outside.mkdir()
+    a, e = folder.joinpath('a.sas'), outside.joinpath('e.sas')
+    a.write_text('%include "{}";\ndata a; set e; run;\n'.format(e))
+
+    res = sasProject(folder)
+    assert [prg.name for prg in res.programs] == ['a']
+
+    e.write_text('data e; set f; run;\n')
+    assert res.refresh() == set([a, e])
+
+    fresh = sasProject(folder)
+    assert [prg.name for prg in res.programs] == [prg.name for prg in fresh.programs] == ['a', 'e']
+    assert res.summary == fresh.summary
+
+
+def test_project_refresh_order(tmp_path):
+    folder, outside = tmp_path.joinpath('prj'), tmp_path.joinpath('outside')
+    folder.mkdir()
+    outside.mkdir()
+    lib = outside.joinpath('lib.sas')
+    lib.write_text('%macro load; data a; run; %mend;\n')
+    folder.joinpath('m.sas').write_text('%include "{}";\n%load;\n'.format(lib))
+    folder.joinpath('n.sas').write_text('%macro report; proc print; run; %mend;\n%load;\n')
+
+    res = sasProject(folder)
+    folder.joinpath('a.sas').write_text('%macro load; data b; run; %mend;\n%report;\n%load;\n')
+    res.refresh()
+
+    fresh = sasProject(folder)
+    assert [prg.name for prg in res.programs] == [prg.name for prg in fresh.programs] == ['a', 'm', 'n', 'lib']
+    assert [prg.name for prg in res.objects] == [prg.name for prg in fresh.objects]
+    assert list(res.macroIndex.definitions) == list(fresh.macroIndex.definitions)
+    for name in fresh.macroIndex.definitions:
+        assert [path for path, _ in res.macroIndex.get_definitions(name)] == [path for path, _ in fresh.macroIndex.get_definitions(name)]
+    assert res.macroIndex.calls == fresh.macroIndex.calls
+
+
+def test_project_refresh_failed_program(tmp_path, monkeypatch):
+    a, bad = tmp_path.joinpath('a.sas'), tmp_path.joinpath('bad.sas')
+    a.write_text('%include "{}";\ndata a; set b; run;\n'.format(bad))
+    bad.write_bytes(b'data bad; x = "\xe9"; run;\n')
+
+    loaded = []
+    def counting_load_program(path, cache=None, profile=False, budget=None, encoding=None, executor=None):
+        loaded.append(path)
+        return sasProgram(path, cache=cache, profile=profile, budget=budget, encoding=encoding, executor=executor)
+    monkeypatch.setattr('sasdocs.project.load_program', counting_load_program)
+
+    res = sasProject(tmp_path, encoding='utf-8')
+    assert [prg.name for prg in res.programs] == ['a']
+    assert list(res.failedPrograms) == [bad]
+    assert list(res.includeGraph) == [a]
+    del loaded[:]
+
+    assert res.refresh() == set()
+    a.write_text('%include "{}";\ndata a; set c; run;\n'.format(bad))
+    assert res.refresh() == set([a])
+    assert loaded == [a]
+
+    bad.write_text('data bad; x = 1; run;\n')
+    assert res.refresh() == set([a, bad])
+    assert res.failedPrograms == {}
+    assert [prg.name for prg in res.programs] == ['a', 'bad']
+
+
+def test_project_include_created(tmp_path):
+    folder, e = tmp_path.joinpath('prj'), tmp_path.joinpath('e.sas')
+    folder.mkdir()
+    folder.joinpath('a.sas').write_text('%include "{}";\n'.format(e))
+    assert [prg.name for prg in sasProject(folder).programs] == ['a']
+
+    e.write_text('data e; set f; run;\n')
+    assert [prg.name for prg in sasProject(folder).programs] == ['a', 'e']
+
+
+def test_project_documentation_template_reuse():
+    prj = sasProject('./tests/samples')
+    template = templates.environment.get_template('program.md')
+    documentation = prj.generate_documentation()
+    assert templates.environment.get_template('program.md') is template
+    for program in prj.programs:
+        source = templates.environment.loader.get_source(templates.environment, 'program.md')[0]
+        assert documentation[program.name] == jinja2.Template(source).render(program=program)
+
+
+def test_project_index_template(monkeypatch):
+    prj = sasProject('./tests/samples')
+    requested = []
+    get_objects = prj.get_objects
+    monkeypatch.setattr(prj, 'get_objects', lambda objectType=None: requested.append(objectType) or get_objects(objectType=objectType))
+    index = templates.environment.get_template('index.md').render(project=prj)
+    assert 'macro' not in requested
+    assert [line.split(']')[0] for line in index.splitlines() if 'macroIndex.md#' in line] == ['| [' + macro.name for _, _, macro in prj.macroIndex]
+
+
+@pytest.mark.parametrize("macroOnly", [False, True])
+def test_project_write_documentation(tmp_path, macroOnly):
+    prj = sasProject('./tests/samples')
+    documentation = prj.generate_documentation(macroOnly=macroOnly)
+    written = prj.write_documentation(tmp_path.joinpath('docs'), macroOnly=macroOnly)
+    assert [path.stem for path in written] == list(documentation.keys())
+    for path in written:
+        assert path.read_text(encoding='utf-8') == documentation[path.stem]
+    assert [name for name, _ in prj.iter_documentation(includeMacros=False)] == [program.name for program in prj.programs]